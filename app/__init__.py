@@ -1,58 +1,61 @@
-from app.cred import server, user, pwd, database, secret, odbcdriver, rechargedatabase  # ensure `database` is defined in cred.py
+from app.cred import database, secret, rechargedatabase  # ensure `database` is defined in cred.py
 from app.logger import setup_logger
 from flask import Flask, session, abort
+from flask_caching import Cache
 from flask_login import LoginManager, current_user
 from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
-import urllib.parse
+import os
 
 # Initialize extensions
 db = SQLAlchemy()
+cache = Cache()
 
 login_manager = LoginManager()
 login_manager.login_view = 'main.sso_redirect'
 
-def create_app():
+def create_app(config_overrides=None):
+    """
+    config_overrides: optional dict applied on top of app/config.py, e.g. by the benchmark
+    harness to point SQLALCHEMY_DATABASE_URI / SQLALCHEMY_BINDS at SQLite.
+    """
 
     app = Flask(__name__)
     app.config['SECRET_KEY'] = secret
 
-    # pyodbc connection string
-    connection_str = (
-        f"DRIVER={odbcdriver};"
-        f"SERVER={server};"
-        f"DATABASE={database};"
-        f"UID={user};"
-        f"PWD={pwd};"
-        "TrustServerCertificate=yes;"
-    )
-    params = urllib.parse.quote_plus(connection_str)
-    
-    app.config['SQLALCHEMY_DATABASE_URI'] = f"mssql+pyodbc:///?odbc_connect={params}"
-    
-    recharge_connection_str = (
-        f"DRIVER={odbcdriver};"
-        f"SERVER={server};"
-        f"DATABASE={rechargedatabase};"
-        f"UID={user};"
-        f"PWD={pwd};"
-        "TrustServerCertificate=yes;"
-    )
-
-    rechargeparams = urllib.parse.quote_plus(recharge_connection_str)
-    app.config['SQLALCHEMY_BINDS'] = {'rechargedb': f"mssql+pyodbc:///?odbc_connect={rechargeparams}"}
+    # pyodbc connection strings and pool settings (app/db_engine.py)
+    from app.db_engine import mssql_url, engine_options, configure_engine
+    app.config['SQLALCHEMY_DATABASE_URI'] = mssql_url(database)
+    app.config['SQLALCHEMY_BINDS'] = {'rechargedb': mssql_url(rechargedatabase)}
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options()
 
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
     # Set up error logging
     app.config.from_pyfile('config.py')
+    if config_overrides:
+        app.config.update(config_overrides)
     setup_logger(app)
 
     db.init_app(app)
     login_manager.init_app(app)
     Migrate(app, db)
 
+    # Shared by all worker processes (FileSystemCache by default); see app/api_cache.py
+    app.config['CACHE_DIR'] = os.path.join(app.root_path, app.config.get('CACHE_DIR', 'cache'))
+    cache.init_app(app)
+    from app.api_cache import init_api_cache
+    init_api_cache(app)
+
+    with app.app_context():
+        for engine in db.engines.values():
+            configure_engine(engine)
+
+    from app.sql_instrumentation import init_sql_instrumentation
+    init_sql_instrumentation(app, db)
+
     from .models import User
+    from app.identity_cache import load_user_cached
     # Import your permission helpers
     from app.utils import has_permission, is_admin, can_edit_committee
     # @login_manager.user_loader
@@ -60,10 +63,11 @@ def create_app():
     #     return User.query.get(int(user_id))
     @login_manager.user_loader
     def load_user(user_id):
+        # User, role, permissions and employee come from one eager query, cached briefly per process
         impersonated_id = session.get("impersonated_user_id")
 
         if impersonated_id:
-            impersonated = User.query.get(int(impersonated_id))
+            impersonated = load_user_cached(impersonated_id)
             if impersonated:
                 return impersonated
             else:
@@ -71,7 +75,7 @@ def create_app():
                 session.pop("impersonated_user_id", None)
                 session.pop("original_user_id", None)
 
-        return User.query.get(int(user_id))
+        return load_user_cached(user_id)
 
 
     def start_impersonation(target_user_id):
@@ -107,7 +111,7 @@ def create_app():
     
     # Register Blueprints
     from app.routes import main, users, roles, permissions, students, academic_years, calendars, canvas, committee_tracker, \
-        ad_lookup, scheduler, recharge, reports, emma_service, google_service, employees, directory, onboarding
+        ad_lookup, scheduler, recharge, reports, emma_service, google_service, employees, directory, onboarding, sql_profiler
     app.register_blueprint(main.bp)
     app.register_blueprint(academic_years.bp)
     app.register_blueprint(ad_lookup.bp)
@@ -124,6 +128,7 @@ def create_app():
     app.register_blueprint(reports.bp)
     app.register_blueprint(roles.bp)
     app.register_blueprint(scheduler.bp)
+    app.register_blueprint(sql_profiler.bp)
     app.register_blueprint(students.bp)
     app.register_blueprint(users.bp)
 
@@ -136,8 +141,15 @@ def create_app():
     #     app.logger.error(f"Unhandled Exception: {e}", exc_info=True)  # ✅ Must include this line
     #     return "An error occurred", 500
 
-    with app.app_context():
-        db.create_all()    
+    # create_all issues a metadata query per table against MSSQL on every process start;
+    # production sets DB_CREATE_ALL = False and relies on migrations instead
+    if app.config.get('DB_CREATE_ALL', True):
+        with app.app_context():
+            db.create_all()
+
+    # Start the outbound mail sender once its tables exist
+    from app.email import init_mail
+    init_mail(app)
 
     return app
     
\ No newline at end of file
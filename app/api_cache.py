@@ -0,0 +1,123 @@
+from app import cache
+from datetime import datetime
+from flask import current_app, has_app_context
+from functools import wraps
+import hashlib
+import inspect
+
+# Namespaced caching of external API results (Canvas, Panopto, Emma, Google) on the shared
+# Flask-Caching backend configured in create_app. With the default FileSystemCache every
+# wfastcgi worker on the server reads the same entries, so a Canvas term list fetched by one
+# worker is reused by the rest until it expires.
+#
+# TTLs per namespace come from API_CACHE_TTLS in app/config.py. Whole namespaces are
+# invalidated by bumping a generation number stored in the cache, because the file-system
+# backend cannot delete by prefix; stale generations simply expire.
+
+NAMESPACES = ("canvas_terms", "canvas_courses", "canvas_user_search", "panopto_folders",
+              "panopto_recorders", "emma_groups", "google_members")
+
+_app = None
+
+def _backend():
+    app = _app
+    if has_app_context():
+        app = current_app._get_current_object()
+    if app is None or "cache" not in app.extensions:
+        return None
+    return app.extensions["cache"][cache]
+
+def _ttl(namespace):
+    if _app is None:
+        return 300
+    return _app.config.get("API_CACHE_TTLS", {}).get(namespace, _app.config.get("CACHE_DEFAULT_TIMEOUT", 300))
+
+def _generation(backend, namespace):
+    return backend.get(f"api_ns:{namespace}") or 0
+
+def _key(backend, namespace, parts):
+    digest = hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
+    return f"api:{namespace}:{_generation(backend, namespace)}:{digest}"
+
+def get_or_load(namespace, parts, loader, cache_empty=True):
+    """
+    Return the cached value for (namespace, parts), calling loader() on a miss.
+    None is never cached; empty results are skipped too when cache_empty is False
+    (for fetchers that return [] on failure).
+    """
+    backend = _backend()
+    if backend is None:
+        return loader()  # caching not initialised (e.g. a script without create_app)
+
+    key = _key(backend, namespace, parts)
+    try:
+        value = backend.get(key)
+    except Exception as e:
+        print(f"[{datetime.now()}] API cache read failed for {namespace}: {e}")
+        return loader()
+    if value is not None:
+        return value
+
+    value = loader()
+    if value is not None and (cache_empty or value):
+        try:
+            backend.set(key, value, timeout=_ttl(namespace))
+        except Exception as e:
+            print(f"[{datetime.now()}] API cache write failed for {namespace}: {e}")
+    return value
+
+def peek(namespace, parts):
+    """The cached value for (namespace, parts), or None; never loads."""
+    backend = _backend()
+    if backend is None:
+        return None
+    try:
+        return backend.get(_key(backend, namespace, parts))
+    except Exception as e:
+        print(f"[{datetime.now()}] API cache read failed for {namespace}: {e}")
+        return None
+
+def api_cached(namespace, key=None, cache_empty=True):
+    """
+    Decorator: cache the function's result in namespace.
+    key(*args, **kwargs) returns the parts that identify a result; by default all arguments.
+    The undecorated function stays available as .uncached, and .invalidate(*args, **kwargs)
+    drops the entry for those arguments.
+    """
+    def decorator(f):
+        signature = inspect.signature(f)
+
+        def parts_for(args, kwargs):
+            if key:
+                return key(*args, **kwargs)
+            # f("SSPPS") and f(account="SSPPS") share an entry
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            return tuple(bound.arguments.items())
+
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            return get_or_load(namespace, parts_for(args, kwargs), lambda: f(*args, **kwargs), cache_empty=cache_empty)
+        wrapper.uncached = f
+        wrapper.invalidate = lambda *args, **kwargs: invalidate(namespace, parts_for(args, kwargs))
+        return wrapper
+    return decorator
+
+def invalidate(namespace, parts=None):
+    """Drop the cached entry for parts, or the whole namespace when parts is None."""
+    backend = _backend()
+    if backend is None:
+        return
+    if parts is not None:
+        backend.delete(_key(backend, namespace, parts))
+    else:
+        backend.set(f"api_ns:{namespace}", _generation(backend, namespace) + 1, timeout=0)
+
+def invalidate_all():
+    for namespace in NAMESPACES:
+        invalidate(namespace)
+
+def init_api_cache(app):
+    """Remember the app so worker threads without an app context can still use the cache."""
+    global _app
+    _app = app
@@ -0,0 +1,216 @@
+from app import db
+from app.models import CalendarCourseState, CalendarFeedState
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import formatdate
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+# Change detection and safe writes for the calendar group .ics feeds.
+#
+# generate_scheduled_ics runs every hour, but most hours nothing in Canvas changed. Each run
+# fingerprints every course's events (ids, times, text and Canvas updated_at) into
+# CALENDAR_COURSE_STATE, and each group's inputs (its file name, its courses and their
+# fingerprints) into CALENDAR_FEED_STATE. A group's file is only rebuilt when that hash
+# changed or the file is missing, so unchanged feeds keep their bytes and modification time
+# and subscribers' clients have nothing new to download.
+#
+# Files are written to a temporary file in the same folder and renamed over the old one, so
+# serve_calendar_file only ever sees a complete calendar.
+#
+# publish() then writes gzip and Brotli copies next to the feed (name.ics.gz, name.ics.br)
+# and a sidecar (name.ics.meta.json) with its ETag and Last-Modified, so serve_calendar_file
+# can answer subscribers' polls with 304 Not Modified or a precompressed body without reading
+# or hashing the feed. The sidecar records the size and mtime of each file it describes;
+# feed_meta() ignores entries that no longer match (e.g. between the rename of a new feed and
+# its publish()), so a stale validator or variant is never sent.
+
+COMPRESSED_SUFFIXES = {"br": ".br", "gzip": ".gz"}  # Content-Encoding -> file suffix
+META_SUFFIX = ".meta.json"
+
+FEED_FORMAT = 3  # bump when the generated ICS changes shape, to rewrite every feed once
+
+def _digest(value):
+    return hashlib.sha1(json.dumps(value, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def _updated_at(event):
+    value = event.raw.get("updated_at")
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).astimezone(timezone.utc).replace(tzinfo=None)
+
+def events_hash(events):
+    """Fingerprint of a course's CanvasEvents, independent of their order."""
+    return _digest(sorted(
+        [e.id, e.title, e.is_all_day, e.start, e.end, e.location_name, e.description, e.raw.get("updated_at")]
+        for e in events
+    ))
+
+def track_courses(events_by_course):
+    """Record the events fingerprint of each course ({course_id: [CanvasEvent]}); returns {course_id: hash}."""
+    now = datetime.now()
+    states = {s.course_id: s for s in CalendarCourseState.query.all()}
+    hashes = {}
+    for course_id, events in events_by_course.items():
+        course_id = str(course_id)
+        digest = hashes[course_id] = events_hash(events)
+        state = states.get(course_id)
+        if state is None:
+            state = CalendarCourseState(course_id=course_id)
+            db.session.add(state)
+        if state.events_hash != digest:
+            state.events_hash = digest
+            state.event_count = len(events)
+            state.changed_at = now
+        updated = [u for u in (_updated_at(e) for e in events) if u]
+        if updated:
+            state.max_updated_at = max(updated + ([state.max_updated_at] if state.max_updated_at else []))
+        state.checked_at = now
+    db.session.commit()
+    return hashes
+
+def group_hash(filename, courses, course_hashes):
+    """Hash of a group's inputs: courses is [(course_id, course_name)]."""
+    return _digest([FEED_FORMAT, filename,
+                    sorted([str(course_id), name, course_hashes.get(str(course_id))] for course_id, name in courses)])
+
+def needs_update(group_name, filename, inputs_hash, path):
+    state = db.session.get(CalendarFeedState, group_name)
+    return (state is None or state.inputs_hash != inputs_hash or state.ics_filename != filename
+            or not os.path.exists(path))
+
+def mark_checked(group_name):
+    state = db.session.get(CalendarFeedState, group_name)
+    if state is not None:
+        state.checked_at = datetime.now()
+        db.session.commit()
+
+def mark_generated(group_name, filename, inputs_hash, course_count, event_count):
+    state = db.session.get(CalendarFeedState, group_name)
+    if state is None:
+        state = CalendarFeedState(group_name=group_name)
+        db.session.add(state)
+    state.ics_filename = filename
+    state.inputs_hash = inputs_hash
+    state.course_count = course_count
+    state.event_count = event_count
+    state.generated_at = state.checked_at = datetime.now()
+    db.session.commit()
+
+@contextmanager
+def atomic_file(path):
+    """Binary file object whose contents replace path only once the block completes."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        for attempt in range(5):
+            try:
+                os.replace(tmp, path)
+                return
+            except PermissionError:
+                # Windows refuses to replace a file another process is reading; try again shortly
+                if attempt == 4:
+                    raise
+                time.sleep(0.2 * (attempt + 1))
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+def write_atomic(path, data):
+    """Write data to path through a temporary file and a rename."""
+    with atomic_file(path) as f:
+        f.write(data)
+
+# ---- Serving metadata ----
+
+def _stat_key(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+def _file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _compress(encoding, data):
+    if encoding == "br":
+        import brotli  # only needed by the ICS job
+        return brotli.compress(data, mode=brotli.MODE_TEXT, quality=11)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+def publish(path):
+    """Write the compressed variants and validators of a generated feed; returns its ETag."""
+    with open(path, "rb") as f:
+        data = f.read()
+    variants = {}
+    for encoding, suffix in COMPRESSED_SUFFIXES.items():
+        try:
+            write_atomic(path + suffix, _compress(encoding, data))
+        except (ImportError, OSError) as e:
+            print(f"[{datetime.now()}] {encoding} copy of {path} not written: {e}")
+            continue
+        variants[encoding] = _stat_key(path + suffix)
+    st = os.stat(path)
+    meta = {
+        "etag": hashlib.sha1(data).hexdigest(),
+        "last_modified": formatdate(st.st_mtime, usegmt=True),
+        "stat": [st.st_size, st.st_mtime_ns],
+        "variants": variants,
+    }
+    write_atomic(path + META_SUFFIX, json.dumps(meta).encode("utf-8"))
+    _meta_cache.pop(path, None)
+    return meta["etag"]
+
+def is_published(path):
+    """True when the sidecar describes the feed as it is on disk now."""
+    meta = _read_meta(path)
+    return meta is not None and meta.get("stat") == _stat_key(path)
+
+def _read_meta(path):
+    try:
+        with open(path + META_SUFFIX, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+_meta_cache = {}  # path -> (stat keys of the feed and its sidecar, meta); per worker process
+
+def feed_meta(path):
+    """
+    {"etag", "last_modified" (timestamp), "variants": {encoding: path}} for a feed on disk, or
+    None if it does not exist. Feeds without a current sidecar (not published yet) are hashed
+    once per version and served without compressed variants.
+    """
+    feed_stat = _stat_key(path)
+    if feed_stat is None:
+        return None
+    key = (tuple(feed_stat), tuple(_stat_key(path + META_SUFFIX) or ()))
+    cached = _meta_cache.get(path)
+    if cached and cached[0] == key:
+        return cached[1]
+
+    meta = _read_meta(path)
+    if meta and meta.get("stat") == feed_stat:
+        variants = {encoding: path + COMPRESSED_SUFFIXES[encoding]
+                    for encoding, stat in meta.get("variants", {}).items()
+                    if encoding in COMPRESSED_SUFFIXES and stat == _stat_key(path + COMPRESSED_SUFFIXES[encoding])}
+        result = {"etag": meta["etag"], "last_modified": feed_stat[1] / 1e9, "variants": variants}
+    else:
+        result = {"etag": _file_hash(path), "last_modified": feed_stat[1] / 1e9, "variants": {}}
+    _meta_cache[path] = (key, result)
+    return result
@@ -0,0 +1,129 @@
+from app import config, cred, http_client
+from app.canvas_throttle import is_throttled, limiter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Shared pagination for Canvas list endpoints.
+#
+# Canvas pages list results and describes the other pages in the Link header. When it sends a
+# rel="last" link with a numeric page, the remaining page URLs are known up front and are
+# fetched concurrently (at most CANVAS_PAGE_WORKERS at a time). Otherwise, for bookmark-style
+# pages or when Canvas omits "last" because counting is expensive, pages are followed one
+# rel="next" at a time. Either way items come back in page order.
+#
+# Listings can themselves run concurrently (see app/canvas_events.py), so every Canvas request
+# goes through request() below, which holds a slot from the adaptive limiter in
+# app/canvas_throttle.py and retries requests Canvas refused for rate limiting.
+
+# Every Canvas URL in the app starts with CANVAS_API_BASE. Setting CANVAS_STANDIN_URL in
+# app/config.py points all of them at a local canvas_standin.py (recorded responses) instead
+# of the real instance; the token is still sent, the stand-in only uses it when recording.
+CANVAS_API_BASE = getattr(config, "CANVAS_STANDIN_URL", None) or cred.CANVAS_API_BASE
+CANVAS_API_TOKEN = cred.CANVAS_API_TOKEN
+
+def auth_headers():
+    return {'Authorization': f'Bearer {CANVAS_API_TOKEN}'}
+
+def parse_link_header(value):
+    """Return {rel: url} from a Link header."""
+    links = {}
+    for part in (value or "").split(","):
+        section = part.split(";")
+        url = section[0].strip()
+        if not (url.startswith("<") and url.endswith(">")):
+            continue
+        for param in section[1:]:
+            name, _, rel = param.strip().partition("=")
+            if name == "rel":
+                links[rel.strip('"')] = url[1:-1]
+    return links
+
+def _page_number(url):
+    page = dict(parse_qsl(urlsplit(url).query)).get("page", "")
+    return int(page) if page.isdigit() else None
+
+def _with_page(url, number):
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k != "page"]
+    query.append(("page", str(number)))
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+def request(method, url, **kwargs):
+    """
+    http_client.request() for Canvas: adds the auth header, waits for a slot from the adaptive
+    limiter and, when Canvas throttles, pauses all Canvas traffic and tries again (up to
+    CANVAS_THROTTLE_RETRIES times). Returns the final Response.
+    """
+    headers = dict(auth_headers(), **(kwargs.pop("headers", None) or {}))
+    attempts = max(getattr(config, "CANVAS_THROTTLE_RETRIES", 3), 0) + 1
+    for attempt in range(1, attempts + 1):
+        with limiter.slot():
+            # Throttling (403/429) is retried here, where the limiter sees it, not in http_client
+            response = http_client.request(method, url, headers=headers, retry_429=False, **kwargs)
+        limiter.observe(response)
+        if attempt == attempts or not is_throttled(response):
+            return response
+        # A throttled request was not carried out, so retrying is safe even for POST
+        delay = http_client.retry_after_seconds(response)
+        if delay is None:
+            delay = min(2 ** attempt, getattr(config, "HTTP_RETRY_MAX_SECONDS", 60))
+        response.close()
+        limiter.throttled(delay)
+
+def _get(url, params=None, raise_errors=True):
+    response = request("GET", url, params=params)
+    if not response.ok:
+        if raise_errors:
+            response.raise_for_status()
+        print(f"[{datetime.now()}] Canvas API error {response.status_code} for {url}: {response.text[:200]}")
+        return None
+    return response
+
+def get_first_page(url, params=None, extract=None):
+    """Only the first page of a Canvas list endpoint, e.g. the top matches of a search."""
+    extract = extract or (lambda data: data)
+    return list(extract(_get(url, params=params).json()))
+
+def get_paginated(url, params=None, extract=None, raise_errors=True, max_workers=None):
+    """
+    Fetch every page of a Canvas list endpoint and return the items in page order.
+
+    extract: function turning one page's JSON into a list (default: the JSON itself), e.g.
+             lambda data: data["enrollment_terms"].
+    raise_errors: if False, a failed page is logged and the items fetched before it are
+                  returned instead of raising HTTPError.
+    """
+    extract = extract or (lambda data: data)
+    if max_workers is None:
+        max_workers = getattr(config, "CANVAS_PAGE_WORKERS", 4)
+
+    response = _get(url, params=params, raise_errors=raise_errors)
+    if response is None:
+        return []
+    items = list(extract(response.json()))
+    links = parse_link_header(response.headers.get("Link"))
+
+    first_page = _page_number(links.get("current", "")) or 1
+    last_page = _page_number(links.get("last", ""))
+    if links.get("next") and last_page and last_page > first_page and max_workers > 1:
+        # Page URLs are known: fetch the rest concurrently, keeping page order
+        urls = [_with_page(links["last"], n) for n in range(first_page + 1, last_page + 1)]
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(urls))) as executor:
+            responses = list(executor.map(lambda u: _get(u, raise_errors=raise_errors), urls))
+        for page_response in responses:
+            if page_response is None:
+                return items  # a failed page: keep what came before it, like the serial path
+            items.extend(extract(page_response.json()))
+        # Results can grow while we fetch; pick up anything past the page we thought was last
+        links = parse_link_header(responses[-1].headers.get("Link"))
+
+    next_url = links.get("next")
+    while next_url:
+        response = _get(next_url, raise_errors=raise_errors)
+        if response is None:
+            break
+        items.extend(extract(response.json()))
+        next_url = parse_link_header(response.headers.get("Link")).get("next")
+
+    return items
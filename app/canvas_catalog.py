@@ -0,0 +1,265 @@
+from app import config, db
+from app.canvas_api import CANVAS_API_BASE, get_paginated
+from app.models import CanvasCourse, CanvasSection, CanvasSyncState, CanvasTerm
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+import hashlib
+import json
+
+# Local mirror of the Canvas catalog: terms, courses and sections.
+#
+# Pages that only need to list terms and courses (students, photo cards, employee enrollment,
+# calendar groups, the Panopto scheduler) read these tables instead of sweeping the Canvas
+# accounts on every render. sync_catalog() is run by sync_canvas_catalog.py on a schedule:
+#
+#   - terms are small and always fetched in full
+#   - courses are swept per open term (no end date, or ended less than
+#     CANVAS_CATALOG_CLOSED_TERM_DAYS ago); the first run per account, and runs with
+#     full=True, sweep the whole account and mark courses Canvas no longer lists as deleted
+#   - a row is only written when its content hash changed, and sections are only refetched
+#     for new or changed courses (all courses on a full run)
+#
+# Until an account has been synced once, canvas.py keeps calling Canvas live for it.
+
+COURSE_STATES = ["created", "claimed", "available", "completed", "deleted"]
+STATE_FILTER = {"created": "unpublished", "claimed": "unpublished", "unpublished": "unpublished",
+                "available": "available", "completed": "completed", "deleted": "deleted"}
+
+_synced_accounts = set()
+_terms_synced = False
+
+def _utc(value):
+    """Canvas ISO timestamp -> naive UTC datetime."""
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).astimezone(timezone.utc).replace(tzinfo=None)
+
+def _iso(value):
+    return value.strftime('%Y-%m-%dT%H:%M:%SZ') if value else None
+
+def _hash(fields):
+    return hashlib.sha1(json.dumps(fields, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def _workers():
+    return getattr(config, "CANVAS_CATALOG_WORKERS", 4)
+
+def _state(key):
+    state = db.session.get(CanvasSyncState, key)
+    if state is None:
+        state = CanvasSyncState(key=key)
+        db.session.add(state)
+    return state
+
+def _apply(row, fields):
+    """Copy fields onto row if their hash changed; returns True when it did."""
+    digest = _hash(fields)
+    if row.content_hash == digest:
+        return False
+    for name, value in fields.items():
+        setattr(row, name, value)
+    row.content_hash = digest
+    row.synced_at = datetime.now()
+    return True
+
+# ---- Sync ----
+
+def sync_terms(root_account_id):
+    """Mirror every enrollment term of the root account. Returns the number of changed rows."""
+    terms = get_paginated(f"{CANVAS_API_BASE}/accounts/{root_account_id}/terms", params={'per_page': 100},
+                          extract=lambda data: data.get("enrollment_terms", []))
+    existing = {t.id: t for t in CanvasTerm.query.all()}
+    changed = 0
+    for data in terms:
+        row = existing.get(data["id"])
+        if row is None:
+            row = CanvasTerm(id=data["id"])
+            db.session.add(row)
+        changed += _apply(row, {
+            "name": data.get("name") or f"Term {data['id']}",
+            "sis_term_id": data.get("sis_term_id"),
+            "start_at": _utc(data.get("start_at")),
+            "end_at": _utc(data.get("end_at")),
+            "workflow_state": data.get("workflow_state"),
+        })
+    state = _state("terms")
+    state.last_sync_at = state.last_full_sync_at = datetime.now()
+    state.last_result = f"{len(terms)} terms, {changed} changed"
+    db.session.commit()
+    return changed
+
+def _open_term_ids():
+    cutoff = datetime.utcnow() - timedelta(days=getattr(config, "CANVAS_CATALOG_CLOSED_TERM_DAYS", 30))
+    return [t.id for t in CanvasTerm.query.filter((CanvasTerm.end_at == None) | (CanvasTerm.end_at >= cutoff))]
+
+def _fetch_courses(account_id, term_id=None):
+    params = {'per_page': 100, 'blueprint': False, 'state[]': COURSE_STATES}
+    if term_id is not None:
+        params['enrollment_term_id'] = term_id
+    return get_paginated(f"{CANVAS_API_BASE}/accounts/{account_id}/courses", params=params)
+
+def _fetch_sections(course_id):
+    return get_paginated(f"{CANVAS_API_BASE}/courses/{course_id}/sections", params={'per_page': 100})
+
+def sync_courses(account_id, full=False):
+    """Mirror one account's courses (and their sections). Returns a summary string."""
+    state = _state(f"courses:{account_id}")
+    full = full or state.last_full_sync_at is None
+
+    scopes = [None] if full else _open_term_ids()
+    with ThreadPoolExecutor(max_workers=max(1, min(_workers(), len(scopes) or 1))) as executor:
+        fetched = [course for courses in executor.map(lambda term_id: _fetch_courses(account_id, term_id), scopes)
+                   for course in courses]
+
+    existing = {c.id: c for c in CanvasCourse.query.filter_by(account_id=account_id)}
+    seen, changed = set(), []
+    for data in fetched:
+        if data["id"] in seen:
+            continue
+        seen.add(data["id"])
+        row = existing.get(data["id"])
+        if row is None:
+            row = CanvasCourse(id=data["id"], account_id=account_id)
+            db.session.add(row)
+        workflow_state = data.get("workflow_state")
+        if _apply(row, {
+            "account_id": account_id,
+            "enrollment_term_id": data.get("enrollment_term_id"),
+            "name": data.get("name") or "Unnamed Course",
+            "course_code": data.get("course_code"),
+            "sis_course_id": data.get("sis_course_id"),
+            "workflow_state": workflow_state,
+            "start_at": _utc(data.get("start_at")),
+            "end_at": _utc(data.get("end_at")),
+            "deleted": workflow_state == "deleted",
+        }) or row.sections_synced_at is None:
+            changed.append(row)
+
+    removed = 0
+    if full:
+        # A full sweep lists every course Canvas still has; the rest were removed
+        for row in existing.values():
+            if row.id not in seen and not row.deleted:
+                row.deleted, row.workflow_state, row.content_hash = True, "deleted", None
+                removed += 1
+
+    refresh = [row for row in (existing.values() if full else changed) if not row.deleted]
+    if full:
+        refresh += [row for row in changed if row.id not in existing and not row.deleted]
+    with ThreadPoolExecutor(max_workers=_workers()) as executor:
+        sections = list(executor.map(lambda row: _fetch_sections(row.id), refresh))
+    now = datetime.now()
+    for row, course_sections in zip(refresh, sections):
+        _replace_sections(row.id, course_sections)
+        row.sections_synced_at = now
+
+    state.last_sync_at = now
+    if full:
+        state.last_full_sync_at = now
+    state.last_result = (f"{'full' if full else 'delta'}: {len(seen)} courses listed, {len(changed)} new or changed, "
+                         f"{removed} removed, sections refreshed for {len(refresh)}")
+    db.session.commit()
+    _synced_accounts.add(account_id)
+    return state.last_result
+
+def sync_catalog(root_account_id, account_ids, full=False):
+    """Sync terms, then each account's courses. Returns {name: summary} for logging."""
+    summary = {"terms": f"{sync_terms(root_account_id)} changed"}
+    for account_id in account_ids:
+        try:
+            summary[f"account {account_id}"] = sync_courses(account_id, full=full)
+        except Exception as e:
+            db.session.rollback()
+            summary[f"account {account_id}"] = f"failed: {e}"
+            print(f"[{datetime.now()}] Canvas catalog sync failed for account {account_id}: {e}")
+    return summary
+
+def _replace_sections(course_id, sections):
+    ids = [s["id"] for s in sections]
+    # Cross-listed sections move between courses, so also clear them wherever they were
+    CanvasSection.query.filter((CanvasSection.course_id == course_id) | CanvasSection.id.in_(ids or [0])) \
+        .delete(synchronize_session=False)
+    db.session.add_all(CanvasSection(
+        id=s["id"], course_id=course_id, name=s.get("name") or "", sis_section_id=s.get("sis_section_id"),
+        start_at=_utc(s.get("start_at")), end_at=_utc(s.get("end_at")),
+    ) for s in sections)
+
+def store_sections(course_id, sections):
+    """Replace the mirrored sections of one course with a fresh Canvas listing."""
+    _replace_sections(course_id, sections)
+    course = db.session.get(CanvasCourse, course_id)
+    if course is not None:
+        course.sections_synced_at = datetime.now()
+    db.session.commit()
+
+# ---- Read API (same dictionary shapes as the Canvas REST responses) ----
+
+def is_synced(account_id):
+    if account_id not in _synced_accounts:
+        state = db.session.get(CanvasSyncState, f"courses:{account_id}")
+        if state is None or state.last_full_sync_at is None:
+            return False
+        _synced_accounts.add(account_id)
+    return True
+
+def terms_synced():
+    global _terms_synced
+    if not _terms_synced:
+        _terms_synced = db.session.get(CanvasSyncState, "terms") is not None
+    return _terms_synced
+
+def _term_dict(term):
+    return {"id": term.id, "name": term.name, "sis_term_id": term.sis_term_id,
+            "start_at": _iso(term.start_at), "end_at": _iso(term.end_at), "workflow_state": term.workflow_state}
+
+def list_terms():
+    return [_term_dict(t) for t in CanvasTerm.query.order_by(CanvasTerm.start_at, CanvasTerm.id)]
+
+def list_courses(account_id, term_id=None, states=None):
+    """Courses of an account sorted by name; states takes Canvas state[] values (default: all but deleted)."""
+    query = (db.session.query(CanvasCourse, CanvasTerm)
+             .outerjoin(CanvasTerm, CanvasTerm.id == CanvasCourse.enrollment_term_id)
+             .filter(CanvasCourse.account_id == account_id))
+    if term_id is not None:
+        query = query.filter(CanvasCourse.enrollment_term_id == int(term_id))
+    if states:
+        wanted = {STATE_FILTER.get(s, s) for s in ([states] if isinstance(states, str) else states)}
+        query = query.filter(CanvasCourse.workflow_state.in_(wanted))
+    else:
+        query = query.filter(CanvasCourse.deleted == False)
+
+    courses = []
+    for course, term in query.order_by(CanvasCourse.name):
+        courses.append({
+            "id": course.id, "name": course.name, "course_code": course.course_code,
+            "sis_course_id": course.sis_course_id, "account_id": course.account_id,
+            "enrollment_term_id": course.enrollment_term_id, "workflow_state": course.workflow_state,
+            "start_at": _iso(course.start_at), "end_at": _iso(course.end_at),
+            "term": _term_dict(term) if term else {},
+        })
+    return courses
+
+def terms_with_courses(account_id):
+    """Terms that have courses in the account, each with its courses; the shape of canvas.get_terms_with_courses."""
+    by_term = {}
+    for course in list_courses(account_id):
+        if not course["enrollment_term_id"]:
+            continue
+        entry = by_term.setdefault(course["enrollment_term_id"], {
+            "id": course["enrollment_term_id"],
+            "name": course["term"].get("name") or f"Term {course['enrollment_term_id']}",
+            "courses": [],
+        })
+        entry["courses"].append({"id": course["id"], "name": course["name"], "course_code": course["course_code"] or ""})
+    return sorted(by_term.values(), key=lambda t: t["name"])
+
+def is_mirrored(course_id):
+    return db.session.get(CanvasCourse, course_id) is not None
+
+def list_sections(course_id):
+    """Mirrored sections of a course, or None if they have never been synced."""
+    course = db.session.get(CanvasCourse, course_id)
+    if course is None or course.sections_synced_at is None:
+        return None
+    return [{"id": s.id, "course_id": s.course_id, "name": s.name, "sis_section_id": s.sis_section_id,
+             "start_at": _iso(s.start_at), "end_at": _iso(s.end_at)}
+            for s in CanvasSection.query.filter_by(course_id=course_id).order_by(CanvasSection.name)]
@@ -0,0 +1,199 @@
+from app import canvas_api, config, db
+from app.canvas_api import CANVAS_API_BASE
+from app.models import CanvasCourse, CanvasEnrollmentJob, CanvasSection
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import csv
+import io
+import json
+import re
+import requests
+
+# Bulk enrollment into a Canvas course, tracked as a CANVAS_ENROLLMENT_JOBS row.
+#
+# Large batches (CANVAS_SIS_IMPORT_MIN_USERS or more) of SIS users go to Canvas as one SIS
+# import: an enrollments.csv posted to the root account's sis_imports endpoint. Canvas
+# processes it in the background and refresh_job() polls the import when the UI asks for the
+# job. SIS imports need SIS ids for the users, the course and the section, and only know the
+# active / inactive / completed / deleted states. Batches that do not qualify, and small
+# ones, are sent as individual enrollment POSTs through a pool of CANVAS_ENROLL_WORKERS
+# threads (the adaptive limiter in app/canvas_throttle.py still applies) and finish within
+# the request.
+#
+# Either way the caller gets a job id, and GET /canvas/enrollment_jobs/<id> reports progress
+# and per-user results.
+
+SIS_ROLES = {
+    "StudentEnrollment": "student",
+    "TeacherEnrollment": "teacher",
+    "TaEnrollment": "ta",
+    "ObserverEnrollment": "observer",
+    "DesignerEnrollment": "designer",
+}
+SIS_STATES = {"active", "inactive", "completed", "deleted"}
+SIS_DONE = {"imported", "imported_with_messages", "aborted", "failed", "failed_with_messages",
+            "restored", "partially_restored"}
+SIS_FAILED = {"aborted", "failed", "failed_with_messages"}
+
+SIS_USER_PREFIX = "sis_user_id:"
+
+def enroll_user(course_id, user_id, enrollment_type="StudentEnrollment", enrollment_state="active", section_id="", notify=False):
+    """POST one enrollment; returns the enrollment JSON and raises HTTPError on failure."""
+    payload = {
+        'enrollment[user_id]': user_id,
+        'enrollment[type]': enrollment_type,
+        'enrollment[enrollment_state]': enrollment_state,
+        'enrollment[notify]': 'true' if notify else 'false'
+    }
+    if section_id:
+        payload['enrollment[course_section_id]'] = section_id
+
+    response = canvas_api.request("POST", f"{CANVAS_API_BASE}/courses/{course_id}/enrollments", data=payload)
+    response.raise_for_status()
+    return response.json()
+
+def enroll_concurrently(course_id, users, enrollment_type="StudentEnrollment", enrollment_state="active", section_id="", notify=False):
+    """Enroll users one POST each, CANVAS_ENROLL_WORKERS at a time. Returns results in users order."""
+    def enroll(user_id):
+        try:
+            result = enroll_user(course_id, user_id, enrollment_type, enrollment_state, section_id, notify)
+            return {"user_id": user_id, "status": "success", "result": result}
+        except requests.exceptions.HTTPError as e:
+            return {"user_id": user_id, "status": "error", "message": str(e), "details": e.response.text}
+        except requests.exceptions.RequestException as e:
+            return {"user_id": user_id, "status": "error", "message": str(e)}
+
+    if not users:
+        return []
+    workers = max(1, min(getattr(config, "CANVAS_ENROLL_WORKERS", 8), len(users)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(enroll, users))
+
+# ---- SIS import ----
+
+def _course_sis_id(course_id):
+    course = db.session.get(CanvasCourse, int(course_id))
+    if course is not None and course.sis_course_id:
+        return course.sis_course_id
+    response = canvas_api.request("GET", f"{CANVAS_API_BASE}/courses/{course_id}")
+    return response.json().get("sis_course_id") if response.ok else None
+
+def _section_sis_id(section_id):
+    section = db.session.get(CanvasSection, int(section_id))
+    if section is not None and section.sis_section_id:
+        return section.sis_section_id
+    response = canvas_api.request("GET", f"{CANVAS_API_BASE}/sections/{section_id}")
+    return response.json().get("sis_section_id") if response.ok else None
+
+def _sis_import_csv(course_id, users, enrollment_type, enrollment_state, section_id, notify):
+    """enrollments.csv for the batch, or None if it cannot be expressed as a SIS import."""
+    role = SIS_ROLES.get(enrollment_type)
+    if role is None or enrollment_state not in SIS_STATES:
+        return None
+    if not all(str(u).startswith(SIS_USER_PREFIX) for u in users):
+        return None
+    course_sis_id = _course_sis_id(course_id)
+    if not course_sis_id:
+        return None
+    section_sis_id = _section_sis_id(section_id) if section_id else ""
+    if section_id and not section_sis_id:
+        return None
+
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow(["course_id", "user_id", "role", "section_id", "status", "notify"])
+    for user in users:
+        writer.writerow([course_sis_id, str(user)[len(SIS_USER_PREFIX):], role, section_sis_id,
+                         enrollment_state, "true" if notify else "false"])
+    return out.getvalue().encode("utf-8")
+
+def _submit_sis_import(root_account_id, body):
+    response = canvas_api.request(
+        "POST", f"{CANVAS_API_BASE}/accounts/{root_account_id}/sis_imports",
+        params={"import_type": "instructure_csv", "extension": "csv"},
+        data=body, headers={"Content-Type": "text/csv"},
+    )
+    response.raise_for_status()
+    return response.json()
+
+def _sis_results(users, sis_import):
+    """Per-user results from a finished import; users named in an error or warning failed."""
+    messages = [m[-1] for m in (sis_import.get("processing_errors") or []) + (sis_import.get("processing_warnings") or [])
+                if m]
+    failed_all = sis_import.get("workflow_state") in SIS_FAILED
+    results = []
+    for user in users:
+        sis_id = str(user)[len(SIS_USER_PREFIX):]
+        pattern = re.compile(rf"\b{re.escape(sis_id)}\b")
+        problem = next((m for m in messages if sis_id and pattern.search(m)), None)
+        if failed_all or problem:
+            results.append({"user_id": user, "status": "error",
+                            "message": problem or f"SIS import {sis_import.get('workflow_state')}"})
+        else:
+            results.append({"user_id": user, "status": "success"})
+    return results
+
+# ---- Jobs ----
+
+def _finish(job, results, message=None):
+    job.results = json.dumps(results)
+    job.succeeded = sum(1 for r in results if r["status"] == "success")
+    job.failed = len(results) - job.succeeded
+    job.progress = 100
+    job.status = "Completed" if job.failed == 0 else ("Failed" if job.succeeded == 0 else "CompletedWithErrors")
+    job.message = message
+    job.finished_at = datetime.now()
+
+def submit_enrollment(root_account_id, course_id, users, enrollment_type="StudentEnrollment", enrollment_state="active",
+                      section_id="", notify=False, created_by=None):
+    """
+    Start a bulk enrollment and return its CanvasEnrollmentJob (already finished for the API
+    method). SIS imports are posted to root_account_id.
+    """
+    users = list(dict.fromkeys(users))  # drop duplicates, keep order
+    job = CanvasEnrollmentJob(
+        course_id=int(course_id), section_id=int(section_id) if section_id else None,
+        enrollment_type=enrollment_type, enrollment_state=enrollment_state, notify=bool(notify),
+        total=len(users), users=json.dumps(users), created_by=created_by, method="api",
+    )
+
+    if len(users) >= getattr(config, "CANVAS_SIS_IMPORT_MIN_USERS", 25):
+        try:
+            body = _sis_import_csv(course_id, users, enrollment_type, enrollment_state, section_id, notify)
+            if body is not None:
+                sis_import = _submit_sis_import(root_account_id, body)
+                job.method = "sis_import"
+                job.sis_import_id = sis_import["id"]
+                job.status = "Running"
+        except requests.exceptions.RequestException as e:
+            print(f"[{datetime.now()}] SIS import submit failed, enrolling one by one: {e}")
+
+    if job.method == "api":
+        _finish(job, enroll_concurrently(course_id, users, enrollment_type, enrollment_state, section_id, notify))
+
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+def refresh_job(root_account_id, job):
+    """Poll Canvas for a running SIS import job and record the outcome once it is done."""
+    if job.status != "Running" or not job.sis_import_id:
+        return job
+    response = canvas_api.request("GET", f"{CANVAS_API_BASE}/accounts/{root_account_id}/sis_imports/{job.sis_import_id}")
+    if not response.ok:
+        print(f"[{datetime.now()}] SIS import {job.sis_import_id} status failed: {response.status_code}")
+        return job
+    sis_import = response.json()
+    job.progress = sis_import.get("progress") or job.progress
+    if sis_import.get("workflow_state") in SIS_DONE:
+        _finish(job, _sis_results(json.loads(job.users or "[]"), sis_import),
+                message=f"SIS import {job.sis_import_id}: {sis_import.get('workflow_state')}")
+    db.session.commit()
+    return job
+
+def job_dict(job):
+    return {
+        "id": job.id, "method": job.method, "status": job.status, "progress": job.progress,
+        "total": job.total, "succeeded": job.succeeded, "failed": job.failed,
+        "message": job.message, "results": json.loads(job.results) if job.results else [],
+    }
@@ -0,0 +1,242 @@
+from app import config, db
+from app.canvas_events import CanvasEvent, fetch_events_by_window
+from app.models import CanvasCalendarEvent, CanvasEventSyncState
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import IntegrityError
+import hashlib
+import json
+import threading
+
+# Local store of Canvas calendar events (CANVAS_EVENTS), read by the ICS job and the Panopto
+# scheduler instead of listing every event from Canvas on every run or page load.
+#
+# Each context (course_123) remembers in CANVAS_EVENT_SYNC_STATE the UTC window it mirrors
+# and when it was last synced. load_events_by_window() syncs only the contexts whose copy is
+# missing, does not cover the requested window, or is older than CANVAS_EVENT_SYNC_TTL, then
+# answers from the table (indexed on context_code, start_at).
+#
+# Canvas cannot list calendar events changed since a timestamp, so a delta sync refetches the
+# part of the window from CANVAS_EVENT_SYNC_LOOKBACK_DAYS ago onwards (past events rarely
+# change) and windows of courses that are over cost nothing. Every CANVAS_EVENT_FULL_SYNC_HOURS
+# a context is refetched over its whole window. Rows are only written when an event's content
+# hash changed; stored events lying inside a fetched window that Canvas no longer returns are
+# marked deleted. A context whose listing failed keeps its last copy.
+
+QUERY_CHUNK = 500  # context codes per IN (...) list; MSSQL allows 2100 parameters
+
+_sync_lock = threading.Lock()
+
+def _naive_utc(value):
+    """date/datetime (aware, or naive UTC) -> naive UTC datetime; dates become midnight."""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+    return datetime.combine(value, datetime.min.time())
+
+def _parse_utc(value):
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).astimezone(timezone.utc).replace(tzinfo=None)
+
+def _requested(start, end):
+    """
+    A window with fetch_events' defaults: start now, end a year after start. The end is
+    rounded up to midnight, so a window computed from the current time (e.g. the scheduler's
+    utcnow() + 90 days for a term without an end date) stays inside the stored one all day
+    instead of overshooting it, and so resyncing it, on every read.
+    """
+    start = _naive_utc(start) or datetime.utcnow()
+    end = _naive_utc(end) or start + timedelta(days=365)
+    midnight = end.replace(hour=0, minute=0, second=0, microsecond=0)
+    return start, midnight if midnight == end else midnight + timedelta(days=1)
+
+def _chunks(items):
+    for i in range(0, len(items), QUERY_CHUNK):
+        yield items[i:i + QUERY_CHUNK]
+
+def _states(codes):
+    states = {}
+    for chunk in _chunks(codes):
+        for state in (CanvasEventSyncState.query.populate_existing()
+                      .filter(CanvasEventSyncState.context_code.in_(chunk))):
+            states[state.context_code] = state
+    return states
+
+def _is_fresh(state, start, end, max_age):
+    if state is None or state.last_sync_at is None or state.window_start is None:
+        return False
+    if start < state.window_start or end > state.window_end:
+        return False
+    return datetime.now() - state.last_sync_at < timedelta(seconds=max_age)
+
+def _apply(row, event, now):
+    """Copy a CanvasEvent onto row if its content changed; returns True when it did."""
+    raw = json.dumps(event.raw, sort_keys=True, default=str)
+    digest = hashlib.sha1(raw.encode("utf-8")).hexdigest()
+    if row.content_hash == digest and not row.deleted:
+        return False
+    row.context_code = event.context_code
+    row.title = (event.title or "")[:500]
+    row.is_all_day = event.is_all_day
+    row.start_at = _naive_utc(event.start)
+    row.end_at = _naive_utc(event.end)
+    row.location_name = (event.location_name or "")[:500]
+    row.raw = raw
+    row.updated_at = _parse_utc(event.raw.get("updated_at"))
+    row.content_hash = digest
+    row.synced_at = now
+    row.deleted = False
+    return True
+
+def _inside(row, start, end):
+    return row.start_at is not None and row.start_at >= start and (row.end_at or row.start_at) <= end
+
+# ---- Sync ----
+
+def sync_contexts(windows, full=False):
+    """
+    Bring the stored events of {context_code: (start, end)} (naive UTC) up to date with
+    Canvas. Returns the set of context codes whose listing failed.
+    """
+    now, utc_now = datetime.now(), datetime.utcnow()
+    horizon = utc_now.replace(minute=0, second=0, microsecond=0) - timedelta(
+        days=getattr(config, "CANVAS_EVENT_SYNC_LOOKBACK_DAYS", 7))
+    full_every = timedelta(hours=getattr(config, "CANVAS_EVENT_FULL_SYNC_HOURS", 24))
+    states = _states(list(windows))
+
+    plan = {}  # code -> (fetch_start, fetch_end, window_start, window_end, full)
+    for code, (start, end) in windows.items():
+        state = states.get(code)
+        covered = state is not None and state.window_start is not None
+        window_start = min(start, state.window_start) if covered else start
+        window_end = max(end, state.window_end) if covered else end
+        is_full = (full or not covered or state.last_full_sync_at is None
+                   or now - state.last_full_sync_at >= full_every)
+        if is_full or start < state.window_start:
+            fetch_start = window_start
+        else:
+            fetch_start = max(window_start, min(horizon, state.window_end))
+        plan[code] = (fetch_start, window_end, window_start, window_end, is_full)
+
+    failed = set()
+    to_fetch = [(code, p[0], p[1]) for code, p in plan.items() if p[0] < p[1]]
+    fetched = fetch_events_by_window(to_fetch, failed=failed) if to_fetch else {}
+
+    # Every stored row the fetched events can match, in set-based queries: the planned contexts'
+    # rows, then events Canvas now lists under them that were stored under another context
+    rows_by_code, stored = {}, {}
+    for chunk in _chunks(list(plan)):
+        for row in CanvasCalendarEvent.query.filter(CanvasCalendarEvent.context_code.in_(chunk)):
+            rows_by_code.setdefault(row.context_code, {})[row.id] = stored[row.id] = row
+    moved = [event.id for code, events in fetched.items() if code not in failed
+             for event in events if event.id not in stored]
+    for chunk in _chunks(moved):
+        for row in CanvasCalendarEvent.query.filter(CanvasCalendarEvent.id.in_(chunk)):
+            stored[row.id] = row
+
+    changed = removed = 0
+    with db.session.no_autoflush:
+        for code, (fetch_start, fetch_end, window_start, window_end, is_full) in plan.items():
+            if code in failed:
+                continue
+            rows = rows_by_code.setdefault(code, {})
+            seen = set()
+            for event in fetched.get(code, []):
+                seen.add(event.id)
+                row = stored.get(event.id)
+                if row is None:
+                    row = stored[event.id] = CanvasCalendarEvent(id=event.id)
+                    db.session.add(row)
+                rows[event.id] = row
+                changed += _apply(row, event, now)
+            if fetch_start < fetch_end:
+                for row in rows.values():
+                    if (row.context_code == code and not row.deleted and row.id not in seen
+                            and _inside(row, fetch_start, fetch_end)):
+                        row.deleted, row.content_hash, row.synced_at = True, None, now
+                        removed += 1
+
+            state = states.get(code)
+            if state is None:
+                state = states[code] = CanvasEventSyncState(context_code=code)
+                db.session.add(state)
+            live = [row for row in rows.values() if not row.deleted and row.context_code == code]
+            state.window_start, state.window_end = window_start, window_end
+            state.event_count = len(live)
+            state.max_updated_at = max((row.updated_at for row in live if row.updated_at),
+                                       default=state.max_updated_at)
+            state.last_sync_at = now
+            if is_full:
+                state.last_full_sync_at = now
+
+    try:
+        db.session.commit()
+    except IntegrityError as e:
+        # Another worker process stored the same new events first; its copy is as good
+        db.session.rollback()
+        print(f"[{datetime.now()}] Canvas event store sync collided with another sync: {e}")
+        return failed
+    print(f"[{datetime.now()}] Canvas event store: {len(plan)} contexts synced "
+          f"({sum(p[4] for p in plan.values())} full, {len(to_fetch)} fetched), {changed} events new or changed, "
+          f"{removed} removed, {len(failed)} failed")
+    return failed
+
+# ---- Read API (same shapes as app/canvas_events.py) ----
+
+def load_events_by_window(windows, max_age=None, full=False):
+    """
+    Events for (context_code, start, end) triples from the store, syncing the contexts that
+    need it first (all of them, over their whole windows, with full=True). Returns
+    {context_code: [CanvasEvent]} like canvas_events.fetch_events_by_window.
+    """
+    requested = {}
+    for code, start, end in windows:
+        start, end = _requested(start, end)
+        if code in requested:
+            start, end = min(start, requested[code][0]), max(end, requested[code][1])
+        requested[code] = (start, end)
+    if not getattr(config, "CANVAS_EVENT_STORE", True):
+        return fetch_events_by_window((code, start, end) for code, (start, end) in requested.items())
+
+    if max_age is None:
+        max_age = getattr(config, "CANVAS_EVENT_SYNC_TTL", 900)
+    states = _states(list(requested))
+    stale = {code: window for code, window in requested.items()
+             if full or not _is_fresh(states.get(code), *window, max_age)}
+    if stale:
+        with _sync_lock:
+            if not full:
+                # Another request may have synced them while we waited
+                states = _states(list(stale))
+                stale = {code: window for code, window in stale.items()
+                         if not _is_fresh(states.get(code), *window, max_age)}
+            if stale:
+                sync_contexts(stale, full=full)
+
+    results = {code: [] for code in requested}
+    by_window = {}
+    for code, window in requested.items():
+        by_window.setdefault(window, []).append(code)
+    for (start, end), codes in by_window.items():
+        for chunk in _chunks(codes):
+            query = CanvasCalendarEvent.query.filter(
+                CanvasCalendarEvent.context_code.in_(chunk),
+                CanvasCalendarEvent.deleted == False,
+                CanvasCalendarEvent.start_at <= end,
+                or_(CanvasCalendarEvent.end_at >= start,
+                    and_(CanvasCalendarEvent.end_at == None, CanvasCalendarEvent.start_at >= start)),
+            ).order_by(CanvasCalendarEvent.start_at, CanvasCalendarEvent.id)
+            for row in query:
+                results[row.context_code].append(CanvasEvent.from_api(json.loads(row.raw)))
+    return results
+
+def load_events(context_codes, start=None, end=None, max_age=None):
+    """Stored events of every context code between start and end, as a list sorted by start (like fetch_events)."""
+    if isinstance(context_codes, str):
+        context_codes = [context_codes]
+    by_context = load_events_by_window(((code, start, end) for code in context_codes), max_age=max_age)
+    events = [event for events in by_context.values() for event in events]
+    events.sort(key=lambda event: event.sort_key)
+    return events
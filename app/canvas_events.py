@@ -0,0 +1,161 @@
+from app import config
+from app.canvas_api import CANVAS_API_BASE, get_paginated
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+import pytz
+
+# Calendar event fetching shared by the Panopto scheduler and the ICS generator.
+#
+# /calendar_events takes a list of context_codes[] (course_123, ...), but Canvas only honours
+# the first CANVAS_EVENT_CONTEXTS_PER_REQUEST of them, so the codes are split into batches of
+# that size. Batches run concurrently (CANVAS_EVENT_WORKERS at a time) and each batch walks its
+# pages through canvas_api.get_paginated; canvas_api caps the total requests in flight.
+#
+# Each Canvas event is normalised once into a CanvasEvent: all-day events carry dates, timed
+# events carry aware UTC datetimes. to_dict() gives the dictionary shape the templates use.
+
+PACIFIC_TZ = pytz.timezone("America/Los_Angeles")
+
+@dataclass
+class CanvasEvent:
+    id: int
+    context_code: str
+    title: str
+    is_all_day: bool
+    start: object  # date for all-day events, aware UTC datetime otherwise (None if Canvas sent none)
+    end: object
+    location_name: str = ""
+    description: str = ""
+    raw: dict = field(default_factory=dict, repr=False)
+
+    @classmethod
+    def from_api(cls, data):
+        if data.get("all_day") and data.get("all_day_date"):
+            day = datetime.strptime(data["all_day_date"], "%Y-%m-%d").date()
+            start, end, is_all_day = day, day + timedelta(days=1), True
+        else:
+            start, end, is_all_day = _parse_utc(data.get("start_at")), _parse_utc(data.get("end_at")), False
+        return cls(
+            id=data["id"],
+            context_code=data.get("context_code", ""),
+            title=data.get("title") or "",
+            is_all_day=is_all_day,
+            start=start,
+            end=end,
+            location_name=data.get("location_name") or "",
+            description=data.get("description") or "",
+            raw=data,
+        )
+
+    @property
+    def sort_key(self):
+        """Start as an aware datetime (all-day events at midnight UTC); undated events sort last."""
+        if self.start is None:
+            return datetime.max.replace(tzinfo=timezone.utc)
+        if self.is_all_day:
+            return datetime.combine(self.start, datetime.min.time(), tzinfo=timezone.utc)
+        return self.start
+
+    def to_dict(self):
+        """The Canvas JSON plus the fields get_canvas_events has always added."""
+        event = dict(self.raw)
+        if self.is_all_day:
+            event["start_at"] = self.start.strftime("%Y%m%d")  # 20251017
+            event["end_at"] = self.end.strftime("%Y%m%d")      # 20251018
+            event["is_all_day"] = True
+        else:
+            if self.start is not None:
+                event["local_start_at"] = self.start.astimezone(PACIFIC_TZ).strftime('%m/%d/%Y %I:%M %p')
+            if self.end is not None:
+                event["local_end_at"] = self.end.astimezone(PACIFIC_TZ).strftime('%m/%d/%Y %I:%M %p')
+        return event
+
+def _parse_utc(value):
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).astimezone(timezone.utc)
+
+def _utc_string(value):
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    if isinstance(value, date):
+        return value.strftime('%Y-%m-%d')
+    return value
+
+def _window(start, end, all_events):
+    """Query parameters for a date window; start defaults to now and end to a year after start."""
+    if all_events:
+        return (("all_events", "true"),)
+    if start is None:
+        start = datetime.now(timezone.utc)
+    if end is None:
+        start_dt = start if isinstance(start, datetime) else _parse_utc(_utc_string(start))
+        end = start_dt + timedelta(days=365)
+    return (("start_date", _utc_string(start)), ("end_date", _utc_string(end)))
+
+def _fetch_batch(codes, window, failed=None):
+    params = {"per_page": 100, "state[]": "available", "context_codes[]": list(codes)}
+    params.update(window)
+    try:
+        # A failed page is logged and ends that batch's listing, unless the caller tracks failures
+        items = get_paginated(f"{CANVAS_API_BASE}/calendar_events", params=params, raise_errors=failed is not None)
+    except Exception as e:
+        print(f"[{datetime.now()}] Canvas calendar events failed for {len(codes)} contexts: {e}")
+        if failed is not None:
+            failed.update(codes)
+        return []
+    return [CanvasEvent.from_api(item) for item in items]
+
+def fetch_events_by_window(windows, all_events=False, max_workers=None, failed=None):
+    """
+    Fetch events for (context_code, start, end) triples, each context with its own window.
+
+    Contexts sharing a window are batched together. Returns {context_code: [CanvasEvent]} with
+    every requested code present; events keep Canvas's order within a context. If a set is
+    passed as failed, the codes of batches that could not be listed completely are added to it
+    (instead of returning what came before the failed page).
+    """
+    batch_size = getattr(config, "CANVAS_EVENT_CONTEXTS_PER_REQUEST", 10)
+    if max_workers is None:
+        max_workers = getattr(config, "CANVAS_EVENT_WORKERS", 6)
+
+    by_window = {}
+    for code, start, end in windows:
+        codes = by_window.setdefault(_window(start, end, all_events), [])
+        if code not in codes:
+            codes.append(code)
+
+    batches = [(codes[i:i + batch_size], window)
+               for window, codes in by_window.items()
+               for i in range(0, len(codes), batch_size)]
+
+    results = {code: [] for codes, _ in batches for code in codes}
+    if not batches:
+        return results
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(batches)))) as executor:
+        fetched = list(executor.map(lambda batch: _fetch_batch(*batch, failed=failed), batches))
+
+    seen = set()
+    for events in fetched:
+        for event in events:
+            if event.id in seen:
+                continue
+            seen.add(event.id)
+            results.setdefault(event.context_code, []).append(event)
+    return results
+
+def fetch_events(context_codes, start=None, end=None, all_events=False, max_workers=None):
+    """
+    Fetch the events of every context code between start and end (datetimes or dates; start
+    defaults to now, end to a year after start). Returns a list of CanvasEvent sorted by start.
+    """
+    if isinstance(context_codes, str):
+        context_codes = [context_codes]
+    by_context = fetch_events_by_window(((code, start, end) for code in context_codes),
+                                        all_events=all_events, max_workers=max_workers)
+    events = [event for events in by_context.values() for event in events]
+    events.sort(key=lambda event: event.sort_key)
+    return events
@@ -0,0 +1,233 @@
+from app import canvas_api, config
+from app.canvas_api import CANVAS_API_BASE, get_paginated
+from app.canvas_catalog import STATE_FILTER
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# Course, term and section metadata for whole accounts in as few round trips as possible.
+#
+# GraphQL is only used where it removes REST's one request per course for its sections, i.e.
+# for maps with include_sections=True, which get each course's term and sections in the
+# same node and only the fields in COURSE_FIELDS:
+#
+#   - with a term: term(id:) { coursesConnection } pages the term's courses, which are kept
+#     when their account is one of the requested accounts or a sub-account of one
+#   - without a term: several accounts are queried in one request through aliases
+#     (a0: account(id: ...), a1: ...), each walking its own coursesConnection cursor
+#
+# Maps without sections (the Panopto scheduler's term map, the ICS job's state=["available"]
+# map) stay on REST: one sweep per account with enrollment_term_id / state[] filtered on the
+# server, where the connections would pull every course of the root account's term or every
+# course the accounts ever had, plus the sub-account and blueprint listings below.
+#
+# Neither connection can leave out blueprint courses, which the course maps never include
+# (REST: blueprint=false). They are dropped by id, from one blueprint=true REST listing per
+# account (usually a handful of courses).
+#
+# GraphQL is optional: when it is turned off (CANVAS_GRAPHQL = False), the endpoint is
+# missing, or Canvas answers with errors (e.g. a field this instance does not know), the
+# accounts are listed through REST instead; after such a permanent failure GraphQL is not
+# tried again in this process (network errors and 5xx only fall back for that call).
+# Either way callers get course dictionaries in the REST shape used across the app.
+
+COURSE_FIELDS = """
+    _id name courseCode sisId state startAt endAt
+    account { _id }
+    term { _id name sisTermId startAt endAt }
+"""
+SECTION_FIELDS = "sectionsConnection { nodes { _id name sisId startAt endAt } }"
+
+_graphql_failed = False
+
+class GraphQLError(Exception):
+    def __init__(self, message, permanent=False):
+        super().__init__(message)
+        self.permanent = permanent  # this Canvas cannot answer the query; a retry will not help
+
+def graphql_url():
+    default = CANVAS_API_BASE.rstrip("/").rsplit("/v1", 1)[0] + "/graphql"
+    return getattr(config, "CANVAS_GRAPHQL_URL", None) or default
+
+def query(document, variables=None):
+    """POST one GraphQL document; returns data or raises GraphQLError."""
+    response = canvas_api.request("POST", graphql_url(), json={"query": document, "variables": variables or {}})
+    if not response.ok:
+        raise GraphQLError(f"HTTP {response.status_code}: {response.text[:200]}",
+                           permanent=400 <= response.status_code < 500)
+    body = response.json()
+    if body.get("errors"):
+        raise GraphQLError("; ".join(e.get("message", "") for e in body["errors"])[:500], permanent=True)
+    return body.get("data") or {}
+
+# ---- GraphQL ----
+
+def _page_size():
+    return getattr(config, "CANVAS_GRAPHQL_PAGE_SIZE", 100)
+
+def _fields(include_sections):
+    return COURSE_FIELDS + (SECTION_FIELDS if include_sections else "")
+
+def _document(aliases, include_sections):
+    params = ", ".join(f"${a}: ID!, ${a}_after: String" for a in aliases)
+    selections = "\n".join(
+        f"{a}: account(id: ${a}) {{ coursesConnection(first: {_page_size()}, after: ${a}_after) "
+        f"{{ nodes {{ ...CourseFields }} pageInfo {{ hasNextPage endCursor }} }} }}"
+        for a in aliases
+    )
+    return f"query Courses({params}) {{\n{selections}\n}}\nfragment CourseFields on Course {{{_fields(include_sections)}}}"
+
+def _term_document(include_sections):
+    return (f"query TermCourses($term: ID!, $after: String) {{\n"
+            f"term(id: $term) {{ coursesConnection(first: {_page_size()}, after: $after) "
+            f"{{ nodes {{ ...CourseFields }} pageInfo {{ hasNextPage endCursor }} }} }}\n}}\n"
+            f"fragment CourseFields on Course {{{_fields(include_sections)}}}")
+
+def _term_dict(term):
+    if not term:
+        return {}
+    return {"id": int(term["_id"]), "name": term.get("name"), "sis_term_id": term.get("sisTermId"),
+            "start_at": term.get("startAt"), "end_at": term.get("endAt")}
+
+def _course_dict(node, account_id):
+    term = _term_dict(node.get("term"))
+    course = {
+        "id": int(node["_id"]),
+        "name": node.get("name") or "Unnamed Course",
+        "course_code": node.get("courseCode"),
+        "sis_course_id": node.get("sisId"),
+        "workflow_state": node.get("state"),
+        "account_id": int(node["account"]["_id"]) if node.get("account") else account_id,
+        "enrollment_term_id": term.get("id"),
+        "start_at": node.get("startAt"),
+        "end_at": node.get("endAt"),
+        "term": term,
+    }
+    if "sectionsConnection" in node:
+        course["sections"] = [
+            {"id": int(s["_id"]), "course_id": course["id"], "name": s.get("name") or "",
+             "sis_section_id": s.get("sisId"), "start_at": s.get("startAt"), "end_at": s.get("endAt")}
+            for s in (node["sectionsConnection"] or {}).get("nodes") or []
+        ]
+    return course
+
+def _load_graphql_accounts(account_ids, include_sections):
+    aliases = {f"a{i}": account_id for i, account_id in enumerate(account_ids)}
+    cursors = {alias: None for alias in aliases}
+    results = {account_id: [] for account_id in account_ids}
+    while cursors:
+        variables = {}
+        for alias, cursor in cursors.items():
+            variables[alias] = str(aliases[alias])
+            variables[f"{alias}_after"] = cursor
+        data = query(_document(list(cursors), include_sections), variables)
+        next_cursors = {}
+        for alias in cursors:
+            connection = ((data.get(alias) or {}).get("coursesConnection")) or {}
+            results[aliases[alias]].extend(_course_dict(node, aliases[alias]) for node in connection.get("nodes") or [])
+            page_info = connection.get("pageInfo") or {}
+            if page_info.get("hasNextPage") and page_info.get("endCursor"):
+                next_cursors[alias] = page_info["endCursor"]
+        cursors = next_cursors
+    return results
+
+def _load_graphql_term(account_ids, term_id, include_sections):
+    """A term's courses through GraphQL, assigned to the requested account they fall under."""
+    with ThreadPoolExecutor(max_workers=max(1, min(len(account_ids), 4))) as executor:
+        trees = dict(zip(account_ids, executor.map(_account_tree, account_ids)))
+    owner = {}
+    for account_id in account_ids:
+        for member in trees[account_id]:
+            owner.setdefault(member, account_id)
+
+    results = {account_id: [] for account_id in account_ids}
+    cursor = None
+    while True:
+        data = query(_term_document(include_sections), {"term": str(term_id), "after": cursor})
+        connection = ((data.get("term") or {}).get("coursesConnection")) or {}
+        for node in connection.get("nodes") or []:
+            account_id = owner.get(int(node["account"]["_id"])) if node.get("account") else None
+            if account_id is not None:
+                results[account_id].append(_course_dict(node, account_id))
+        page_info = connection.get("pageInfo") or {}
+        if not (page_info.get("hasNextPage") and page_info.get("endCursor")):
+            return results
+        cursor = page_info["endCursor"]
+
+def _without_blueprints(results, term_id):
+    with ThreadPoolExecutor(max_workers=max(1, min(len(results), 4))) as executor:
+        blueprints = set().union(*executor.map(lambda a: _blueprint_ids(a, term_id), list(results)))
+    return {account_id: [c for c in courses if c["id"] not in blueprints] for account_id, courses in results.items()}
+
+# ---- REST fallback ----
+
+def _account_tree(account_id):
+    """The account's id and the ids of all its sub-accounts."""
+    subs = get_paginated(f"{CANVAS_API_BASE}/accounts/{account_id}/sub_accounts",
+                         params={'per_page': 100, 'recursive': True})
+    return {int(account_id)} | {a["id"] for a in subs}
+
+def _blueprint_ids(account_id, term_id=None):
+    params = {'per_page': 100, 'blueprint': True}
+    if term_id is not None:
+        params['enrollment_term_id'] = term_id
+    return {c["id"] for c in get_paginated(f"{CANVAS_API_BASE}/accounts/{account_id}/courses", params=params)}
+
+def _load_rest(account_id, term_id, states, include_sections):
+    params = {'per_page': 100, 'blueprint': False, 'include[]': ["term"]}
+    if term_id is not None:
+        params['enrollment_term_id'] = term_id
+    if states:
+        params['state[]'] = states
+    courses = get_paginated(f"{CANVAS_API_BASE}/accounts/{account_id}/courses", params=params)
+    if include_sections and courses:
+        with ThreadPoolExecutor(max_workers=getattr(config, "CANVAS_PAGE_WORKERS", 4)) as executor:
+            sections = list(executor.map(
+                lambda c: get_paginated(f"{CANVAS_API_BASE}/courses/{c['id']}/sections", params={'per_page': 100}),
+                courses))
+        for course, course_sections in zip(courses, sections):
+            course["sections"] = course_sections
+    return courses
+
+# ---- Public ----
+
+def _wanted(course, term_id, states):
+    if term_id is not None and str(course.get("enrollment_term_id")) != str(term_id):
+        return False
+    state = STATE_FILTER.get(course.get("workflow_state"), course.get("workflow_state"))
+    if states:
+        return state in {STATE_FILTER.get(s, s) for s in ([states] if isinstance(states, str) else states)}
+    return state != "deleted"
+
+def load_courses(account_ids, term_id=None, states=None, include_sections=False):
+    """
+    Courses of several Canvas accounts (sub-accounts included) with their terms and,
+    optionally, their sections. Returns {account_id: [course dict]}, each sorted by name.
+
+    term_id and states filter like the REST enrollment_term_id / state[] parameters
+    (default: everything but deleted courses). Blueprint courses are never included.
+    """
+    global _graphql_failed
+    account_ids = list(dict.fromkeys(account_ids))
+    results = None
+    use_graphql = getattr(config, "CANVAS_GRAPHQL", True) and not _graphql_failed
+    if account_ids and use_graphql and include_sections:
+        try:
+            if term_id is not None:
+                results = _load_graphql_term(account_ids, term_id, include_sections)
+            else:
+                results = _load_graphql_accounts(account_ids, include_sections)
+            results = _without_blueprints(results, term_id)
+        except Exception as e:
+            _graphql_failed = getattr(e, "permanent", False)
+            print(f"[{datetime.now()}] Canvas GraphQL course query failed, using REST"
+                  f"{' from now on' if _graphql_failed else ''}: {e}")
+
+    if results is None:
+        with ThreadPoolExecutor(max_workers=max(1, min(len(account_ids), 4))) as executor:
+            listings = list(executor.map(lambda a: _load_rest(a, term_id, states, include_sections), account_ids))
+        results = dict(zip(account_ids, listings))
+
+    return {
+        account_id: sorted((c for c in courses if _wanted(c, term_id, states)), key=lambda c: c.get("name") or "")
+        for account_id, courses in results.items()
+    }
@@ -0,0 +1,93 @@
+from app import config, db
+from app.canvas_api import CANVAS_API_BASE, get_paginated
+from app.models import CanvasRoster, CanvasRosterMember
+from datetime import datetime, timedelta
+from sqlalchemy import and_, insert
+import hashlib
+import threading
+
+# Course rosters (SIS user ids per course and enrollment type), shared by the student list,
+# enrollment and photo card pages.
+#
+# A course filter used to fetch the course's enrollments from Canvas on every page load and
+# then filter Student.pid.in_(...), one bound parameter per student, which MSSQL refuses past
+# 2100 parameters. Rosters are now staged in CANVAS_ROSTER_MEMBERS and queries join against
+# that table, so the size of a roster never reaches the SQL text.
+#
+# A roster is refetched when it is older than CANVAS_ROSTER_TTL seconds (or when a caller
+# asks for refresh), and the member rows are only rewritten when the ids changed. If Canvas
+# fails, the last staged roster keeps being used.
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+def _lock(key):
+    with _locks_guard:
+        return _locks.setdefault(key, threading.Lock())
+
+def _fetch_ids(course_id, enrollment_type):
+    params = {'per_page': 100, 'type[]': enrollment_type, 'include[]': 'user'}
+    enrollments = get_paginated(f"{CANVAS_API_BASE}/courses/{course_id}/enrollments", params=params)
+    return sorted({e['user']['sis_user_id'] for e in enrollments if (e.get('user') or {}).get('sis_user_id')})
+
+def _is_fresh(roster):
+    if roster is None or roster.synced_at is None:
+        return False
+    return datetime.now() - roster.synced_at < timedelta(seconds=getattr(config, "CANVAS_ROSTER_TTL", 900))
+
+def refresh_roster(course_id, enrollment_type="StudentEnrollment"):
+    """Refetch a roster from Canvas and restage it if it changed. Returns the CanvasRoster."""
+    ids = _fetch_ids(course_id, enrollment_type)
+    digest = hashlib.sha1("\n".join(ids).encode("utf-8")).hexdigest()
+
+    roster = db.session.get(CanvasRoster, (course_id, enrollment_type))
+    if roster is None:
+        roster = CanvasRoster(course_id=course_id, enrollment_type=enrollment_type)
+        db.session.add(roster)
+    if roster.content_hash != digest:
+        CanvasRosterMember.query.filter_by(course_id=course_id, enrollment_type=enrollment_type) \
+            .delete(synchronize_session=False)
+        if ids:
+            db.session.execute(insert(CanvasRosterMember), [
+                {"course_id": course_id, "enrollment_type": enrollment_type, "sis_user_id": sis_id} for sis_id in ids
+            ])
+        roster.content_hash = digest
+        roster.member_count = len(ids)
+    roster.synced_at = datetime.now()
+    db.session.commit()
+    return roster
+
+def ensure_roster(course_id, enrollment_type="StudentEnrollment", refresh=False):
+    """Make sure a staged roster exists and is fresh enough; returns it, or None if it could not be fetched."""
+    course_id = int(course_id)
+    roster = db.session.get(CanvasRoster, (course_id, enrollment_type))
+    if not refresh and _is_fresh(roster):
+        return roster
+
+    with _lock((course_id, enrollment_type)):
+        # Another request may have refreshed it while we waited
+        if roster is not None:
+            db.session.refresh(roster)
+        else:
+            roster = db.session.get(CanvasRoster, (course_id, enrollment_type))
+        if not refresh and _is_fresh(roster):
+            return roster
+        try:
+            return refresh_roster(course_id, enrollment_type)
+        except Exception as e:
+            db.session.rollback()
+            print(f"[{datetime.now()}] Canvas roster refresh failed for course {course_id}: {e}")
+            return db.session.get(CanvasRoster, (course_id, enrollment_type))
+
+def filter_enrolled(query, sis_id_column, course_id, enrollment_type="StudentEnrollment", refresh=False):
+    """
+    Restrict query to rows whose sis_id_column (e.g. Student.pid) is on the course roster,
+    by joining the staged ids. A roster that has never been fetched matches nothing.
+    """
+    course_id = int(course_id)
+    ensure_roster(course_id, enrollment_type, refresh=refresh)
+    return query.join(CanvasRosterMember, and_(
+        CanvasRosterMember.course_id == course_id,
+        CanvasRosterMember.enrollment_type == enrollment_type,
+        CanvasRosterMember.sis_user_id == sis_id_column,
+    ))
@@ -0,0 +1,118 @@
+from app import config
+from contextlib import contextmanager
+from datetime import datetime
+import threading
+import time
+
+# Adaptive concurrency for Canvas API calls.
+#
+# Canvas throttles per access token with a leaky bucket: every response reports what is left
+# in X-Rate-Limit-Remaining and what the request cost in X-Request-Cost, and once the bucket
+# is empty requests fail with 403 "Rate Limit Exceeded". Every Canvas request in this process
+# (app/canvas_api.py) holds a slot from the shared limiter while it is in flight. The number
+# of slots follows the bucket, additive increase / multiplicative decrease:
+#
+#   - remaining above CANVAS_RATE_LIMIT_HIGH: one more slot (up to CANVAS_MAX_CONCURRENCY)
+#   - remaining below CANVAS_RATE_LIMIT_LOW: half the slots (at most once per cost window)
+#   - throttled (403): down to CANVAS_MIN_CONCURRENCY and every caller pauses until the
+#     bucket has had time to drain
+#
+# Callers beyond the current limit wait in line, so bulk fetches run as fast as Canvas allows
+# without tripping the throttle.
+
+DECREASE_INTERVAL = 1.0  # seconds between halvings, so one burst of low readings counts once
+
+class AdaptiveLimiter:
+    def __init__(self, min_limit, max_limit, low_water, high_water):
+        self.min_limit = max(min_limit, 1)
+        self.max_limit = max(max_limit, self.min_limit)
+        self.low_water = low_water
+        self.high_water = high_water
+        self.limit = max(self.max_limit // 2, self.min_limit)
+        self.in_flight = 0
+        self.waiting = 0
+        self.remaining = None
+        self.cost = None
+        self.throttles = 0
+        self.peak_in_flight = 0
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def slot(self):
+        """Hold one in-flight slot for the duration of a request, waiting if none is free."""
+        with self._cond:
+            self.waiting += 1
+            try:
+                while True:
+                    pause = self._paused_until - time.monotonic()
+                    if pause <= 0 and self.in_flight < self.limit:
+                        break
+                    self._cond.wait(timeout=pause if pause > 0 else None)
+            finally:
+                self.waiting -= 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.in_flight -= 1
+                self._cond.notify_all()
+
+    def observe(self, response):
+        """Adjust the limit from a Canvas response's rate-limit headers."""
+        remaining = _header_float(response, "X-Rate-Limit-Remaining")
+        cost = _header_float(response, "X-Request-Cost")
+        with self._cond:
+            if cost is not None:
+                self.cost = cost if self.cost is None else 0.8 * self.cost + 0.2 * cost
+            if remaining is None:
+                return
+            self.remaining = remaining
+            now = time.monotonic()
+            if remaining < self.low_water:
+                if now - self._last_decrease >= DECREASE_INTERVAL:
+                    self.limit = max(self.limit // 2, self.min_limit)
+                    self._last_decrease = now
+            elif remaining > self.high_water and self.limit < self.max_limit:
+                self.limit += 1
+            self._cond.notify_all()
+
+    def throttled(self, delay):
+        """Canvas refused a request: drop to the minimum and pause everyone for delay seconds."""
+        with self._cond:
+            self.throttles += 1
+            self.limit = self.min_limit
+            self.remaining = 0
+            self._last_decrease = time.monotonic()
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        print(f"[{datetime.now()}] Canvas rate limit hit; pausing {delay:.1f}s at {self.min_limit} concurrent request(s)")
+
+    def snapshot(self):
+        with self._cond:
+            return {
+                "limit": self.limit, "max_limit": self.max_limit, "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight, "waiting": self.waiting,
+                "remaining": self.remaining, "cost": self.cost, "throttles": self.throttles,
+            }
+
+def _header_float(response, name):
+    try:
+        return float(response.headers.get(name))
+    except (TypeError, ValueError):
+        return None
+
+def is_throttled(response):
+    """Canvas signals an empty bucket with 403 and "Rate Limit Exceeded" (429 on some instances)."""
+    if response.status_code == 429:
+        return True
+    return response.status_code == 403 and "rate limit exceeded" in response.text[:500].lower()
+
+limiter = AdaptiveLimiter(
+    min_limit=getattr(config, "CANVAS_MIN_CONCURRENCY", 1),
+    max_limit=getattr(config, "CANVAS_MAX_CONCURRENCY", 8),
+    low_water=getattr(config, "CANVAS_RATE_LIMIT_LOW", 150),
+    high_water=getattr(config, "CANVAS_RATE_LIMIT_HIGH", 400),
+)
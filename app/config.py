@@ -2,5 +2,121 @@ MAIL_SERVER = 'smtp.ucsd.edu'
 MAIL_PORT = 587
 MAIL_USE_TLS = True
 MAIL_DEFAULT_SENDER = 'bugcatcher-pils@ucsd.edu'
+MAIL_USERNAME = None
+MAIL_PASSWORD = None
+MAIL_SMTP_IDLE_SECONDS = 60       # re-check the reused SMTP connection after this much idle time
+MAIL_QUEUE_ENABLED = True         # start the background sender for OUTBOUND_EMAILS in this process
+MAIL_QUEUE_POLL_SECONDS = 30
+MAIL_QUEUE_BATCH_SIZE = 20
+MAIL_QUEUE_LEASE_SECONDS = 600    # reclaim messages left 'Sending' by a crashed worker
+MAIL_RETRY_MAX_ATTEMPTS = 6
+MAIL_RETRY_BASE_SECONDS = 30      # backoff doubles per attempt
+MAIL_RETRY_MAX_SECONDS = 3600
 ADMINS = 'epigon@health.ucsd.edu,sspps-dev@health.ucsd.edu'  # Can also be a list of emails
-DEBUG = False
\ No newline at end of file
+DEBUG = False
+
+# Database engines (app/db_engine.py), shared by the app and the import scripts
+DB_POOL_SIZE = 10                 # per process; wfastcgi runs several processes
+DB_MAX_OVERFLOW = 20
+DB_POOL_TIMEOUT = 30
+DB_POOL_RECYCLE = 1800            # seconds; recycle before SQL Server / firewalls drop idle connections
+DB_POOL_PRE_PING = True
+DB_LOGIN_TIMEOUT = 15
+DB_STATEMENT_TIMEOUT = 60         # seconds, web requests
+DB_BATCH_STATEMENT_TIMEOUT = 900  # seconds, import scripts
+DB_CREATE_ALL = True              # run db.create_all() at start-up; set False in production (use migrations)
+
+# Error email digests (app/logger.py)
+ERROR_EMAIL_FLUSH_SECONDS = 60   # collect errors this long before sending one digest
+ERROR_EMAIL_DEDUP_SECONDS = 900  # an error already emailed within this window is only counted
+ERROR_EMAIL_BATCH_SIZE = 20      # send early once this many distinct errors are pending
+
+# Per-request SQL instrumentation (query counts, DB time, N+1 detection). See app/sql_instrumentation.py
+SQL_INSTRUMENTATION = False
+SQL_N_PLUS_ONE_THRESHOLD = 10
+
+# Outbound HTTP to Canvas, Emma, Google and reCAPTCHA (app/http_client.py)
+HTTP_CONNECT_TIMEOUT = 5      # seconds
+HTTP_READ_TIMEOUT = 30        # seconds
+HTTP_POOL_MAXSIZE = 16        # keep-alive connections per host
+HTTP_RETRY_MAX_ATTEMPTS = 4   # including the first try
+HTTP_RETRY_BASE_SECONDS = 0.5 # doubled on each retry unless the server sends Retry-After
+HTTP_RETRY_MAX_SECONDS = 60
+
+# Shared cache for external API results (Flask-Caching; app/api_cache.py). FileSystemCache is
+# shared by every worker process on the server; SimpleCache would be per process.
+CACHE_TYPE = 'FileSystemCache'
+CACHE_DIR = 'cache'               # relative to the app package, like logs/
+CACHE_DEFAULT_TIMEOUT = 300
+CACHE_THRESHOLD = 2000            # max entries before the oldest are pruned
+API_CACHE_TTLS = {                # seconds, per namespace
+    'canvas_terms': 3600,
+    'canvas_courses': 900,
+    'canvas_user_search': 600,
+    'panopto_folders': 900,
+    'panopto_recorders': 3600,
+    'emma_groups': 600,
+    'google_members': 300,
+}
+
+# Canvas list endpoints (app/canvas_api.py): concurrent page fetches per listing when Canvas
+# sends a rel="last" link. Keep workers x concurrent listings near HTTP_POOL_MAXSIZE.
+CANVAS_PAGE_WORKERS = 4
+
+# Local Canvas stand-in (canvas_standin.py): when set, every Canvas call goes here instead of
+# app.cred.CANVAS_API_BASE, e.g. 'http://localhost:8765/api/v1'. Never set on production.
+CANVAS_STANDIN_URL = None
+
+# Adaptive Canvas concurrency (app/canvas_throttle.py), driven by X-Rate-Limit-Remaining. The
+# limit moves between MIN and MAX: up while the bucket stays above HIGH, halved below LOW.
+CANVAS_MIN_CONCURRENCY = 1
+CANVAS_MAX_CONCURRENCY = 8    # Canvas requests in flight at once, across all listings
+CANVAS_RATE_LIMIT_LOW = 150   # Canvas starts each token with 700
+CANVAS_RATE_LIMIT_HIGH = 400
+CANVAS_THROTTLE_RETRIES = 3   # retries of a request refused with 403 Rate Limit Exceeded
+
+# Calendar events (app/canvas_events.py). Canvas only honours the first 10 context_codes[]
+# of a /calendar_events request; the rest are silently dropped.
+CANVAS_EVENT_CONTEXTS_PER_REQUEST = 10
+CANVAS_EVENT_WORKERS = 6      # batches of context codes fetched at once
+
+# Calendar event store (app/canvas_event_store.py): CANVAS_EVENTS mirrors the events read by the
+# ICS job and the Panopto scheduler. A course is resynced once its copy is older than the TTL;
+# delta syncs refetch events from LOOKBACK_DAYS ago onwards, full syncs the whole window.
+CANVAS_EVENT_STORE = True             # False: list the events from Canvas on every read
+CANVAS_EVENT_SYNC_TTL = 900           # seconds
+CANVAS_EVENT_SYNC_LOOKBACK_DAYS = 7
+CANVAS_EVENT_FULL_SYNC_HOURS = 24
+
+# Canvas GraphQL (app/canvas_graphql.py): course maps with sections of accounts that are not
+# mirrored yet. The URL defaults to CANVAS_API_BASE with /v1 replaced by /graphql.
+CANVAS_GRAPHQL = True
+CANVAS_GRAPHQL_URL = None
+CANVAS_GRAPHQL_PAGE_SIZE = 100   # courses per connection page
+
+# HTML -> text for event descriptions (app/html_text.py): memoized by content hash in an LRU,
+# persisted between runs of the ICS job when a file is set (relative to the app package)
+HTML_TEXT_CACHE_SIZE = 5000
+HTML_TEXT_CACHE_FILE = 'cache/html_text.json'
+
+# Serving the calendar feeds (/calendars/<file>.ics): seconds subscribers and proxies may reuse
+# a feed before revalidating it (with If-None-Match / If-Modified-Since, answered with 304)
+CALENDAR_FEED_MAX_AGE = 900
+
+# Canvas catalog mirror (app/canvas_catalog.py, refreshed by sync_canvas_catalog.py)
+CANVAS_CATALOG_ACCOUNTS = ['SSPPS', 'SOM', 'SPPH', 'HS']
+CANVAS_CATALOG_CLOSED_TERM_DAYS = 30  # delta syncs skip terms that ended longer ago than this
+CANVAS_CATALOG_WORKERS = 4            # concurrent term sweeps / section fetches
+
+# Course rosters staged for the student course filter (app/canvas_rosters.py)
+CANVAS_ROSTER_TTL = 900       # seconds before a roster is refetched from Canvas
+
+# Bulk enrollment (app/canvas_enrollment.py): batches of SIS users at least this large become
+# one Canvas SIS import; the rest are enrolled one request per user, this many at a time
+CANVAS_SIS_IMPORT_MIN_USERS = 25
+CANVAS_ENROLL_WORKERS = 8
+
+# Canvas user typeahead (/canvas/users/search): one page of search_term matches per query.
+# Canvas rejects account user searches shorter than 3 characters.
+CANVAS_USER_SEARCH_MIN_CHARS = 3
+CANVAS_USER_SEARCH_LIMIT = 50
@@ -1,14 +1,17 @@
 # from app import db
 # from . import db
-from cred import server, user, pwd, database  # ensure `database` is defined in cred.py
-from sqlalchemy import create_engine
+from os.path import dirname, join, abspath
+import sys
+
+sys.path.insert(0, abspath(join(dirname(__file__), '..')))  # run from app/, import the app package
+
+from app.cred import database  # ensure `database` is defined in cred.py
+from app.db_engine import create_mssql_engine
 from sqlalchemy.orm import declarative_base
 import chardet
 import pandas as pd
 
-driver="ODBC Driver 17 for SQL Server" 
-connection_string = f'mssql+pyodbc://{user}:{pwd}@{server}/{database}?driver={driver}'
-engine = create_engine(connection_string)
+engine = create_mssql_engine(database)
 
 def import_employees():
     # Step 1: Load the CSV files
@@ -0,0 +1,61 @@
+from app import config
+from app.cred import server, user, pwd, odbcdriver
+from sqlalchemy import create_engine, event
+import urllib.parse
+
+# One place for MSSQL connection settings, shared by create_app (main DB and the 'rechargedb'
+# bind) and the import scripts. Pool sizing, recycle, pre-ping and timeouts come from the
+# DB_* values in app/config.py.
+
+def mssql_url(database):
+    """pyodbc connection URL for a database on the configured server."""
+    connection_str = (
+        f"DRIVER={odbcdriver};"
+        f"SERVER={server};"
+        f"DATABASE={database};"
+        f"UID={user};"
+        f"PWD={pwd};"
+        "TrustServerCertificate=yes;"
+    )
+    return f"mssql+pyodbc:///?odbc_connect={urllib.parse.quote_plus(connection_str)}"
+
+def engine_options():
+    """Keyword arguments for create_engine / SQLALCHEMY_ENGINE_OPTIONS."""
+    return {
+        "pool_size": getattr(config, "DB_POOL_SIZE", 10),
+        "max_overflow": getattr(config, "DB_MAX_OVERFLOW", 20),
+        "pool_timeout": getattr(config, "DB_POOL_TIMEOUT", 30),
+        "pool_recycle": getattr(config, "DB_POOL_RECYCLE", 1800),
+        "pool_pre_ping": getattr(config, "DB_POOL_PRE_PING", True),
+        "fast_executemany": True,  # pyodbc bulk inserts (pandas to_sql, executemany)
+        "connect_args": {"timeout": getattr(config, "DB_LOGIN_TIMEOUT", 15)},
+    }
+
+def configure_engine(engine, statement_timeout=None):
+    """
+    Apply per-connection settings to an engine built elsewhere (e.g. by Flask-SQLAlchemy).
+    statement_timeout: seconds before a statement is cancelled; defaults to DB_STATEMENT_TIMEOUT.
+    """
+    if statement_timeout is None:
+        statement_timeout = getattr(config, "DB_STATEMENT_TIMEOUT", 0)
+
+    @event.listens_for(engine, "connect")
+    def set_statement_timeout(dbapi_connection, connection_record):
+        # pyodbc Connection.timeout is the per-statement query timeout in seconds (0 = none)
+        try:
+            dbapi_connection.timeout = statement_timeout
+        except AttributeError:
+            pass  # not a pyodbc connection
+
+    return engine
+
+def create_mssql_engine(database, statement_timeout=None, **overrides):
+    """
+    Engine for the import scripts, pooled and configured like the app's own engines.
+    Bulk jobs get the longer DB_BATCH_STATEMENT_TIMEOUT unless statement_timeout is given.
+    """
+    if statement_timeout is None:
+        statement_timeout = getattr(config, "DB_BATCH_STATEMENT_TIMEOUT", 0)
+    options = engine_options()
+    options.update(overrides)
+    return configure_engine(create_engine(mssql_url(database), **options), statement_timeout)
@@ -1,12 +1,293 @@
 from app import config
-import subprocess
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from email.utils import formatdate, make_msgid
+import smtplib
+import ssl
+import threading
+import time
 
-def send_email_via_powershell(to_address, to_cc=None, from_address=None, subject=None, body=None, attachment_path=None):
-    
-    ps_script = f'Send-MailMessage -From "{from_address}" -To "{to_address}" -Cc ("{to_cc}","{from_address}") -Subject "{subject}" -Body "{body}" -Attachments "{attachment_path}" -SmtpServer "{config.MAIL_SERVER}" -UseSsl'
+# Outbound mail for the whole app.
+#
+# queue_email() stores a message (and any in-memory attachments) in OUTBOUND_EMAILS and returns
+# immediately; the MailSender thread started by init_mail() delivers it over one reused SMTP
+# connection, retrying with exponential backoff. send_email_now() skips the queue and is meant
+# for callers that already run off the request thread and must not depend on the database
+# (the error-digest log handler).
+#
+# Settings come from app/config.py: MAIL_SERVER, MAIL_PORT, MAIL_USE_TLS, optional
+# MAIL_USERNAME / MAIL_PASSWORD, and the MAIL_QUEUE_* / MAIL_RETRY_* knobs. Point MAIL_SERVER /
+# MAIL_PORT at a local stand-in (smtp_standin.py) with MAIL_USE_TLS = False to test.
 
-    completed = subprocess.run(["powershell", "-Command", ps_script], capture_output=True, text=True)
-    if completed.returncode != 0:
-        print("Error sending mail:", completed.stderr)
+def normalize_addresses(addresses):
+    """Return a clean list of addresses from a list or a comma/semicolon separated string."""
+    if not addresses:
+        return []
+    if isinstance(addresses, str):
+        addresses = addresses.replace(";", ",").split(",")
+    cleaned = [a.strip() for a in addresses if a and a.strip()]
+    return list(dict.fromkeys(cleaned))  # drop duplicates, keep order
+
+def build_message(sender, to, subject, body, cc=None, html=False, attachments=None):
+    """
+    Build an EmailMessage.
+    attachments: iterable of (filename, content_bytes, content_type) tuples.
+    """
+    msg = EmailMessage()
+    msg["From"] = sender
+    msg["To"] = ", ".join(normalize_addresses(to))
+    cc_list = normalize_addresses(cc)
+    if cc_list:
+        msg["Cc"] = ", ".join(cc_list)
+    msg["Subject"] = subject or ""
+    msg["Date"] = formatdate(localtime=True)
+    msg["Message-ID"] = make_msgid()
+
+    if html:
+        msg.set_content("This message requires an HTML capable mail client.")
+        msg.add_alternative(body or "", subtype="html")
     else:
-        print("Mail sent successfully")
\ No newline at end of file
+        msg.set_content(body or "")
+
+    for filename, content, content_type in attachments or []:
+        maintype, _, subtype = (content_type or "application/octet-stream").partition("/")
+        msg.add_attachment(content, maintype=maintype, subtype=subtype or "octet-stream", filename=filename)
+
+    return msg
+
+class SMTPConnection:
+    """A lazily opened, reused SMTP connection. Thread-safe; reconnects when the server drops it."""
+
+    def __init__(self, host, port, use_tls=True, username=None, password=None, timeout=30, idle_timeout=60):
+        self.host = host
+        self.port = port
+        self.use_tls = use_tls
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self._smtp = None
+        self._last_used = 0.0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        smtp.ehlo()
+        if self.use_tls:
+            smtp.starttls(context=ssl.create_default_context())
+            smtp.ehlo()
+        if self.username:
+            smtp.login(self.username, self.password or "")
+        return smtp
+
+    def _ensure_connected(self):
+        if self._smtp is not None and time.monotonic() - self._last_used > self.idle_timeout:
+            # The server has probably timed us out; check before trusting the socket
+            try:
+                if self._smtp.noop()[0] != 250:
+                    self._drop()
+            except (smtplib.SMTPException, OSError):
+                self._drop()
+        if self._smtp is None:
+            self._smtp = self._connect()
+
+    def _drop(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+        self._smtp = None
+
+    def send(self, msg):
+        with self._lock:
+            for attempt in (1, 2):
+                self._ensure_connected()
+                try:
+                    self._smtp.send_message(msg)
+                    self._last_used = time.monotonic()
+                    return
+                except (smtplib.SMTPServerDisconnected, ConnectionError):
+                    self._drop()
+                    if attempt == 2:
+                        raise
+
+    def close(self):
+        with self._lock:
+            self._drop()
+
+_app = None
+_sender = None
+_connection = None
+_connection_lock = threading.Lock()
+
+def _setting(name, default=None):
+    if _app is not None and name in _app.config:
+        return _app.config[name]
+    return getattr(config, name, default)
+
+def get_smtp_connection():
+    """Return the process-wide SMTP connection, creating it from config on first use."""
+    global _connection
+    with _connection_lock:
+        if _connection is None:
+            _connection = SMTPConnection(
+                host=_setting("MAIL_SERVER"),
+                port=_setting("MAIL_PORT", 25),
+                use_tls=_setting("MAIL_USE_TLS", False),
+                username=_setting("MAIL_USERNAME"),
+                password=_setting("MAIL_PASSWORD"),
+                idle_timeout=_setting("MAIL_SMTP_IDLE_SECONDS", 60),
+            )
+        return _connection
+
+def send_email_now(to, subject, body, sender=None, cc=None, html=False, attachments=None):
+    """Send synchronously over the shared SMTP connection. Raises on failure."""
+    sender = sender or _setting("MAIL_DEFAULT_SENDER")
+    msg = build_message(sender, to, subject, body, cc=cc, html=html, attachments=attachments)
+    get_smtp_connection().send(msg)
+
+def queue_email(to, subject, body, sender=None, cc=None, html=False, attachments=None):
+    """
+    Store an email in the outbound queue and wake the sender. Returns the OutboundEmail row.
+    attachments: iterable of (filename, content_bytes, content_type) tuples.
+    Commits the current db.session.
+    """
+    from app import db
+    from app.models import OutboundEmail, OutboundEmailAttachment
+
+    email = OutboundEmail(
+        sender=sender or _setting("MAIL_DEFAULT_SENDER"),
+        to_addresses=", ".join(normalize_addresses(to)),
+        cc_addresses=", ".join(normalize_addresses(cc)) or None,
+        subject=subject or "",
+        body=body,
+        is_html=html,
+        status="Pending",
+        attempts=0,
+        next_attempt_at=datetime.now(),
+    )
+    for filename, content, content_type in attachments or []:
+        email.attachments.append(OutboundEmailAttachment(
+            filename=filename,
+            content=content,
+            content_type=content_type or "application/octet-stream",
+        ))
+    db.session.add(email)
+    db.session.commit()
+
+    if _sender is not None:
+        _sender.wake()
+    return email
+
+class MailSender(threading.Thread):
+    """
+    Background thread that delivers queued OUTBOUND_EMAILS rows.
+
+    Each wfastcgi process runs one; rows are claimed with a conditional UPDATE so only one
+    process sends a given message. A row left in "Sending" by a crashed process is reclaimed
+    after MAIL_QUEUE_LEASE_SECONDS.
+    """
+
+    def __init__(self, app):
+        super().__init__(name="MailSender", daemon=True)
+        self.app = app
+        self.poll_interval = app.config.get("MAIL_QUEUE_POLL_SECONDS", 30)
+        self.batch_size = app.config.get("MAIL_QUEUE_BATCH_SIZE", 20)
+        self.lease = timedelta(seconds=app.config.get("MAIL_QUEUE_LEASE_SECONDS", 600))
+        self.max_attempts = app.config.get("MAIL_RETRY_MAX_ATTEMPTS", 6)
+        self.retry_base = app.config.get("MAIL_RETRY_BASE_SECONDS", 30)
+        self.retry_max = app.config.get("MAIL_RETRY_MAX_SECONDS", 3600)
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+
+    def wake(self):
+        self._wake.set()
+
+    def stop(self):
+        self._stopping.set()
+        self._wake.set()
+
+    def run(self):
+        while not self._stopping.is_set():
+            try:
+                with self.app.app_context():
+                    while self.send_due() and not self._stopping.is_set():
+                        pass
+            except Exception as e:
+                print(f"[{datetime.now()}] MailSender error: {e}")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def _due_filter(self, now):
+        from app.models import OutboundEmail
+        from sqlalchemy import and_, or_
+        return or_(
+            and_(OutboundEmail.status == "Pending", OutboundEmail.next_attempt_at <= now),
+            and_(OutboundEmail.status == "Sending", OutboundEmail.claimed_at < now - self.lease),
+        )
+
+    def send_due(self):
+        """Send one batch of due messages. Returns True if a full batch was processed."""
+        from app import db
+        from app.models import OutboundEmail
+
+        now = datetime.now()
+        ids = [row.id for row in (
+            db.session.query(OutboundEmail.id)
+            .filter(self._due_filter(now))
+            .order_by(OutboundEmail.next_attempt_at)
+            .limit(self.batch_size)
+            .all()
+        )]
+
+        for email_id in ids:
+            claimed = (
+                db.session.query(OutboundEmail)
+                .filter(OutboundEmail.id == email_id, self._due_filter(now))
+                .update({"status": "Sending", "claimed_at": now}, synchronize_session=False)
+            )
+            db.session.commit()
+            if claimed != 1:
+                continue  # another worker took it
+
+            email = db.session.get(OutboundEmail, email_id)
+            self._deliver(email)
+            db.session.commit()
+
+        db.session.remove()
+        return len(ids) == self.batch_size
+
+    def _deliver(self, email):
+        email.attempts += 1
+        try:
+            msg = build_message(
+                email.sender, email.to_addresses, email.subject, email.body,
+                cc=email.cc_addresses, html=email.is_html,
+                attachments=[(a.filename, a.content, a.content_type) for a in email.attachments],
+            )
+            get_smtp_connection().send(msg)
+        except Exception as e:
+            email.last_error = str(e)[:2000]
+            permanent = isinstance(e, smtplib.SMTPResponseException) and e.smtp_code >= 500 \
+                or isinstance(e, smtplib.SMTPRecipientsRefused)
+            if permanent or email.attempts >= self.max_attempts:
+                email.status = "Failed"
+                print(f"[{datetime.now()}] Email {email.id} failed permanently: {e}")
+            else:
+                delay = min(self.retry_base * 2 ** (email.attempts - 1), self.retry_max)
+                email.status = "Pending"
+                email.next_attempt_at = datetime.now() + timedelta(seconds=delay)
+            return
+
+        email.status = "Sent"
+        email.sent_at = datetime.now()
+        email.last_error = None
+
+def init_mail(app):
+    """Bind mail settings to the app and start this process's queue sender."""
+    global _app, _sender
+    _app = app
+    if app.config.get("MAIL_QUEUE_ENABLED", True) and _sender is None:
+        _sender = MailSender(app)
+        _sender.start()
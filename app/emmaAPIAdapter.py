@@ -1,5 +1,6 @@
+from app import http_client
+from app.api_cache import api_cached
 from app.cred import EMMA_ACCOUNT_ID, EMMA_PUBLIC_KEY, EMMA_PRIVATE_KEY
-import requests
 from requests.auth import HTTPBasicAuth
 
 class EmmaAPIAdapter:
@@ -19,7 +20,7 @@ class EmmaAPIAdapter:
 
         while True:
             params["start"] = start
-            response = requests.get(f"{self.base_url}{path}", auth=self.auth, params=params)
+            response = http_client.get(f"{self.base_url}{path}", auth=self.auth, params=params)
             response.raise_for_status()
             page_items = response.json()
 
@@ -34,10 +35,12 @@ class EmmaAPIAdapter:
 
         return all_items
 
+    @api_cached("emma_groups", key=lambda self: ("groups",))
     def get_groups(self):
         """Fetch all Emma groups (handles pagination)"""
         return self._get_all_pages("/groups")
 
+    @api_cached("emma_groups", key=lambda self, group_id: ("members", int(group_id)))
     def get_group_members(self, group_id):
         """Fetch all members of a specific group (handles pagination)"""
         return self._get_all_pages(f"/groups/{group_id}/members")
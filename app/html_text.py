@@ -0,0 +1,115 @@
+from app import config
+from collections import OrderedDict
+from datetime import datetime
+import hashlib
+import json
+import os
+import re
+import threading
+
+# HTML -> plain text for Canvas event descriptions (ICS DESCRIPTION, Panopto sessions).
+#
+# The hourly ICS job converts thousands of descriptions, and almost all of them are the same
+# as last hour. Results are memoized by a hash of the HTML in a bounded LRU
+# (HTML_TEXT_CACHE_SIZE entries). With HTML_TEXT_CACHE_FILE set, the cache is loaded on first
+# use and written back by save(), so the next run of the job starts warm.
+#
+# Parsing uses lxml, which is much faster than BeautifulSoup's html.parser. Text nodes are
+# joined with newlines and runs of blank lines collapsed, as get_text(separator="\n") did.
+# The result is plain text: escaping for ICS is left to the calendar writer.
+
+BLANK_LINES = re.compile(r'\n\s*\n+')
+
+class TextCache:
+    def __init__(self, max_entries, path=None):
+        self.max_entries = max_entries
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._loaded = path is None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        self._loaded = True
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"[{datetime.now()}] HTML text cache {self.path} not loaded: {e}")
+            return
+        for key, text in list(entries.items())[-self.max_entries:]:
+            self._entries[key] = text
+
+    def get(self, key):
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            text = self._entries.get(key)
+            if text is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return text
+
+    def put(self, key, text):
+        with self._lock:
+            self._entries[key] = text
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._dirty = True
+
+    def save(self):
+        """Write the cache to its file (oldest first, so reloading keeps the LRU order)."""
+        if self.path is None or not self._dirty:
+            return
+        from app.calendar_feeds import write_atomic
+        with self._lock:
+            data = json.dumps(self._entries).encode("utf-8")
+            self._dirty = False
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        write_atomic(self.path, data)
+
+def _cache_path():
+    path = getattr(config, "HTML_TEXT_CACHE_FILE", None)
+    if path and not os.path.isabs(path):
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), path)  # relative to the app package
+    return path
+
+cache = TextCache(getattr(config, "HTML_TEXT_CACHE_SIZE", 5000), _cache_path())
+
+def convert(html):
+    """Uncached conversion."""
+    from lxml import etree, html as lxml_html
+
+    try:
+        root = lxml_html.fromstring(html)
+    except (etree.ParserError, ValueError):
+        return html.strip()  # only whitespace, or not parseable as HTML
+    if root.tag in ("script", "style"):
+        return ""
+    for element in root.xpath('.//comment() | .//script | .//style'):
+        element.drop_tree()
+    text = "\n".join(root.itertext())
+    return BLANK_LINES.sub('\n\n', text.strip())
+
+def html_to_text(html):
+    if not html:
+        return ""
+    key = hashlib.sha1(html.encode("utf-8")).hexdigest()
+    text = cache.get(key)
+    if text is None:
+        text = convert(html)
+        cache.put(key, text)
+    return text
+
+def save():
+    try:
+        cache.save()
+    except OSError as e:
+        print(f"[{datetime.now()}] HTML text cache not saved: {e}")
@@ -0,0 +1,161 @@
+from app import config
+from collections import Counter, deque
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlsplit
+import random
+import requests
+import threading
+import time
+
+# Shared HTTP client for the external APIs (Canvas, Emma, Google Cloud Identity, reCAPTCHA).
+#
+# One requests.Session per host keeps TLS connections alive between calls, so a paginated
+# Canvas sweep opens one connection instead of one per page. Every call gets a default
+# timeout, and retries with exponential backoff on 429 / 5xx and connection errors,
+# honouring Retry-After. Non-idempotent methods (POST, PATCH) are only retried when the
+# server cannot have acted on them: 429 and connect timeouts. Callers that handle rate
+# limiting themselves (app/canvas_api.py) pass retry_429=False and get 429s back at once.
+#
+# Settings in app/config.py: HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, HTTP_POOL_MAXSIZE,
+# HTTP_RETRY_MAX_ATTEMPTS, HTTP_RETRY_BASE_SECONDS, HTTP_RETRY_MAX_SECONDS.
+# Per-host latency and status counts are shown on the admin SQL profile page.
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+LATENCY_SAMPLES = 500  # per host, for percentiles
+
+_sessions = {}
+_metrics = {}
+_lock = threading.Lock()
+
+def _setting(name, default):
+    return getattr(config, name, default)
+
+def default_timeout():
+    return (_setting("HTTP_CONNECT_TIMEOUT", 5), _setting("HTTP_READ_TIMEOUT", 30))
+
+def session_for(url):
+    """Return the pooled Session for url's host, creating it on first use."""
+    host = urlsplit(url).netloc.lower()
+    session = _sessions.get(host)
+    if session is None:
+        with _lock:
+            session = _sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                # Sized for the ThreadPoolExecutors that fan out Canvas / Panopto calls
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=_setting("HTTP_POOL_MAXSIZE", 16))
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _sessions[host] = session
+    return session
+
+def retry_after_seconds(response):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max((when - datetime.now(when.tzinfo)).total_seconds(), 0.0)
+
+def _backoff(attempt, response=None):
+    """Delay before retry number attempt (1-based): Retry-After if given, else exponential with jitter."""
+    cap = _setting("HTTP_RETRY_MAX_SECONDS", 60)
+    delay = retry_after_seconds(response) if response is not None else None
+    if delay is None:
+        delay = _setting("HTTP_RETRY_BASE_SECONDS", 0.5) * 2 ** (attempt - 1)
+        delay *= random.uniform(0.5, 1.0)
+    return min(delay, cap)
+
+def _record(host, elapsed, status=None, error=None, retried=False):
+    with _lock:
+        entry = _metrics.get(host)
+        if entry is None:
+            entry = _metrics[host] = {
+                "requests": 0, "errors": 0, "retries": 0, "time": 0.0, "max_time": 0.0,
+                "statuses": Counter(), "latencies": deque(maxlen=LATENCY_SAMPLES), "last_error": None,
+            }
+        entry["requests"] += 1
+        entry["time"] += elapsed
+        entry["max_time"] = max(entry["max_time"], elapsed)
+        entry["latencies"].append(elapsed)
+        if retried:
+            entry["retries"] += 1
+        if status is not None:
+            entry["statuses"][status] += 1
+        if error is not None:
+            entry["errors"] += 1
+            entry["last_error"] = f"{datetime.now():%Y-%m-%d %H:%M:%S} {error}"[:300]
+
+def request(method, url, retry_429=True, **kwargs):
+    """
+    requests.request() through the host's pooled session, with a default timeout and retries.
+    Returns the final Response (which may still be an error status); raises the last
+    exception if every attempt failed to get a response. retry_429=False returns a 429
+    without retrying it.
+    """
+    method = method.upper()
+    kwargs.setdefault("timeout", default_timeout())
+    max_attempts = max(_setting("HTTP_RETRY_MAX_ATTEMPTS", 4), 1)
+    idempotent = method in IDEMPOTENT_METHODS
+    session = session_for(url)
+    host = urlsplit(url).netloc.lower()
+
+    for attempt in range(1, max_attempts + 1):
+        started = time.perf_counter()
+        try:
+            response = session.request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            # A connect timeout never reached the server; anything else might have
+            can_retry = idempotent or isinstance(e, requests.ConnectTimeout)
+            last = attempt == max_attempts or not can_retry
+            _record(host, time.perf_counter() - started, error=e, retried=not last)
+            if last:
+                raise
+            time.sleep(_backoff(attempt))
+            continue
+
+        if response.status_code == 429:
+            retryable = retry_429
+        else:
+            retryable = idempotent and response.status_code in RETRY_STATUSES
+        last = attempt == max_attempts or not retryable
+        _record(host, time.perf_counter() - started, status=response.status_code, retried=not last)
+        if last:
+            if retryable:
+                print(f"[{datetime.now()}] {method} {host} gave {response.status_code} after {attempt} attempts")
+            return response
+        delay = _backoff(attempt, response)
+        response.close()  # return the connection to the pool before sleeping
+        time.sleep(delay)
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+def get_host_metrics():
+    """Snapshot of per-host call statistics, busiest first."""
+    with _lock:
+        rows = [dict(entry, host=host, statuses=dict(entry["statuses"]), latencies=sorted(entry["latencies"]))
+                for host, entry in _metrics.items()]
+    for row in rows:
+        samples = row.pop("latencies")
+        row["avg_ms"] = row["time"] * 1000 / row["requests"] if row["requests"] else 0
+        row["p50_ms"] = samples[len(samples) // 2] * 1000 if samples else 0
+        row["p95_ms"] = samples[min(int(len(samples) * 0.95), len(samples) - 1)] * 1000 if samples else 0
+    rows.sort(key=lambda r: r["requests"], reverse=True)
+    return rows
+
+def reset_host_metrics():
+    with _lock:
+        _metrics.clear()
@@ -0,0 +1,105 @@
+from datetime import date, datetime, timezone
+import re
+
+# Streaming iCalendar (RFC 5545) serializer for the calendar group feeds.
+#
+# icalendar builds the whole Calendar object graph and then serialises it in one go, which
+# for groups with thousands of events holds every event twice in memory before the first
+# byte is written. IcsStream instead turns one VEVENT at a time into bytes, so a feed can be
+# written to a file (write_calendar) or sent as a streamed response (stream_calendar) while
+# the events are still being produced.
+#
+# Output follows what generate_scheduled_ics produced with icalendar: UID
+# canvas-eventid-<Canvas id>, DTSTART/DTEND as VALUE=DATE for all-day events and UTC
+# otherwise, plain-text DESCRIPTION and the HTML in X-ALT-DESC;FMTTYPE=text/html. TEXT values
+# are escaped (\ ; , newline), control characters dropped, and lines folded at 75 octets
+# without splitting UTF-8 sequences.
+
+CRLF = b"\r\n"
+MAX_LINE_OCTETS = 75
+CONTROL_CHARS = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]')
+
+def escape_text(value):
+    value = CONTROL_CHARS.sub('', str(value))
+    value = value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+    return value.replace('\r\n', '\\n').replace('\r', '\\n').replace('\n', '\\n')
+
+def fold(line):
+    """Encode one content line, folded to 75 octets per physical line, ending in CRLF."""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= MAX_LINE_OCTETS:
+        return encoded + CRLF
+    parts, current, size, limit = [], [], 0, MAX_LINE_OCTETS
+    for char in line:
+        char_bytes = char.encode("utf-8")
+        if size + len(char_bytes) > limit:
+            parts.append(b"".join(current))
+            current, size, limit = [], 0, MAX_LINE_OCTETS - 1  # continuation lines start with a space
+        current.append(char_bytes)
+        size += len(char_bytes)
+    parts.append(b"".join(current))
+    return (CRLF + b" ").join(parts) + CRLF
+
+def format_value(value):
+    """(parameters, value) for a DATE or DATE-TIME property."""
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return "", value.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    if isinstance(value, date):
+        return ";VALUE=DATE", value.strftime('%Y%m%d')
+    raise TypeError(f"not a date or datetime: {value!r}")
+
+class IcsStream:
+    """One VCALENDAR, produced piece by piece: header(), event() per VEVENT, footer()."""
+
+    def __init__(self, prodid, calscale="GREGORIAN", dtstamp=None):
+        self.prodid = prodid
+        self.calscale = calscale
+        self.dtstamp = format_value(dtstamp or datetime.now(timezone.utc))[1]
+        self.count = 0
+
+    def header(self):
+        lines = ["BEGIN:VCALENDAR", "VERSION:2.0", f"PRODID:{self.prodid}"]
+        if self.calscale:
+            lines.append(f"CALSCALE:{self.calscale}")
+        return b"".join(fold(line) for line in lines)
+
+    def event(self, uid, summary, start, end, location=None, description=None, html_description=None):
+        """Bytes of one VEVENT; start/end are dates (all-day) or datetimes, None leaves them out."""
+        lines = ["BEGIN:VEVENT", f"UID:{escape_text(uid)}", f"DTSTAMP:{self.dtstamp}",
+                 f"SUMMARY:{escape_text(summary)}"]
+        for name, value in (("DTSTART", start), ("DTEND", end)):
+            if value is not None:
+                params, text = format_value(value)
+                lines.append(f"{name}{params}:{text}")
+        if location is not None:
+            lines.append(f"LOCATION:{escape_text(location)}")
+        if description is not None:
+            lines.append(f"DESCRIPTION:{escape_text(description)}")
+        if html_description is not None:
+            # Non-standard but widely supported HTML version of the description
+            lines.append(f"X-ALT-DESC;FMTTYPE=text/html:{escape_text(html_description)}")
+        lines.append("END:VEVENT")
+        self.count += 1
+        return b"".join(fold(line) for line in lines)
+
+    def footer(self):
+        return fold("END:VCALENDAR")
+
+def stream_calendar(prodid, events, dtstamp=None):
+    """Generator of bytes chunks (one per VEVENT) for a calendar; events yields event() kwargs."""
+    stream = IcsStream(prodid, dtstamp=dtstamp)
+    yield stream.header()
+    for fields in events:
+        yield stream.event(**fields)
+    yield stream.footer()
+
+def write_calendar(fileobj, prodid, events, dtstamp=None):
+    """Write a calendar to a binary file object; returns the number of events written."""
+    stream = IcsStream(prodid, dtstamp=dtstamp)
+    fileobj.write(stream.header())
+    for fields in events:
+        fileobj.write(stream.event(**fields))
+    fileobj.write(stream.footer())
+    return stream.count
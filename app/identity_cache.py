@@ -0,0 +1,65 @@
+from app import db
+from app.models import User, Role
+from app.permission_index import permissions_version
+from sqlalchemy import select
+from sqlalchemy.orm import Session, joinedload
+import threading
+import time
+
+# Short-lived, per-process cache of fully loaded User objects for login_manager.user_loader.
+# Entries are detached from any session and merged into the request session with
+# load=False, so a hit costs no SQL. Keyed by user id; an entry is only valid for the
+# permissions version it was loaded under (see app.permission_index).
+IDENTITY_CACHE_TTL = 60  # seconds
+
+_cache = {}
+_lock = threading.Lock()
+
+def _fetch_user(user_id):
+    """Load a user with role, role permissions, direct permissions and employee in one SELECT."""
+    stmt = (
+        select(User)
+        .where(User.id == user_id)
+        .options(
+            joinedload(User.role).joinedload(Role.permissions),
+            joinedload(User.permissions),
+            joinedload(User.employee),
+        )
+    )
+    # A private session, so the cached instance never belongs to (or gets expired by) a request session
+    with Session(db.engine, expire_on_commit=False) as s:
+        return s.execute(stmt).unique().scalar_one_or_none()
+
+def load_user_cached(user_id):
+    """
+    Return the User for user_id attached to db.session, or None.
+    Only a cache miss (first request, TTL expiry, permission change) touches the database.
+    """
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        return None
+
+    version = permissions_version()
+    now = time.monotonic()
+
+    cached = _cache.get(user_id)
+    if not cached or cached[0] != version or cached[1] <= now:
+        user = _fetch_user(user_id)
+        if user is None:
+            with _lock:
+                _cache.pop(user_id, None)
+            return None
+        cached = (version, now + IDENTITY_CACHE_TTL, user)
+        with _lock:
+            _cache[user_id] = cached
+
+    return db.session.merge(cached[2], load=False)
+
+def clear_identity_cache(user_id=None):
+    """Forget one cached user, or all of them."""
+    with _lock:
+        if user_id is None:
+            _cache.clear()
+        else:
+            _cache.pop(int(user_id), None)
@@ -1,63 +1,133 @@
-from app import config
-# from app.email import send_email_via_powershell
-from logging.handlers import RotatingFileHandler
-import base64
+from collections import Counter, OrderedDict
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+import atexit
 import logging
 import os
-import subprocess
-
-class PowerShellEmailHandler(logging.Handler):
-    """Custom handler that emails errors using PowerShell with EncodedCommand."""
+import queue
+import threading
+import time
+
+class ErrorDigestEmailHandler(logging.Handler):
+    """
+    Emails errors as batched digests over the shared SMTP connection (app.email).
+
+    Runs behind a QueueListener, so emit() is called on the listener thread, never in a request.
+    Records are collected for ERROR_EMAIL_FLUSH_SECONDS (or until ERROR_EMAIL_BATCH_SIZE distinct
+    errors are pending) and sent as one message. An error already reported within
+    ERROR_EMAIL_DEDUP_SECONDS is only counted and summarized in the next digest.
+    """
     def __init__(self, app):
         super().__init__(level=logging.ERROR)
         self.app = app
         self.recipients = app.config.get('ADMINS', '').split(',')
         self.cc = 'epigon@health.ucsd.edu'
         self.sender = app.config.get('MAIL_DEFAULT_SENDER', 'epigon@health.ucsd.edu')
+        self.flush_interval = app.config.get('ERROR_EMAIL_FLUSH_SECONDS', 60)
+        self.dedup_window = app.config.get('ERROR_EMAIL_DEDUP_SECONDS', 900)
+        self.batch_size = app.config.get('ERROR_EMAIL_BATCH_SIZE', 20)
+
+        self._pending = OrderedDict()  # key -> {"text", "count", "levelname", "module"}
+        self._suppressed = Counter()   # key -> repeats of errors already emailed in the window
+        self._suppressed_text = {}
+        self._last_sent = {}           # key -> time.monotonic() of the digest that reported it
+        self._timer = None
+
+    @staticmethod
+    def record_key(record):
+        return (record.levelname, record.module, record.lineno, record.getMessage())
 
     def emit(self, record):
         try:
-            log_entry = self.format(record)
-
-            cc_addresses = normalize_recipients([self.cc, self.sender])
-            to_addresses = normalize_recipients(self.recipients)
-
-            ps_script = f"""
-            Send-MailMessage `
-                -From "{self.sender}" `
-                -To ({to_addresses}) `
-                -Cc ({cc_addresses}) `
-                -Subject "[Flask Error] {record.levelname} in {record.module}" `
-                -Body @'
-{log_entry}
-'@ `
-                -SmtpServer "{config.MAIL_SERVER}" `
-                -UseSsl
-            """
-
-            # Encode script to base64 for PowerShell -EncodedCommand
-            encoded = base64.b64encode(ps_script.encode("utf-16le")).decode("ascii")
-
-            result = subprocess.run(
-                ["powershell", "-EncodedCommand", encoded],
-                capture_output=True,
-                text=True
-            )
-
-            if result.returncode != 0:
-                # Log to console instead of breaking Flask
-                print("Email send failed:", result.stderr)
+            key = self.record_key(record)
+            now = time.monotonic()
+
+            with self.lock:
+                sent_at = self._last_sent.get(key)
+                if sent_at is not None and now - sent_at < self.dedup_window:
+                    self._suppressed[key] += 1
+                    self._suppressed_text.setdefault(key, (record.getMessage().splitlines() or [""])[0][:200])
+                    return
+
+                entry = self._pending.get(key)
+                if entry:
+                    entry["count"] += 1
+                else:
+                    self._pending[key] = {
+                        "text": self.format(record),
+                        "count": 1,
+                        "levelname": record.levelname,
+                        "module": record.module,
+                    }
+
+                flush_now = len(self._pending) >= self.batch_size
+                if not flush_now and self._timer is None:
+                    self._timer = threading.Timer(self.flush_interval, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+
+            if flush_now:
+                self.flush()
 
         except Exception as e:
-            print("PowerShellEmailHandler failed:", e)
+            print("ErrorDigestEmailHandler failed:", e)
+
+    def flush(self):
+        with self.lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._pending:
+                return
+            pending = list(self._pending.items())
+            suppressed = [(self._suppressed_text[k], n) for k, n in self._suppressed.items()]
+            self._pending.clear()
+            self._suppressed.clear()
+            self._suppressed_text.clear()
+
+            now = time.monotonic()
+            for key, _ in pending:
+                self._last_sent[key] = now
+            # Forget keys whose window has passed so the map doesn't grow forever
+            for key in [k for k, t in self._last_sent.items() if now - t >= self.dedup_window]:
+                del self._last_sent[key]
+
+        total = sum(entry["count"] for _, entry in pending)
+        if len(pending) == 1:
+            entry = pending[0][1]
+            subject = f"[Flask Error] {entry['levelname']} in {entry['module']}"
+            if total > 1:
+                subject += f" (x{total})"
+        else:
+            subject = f"[Flask Error] {len(pending)} distinct errors ({total} total)"
+
+        sections = []
+        for _, entry in pending:
+            header = f"--- {entry['count']}x ---\n" if entry["count"] > 1 else "---\n"
+            sections.append(header + entry["text"])
+        if suppressed:
+            lines = [f"  {n}x {text}" for text, n in suppressed]
+            sections.append("--- Repeats of errors already reported ---\n" + "\n".join(lines))
+
+        self.send(subject, "\n\n".join(sections))
+
+    def send(self, subject, body):
+        # Direct SMTP rather than the outbound queue: the error being reported may be the database
+        from app.email import send_email_now
+        try:
+            send_email_now(
+                to=self.recipients,
+                cc=[self.cc, self.sender],
+                sender=self.sender,
+                subject=subject,
+                body=body
+            )
+        except Exception as e:
+            # Log to console instead of breaking Flask
+            print("ErrorDigestEmailHandler send failed:", e)
 
-def normalize_recipients(addresses):
-    """Return a PowerShell array of quoted email strings"""
-    if not addresses:
-        return ""
-    if isinstance(addresses, str):
-        addresses = [a.strip() for a in addresses.replace(";", ",").split(",") if a.strip()]
-    return ",".join(f'"{a}"' for a in addresses)
+    def close(self):
+        self.flush()
+        super().close()
 
 def setup_logger(app):
     # Ensure log directory exists
@@ -76,13 +146,24 @@ def setup_logger(app):
     ))
     app.logger.addHandler(file_handler)
 
-    # PowerShell email handler for production
-    if not app.debug:
-        email_handler = PowerShellEmailHandler(app)
+    # Error email digests for production (not for debug or test/benchmark runs). The request thread only pays for a queue put;
+    # formatting, batching and sending happen on the QueueListener thread.
+    if not app.debug and not app.testing:
+        email_handler = ErrorDigestEmailHandler(app)
         email_handler.setFormatter(logging.Formatter(
-            '[%(asctime)s] %(levelname)s in %(module)s: %(message)s\n\n%(message)s'
+            '[%(asctime)s] %(levelname)s in %(module)s: %(message)s'
         ))
-        app.logger.addHandler(email_handler)
+
+        email_queue = queue.SimpleQueue()
+        listener = QueueListener(email_queue, email_handler, respect_handler_level=True)
+        listener.start()
+        # Stop the listener (drains the queue) before flushing the last digest
+        atexit.register(email_handler.close)
+        atexit.register(listener.stop)
+
+        queue_handler = QueueHandler(email_queue)
+        queue_handler.setLevel(logging.ERROR)
+        app.logger.addHandler(queue_handler)
 
     app.logger.setLevel(logging.ERROR)
 
@@ -1,4 +1,5 @@
 from app import db
+from app.permission_index import get_permission_index
 from datetime import datetime, timezone
 from flask_login import UserMixin
 from sqlalchemy import and_, Column, Integer, String, DateTime, UniqueConstraint, ForeignKey, Boolean, Date, Time, Text 
@@ -58,16 +59,18 @@ class User(UserMixin, db.Model):
     def get_id(self):
         return str(self.id)
     
-    def can(self, resource, action):
-        # Get permissions from role and user (empty lists if none)
-        role_perms = self.role.permissions if self.role else []
-        user_perms = self.permissions if self.permissions else []
-
-        # Combine and filter out deleted permissions
-        all_permissions = [p for p in role_perms + user_perms if not getattr(p, 'deleted', False)]
+    @property
+    def permission_set(self):
+        # frozenset of (resource, action), built once per request and shared across requests
+        # until roles/permissions change (see app.permission_index)
+        perms = getattr(self, '_permission_set', None)
+        if perms is None:
+            perms = get_permission_index(self)
+            self._permission_set = perms
+        return perms
 
-        # Check if any permission matches resource and action
-        return any(p.resource == resource and p.action == action for p in all_permissions)
+    def can(self, resource, action):
+        return (resource, action) in self.permission_set
     
     # def can(self, resource, action):
     #     permissions = self.role.permissions if self.role else []
@@ -382,6 +385,128 @@ class ScheduledRecording(db.Model):
     broadcast = Column(Boolean, default=False)
     create_date = Column(db.DateTime, default=datetime.now)
 
+#----------------------
+# CANVAS CATALOG MIRROR (app/canvas_catalog.py)
+#----------------------
+class CanvasTerm(db.Model):
+    __tablename__ = 'CANVAS_TERMS'
+    id = Column(Integer, primary_key=True, autoincrement=False)  # Canvas term id
+    name = Column(String(255), nullable=False)
+    sis_term_id = Column(String(255))
+    start_at = Column(DateTime)  # UTC
+    end_at = Column(DateTime)    # UTC
+    workflow_state = Column(String(50))
+    content_hash = Column(String(40))
+    synced_at = Column(DateTime, default=datetime.now)
+
+class CanvasCourse(db.Model):
+    __tablename__ = 'CANVAS_COURSES'
+    __table_args__ = (
+        db.Index('IX_CANVAS_COURSES_ACCOUNT_TERM', 'account_id', 'enrollment_term_id'),
+    )
+    id = Column(Integer, primary_key=True, autoincrement=False)  # Canvas course id
+    account_id = Column(Integer, nullable=False)
+    enrollment_term_id = Column(Integer, index=True)
+    name = Column(String(255), nullable=False)
+    course_code = Column(String(255))
+    sis_course_id = Column(String(255))
+    workflow_state = Column(String(50))  # unpublished, available, completed, deleted
+    start_at = Column(DateTime)  # UTC
+    end_at = Column(DateTime)    # UTC
+    content_hash = Column(String(40))
+    synced_at = Column(DateTime, default=datetime.now)
+    sections_synced_at = Column(DateTime)
+    deleted = Column(Boolean, default=False, nullable=False)
+
+class CanvasSection(db.Model):
+    __tablename__ = 'CANVAS_SECTIONS'
+    id = Column(Integer, primary_key=True, autoincrement=False)  # Canvas section id
+    course_id = Column(Integer, nullable=False, index=True)
+    name = Column(String(255), nullable=False)
+    sis_section_id = Column(String(255))
+    start_at = Column(DateTime)  # UTC
+    end_at = Column(DateTime)    # UTC
+
+class CanvasSyncState(db.Model):
+    __tablename__ = 'CANVAS_SYNC_STATE'
+    key = Column(String(100), primary_key=True)  # "terms", "courses:<account id>"
+    last_sync_at = Column(DateTime)
+    last_full_sync_at = Column(DateTime)
+    last_result = Column(String(500))
+
+#----------------------
+# CANVAS COURSE ROSTERS (app/canvas_rosters.py)
+#----------------------
+class CanvasRoster(db.Model):
+    __tablename__ = 'CANVAS_ROSTERS'
+    course_id = Column(Integer, primary_key=True, autoincrement=False)
+    enrollment_type = Column(String(50), primary_key=True)  # StudentEnrollment, TeacherEnrollment, ...
+    member_count = Column(Integer, default=0)
+    content_hash = Column(String(40))
+    synced_at = Column(DateTime)
+
+class CanvasRosterMember(db.Model):
+    __tablename__ = 'CANVAS_ROSTER_MEMBERS'
+    course_id = Column(Integer, primary_key=True, autoincrement=False)
+    enrollment_type = Column(String(50), primary_key=True)
+    sis_user_id = Column(String(50), primary_key=True)  # matches Student.pid
+
+#----------------------
+# CANVAS CALENDAR EVENT STORE (app/canvas_event_store.py)
+#----------------------
+class CanvasCalendarEvent(db.Model):
+    __tablename__ = 'CANVAS_EVENTS'
+    __table_args__ = (
+        db.Index('IX_CANVAS_EVENTS_CONTEXT_START', 'context_code', 'start_at'),
+    )
+    id = Column(Integer, primary_key=True, autoincrement=False)  # Canvas calendar event id
+    context_code = Column(String(50), nullable=False)  # course_123
+    title = Column(String(500))
+    is_all_day = Column(Boolean, default=False)
+    start_at = Column(DateTime)  # UTC; midnight of the date for all-day events
+    end_at = Column(DateTime)    # UTC
+    location_name = Column(String(500))
+    raw = Column(Text)           # the Canvas JSON, rebuilt into a CanvasEvent on read
+    updated_at = Column(DateTime)  # Canvas updated_at (UTC)
+    content_hash = Column(String(40))
+    synced_at = Column(DateTime, default=datetime.now)
+    deleted = Column(Boolean, default=False, nullable=False)
+
+class CanvasEventSyncState(db.Model):
+    __tablename__ = 'CANVAS_EVENT_SYNC_STATE'
+    context_code = Column(String(50), primary_key=True)
+    window_start = Column(DateTime)  # UTC range of events mirrored for this context
+    window_end = Column(DateTime)
+    max_updated_at = Column(DateTime)  # UTC high-water mark of the events' updated_at
+    event_count = Column(Integer, default=0)
+    last_sync_at = Column(DateTime)
+    last_full_sync_at = Column(DateTime)
+
+#----------------------
+# CANVAS BULK ENROLLMENT (app/canvas_enrollment.py)
+#----------------------
+class CanvasEnrollmentJob(db.Model):
+    __tablename__ = 'CANVAS_ENROLLMENT_JOBS'
+    id = Column(Integer, primary_key=True)
+    course_id = Column(Integer, nullable=False)
+    section_id = Column(Integer)
+    enrollment_type = Column(String(50), nullable=False)
+    enrollment_state = Column(String(50), nullable=False)
+    notify = Column(Boolean, default=False)
+    method = Column(String(20), nullable=False)  # sis_import, api
+    status = Column(String(20), nullable=False, default="Running")  # Running, Completed, CompletedWithErrors, Failed
+    total = Column(Integer, default=0)
+    succeeded = Column(Integer, default=0)
+    failed = Column(Integer, default=0)
+    progress = Column(Integer, default=0)  # percent
+    sis_import_id = Column(Integer)
+    users = Column(Text)    # JSON list of the requested user ids
+    results = Column(Text)  # JSON list of {user_id, status, message}
+    message = Column(String(2000))
+    created_by = Column(Integer)
+    created_at = Column(DateTime, default=datetime.now)
+    finished_at = Column(DateTime)
+
 #----------------------
 # EXCHANGE CALENDAR APP
 #----------------------  
@@ -399,6 +524,26 @@ class CalendarGroup(db.Model):
     name = Column(db.String(100), nullable=False)
     ics_filename = Column(db.String(100), nullable=False)
 
+class CalendarFeedState(db.Model):
+    # What each group's .ics was last generated from (app/calendar_feeds.py)
+    __tablename__ = 'CALENDAR_FEED_STATE'
+    group_name = Column(db.String(100), primary_key=True)
+    ics_filename = Column(db.String(100))
+    inputs_hash = Column(db.String(40))
+    course_count = Column(db.Integer, default=0)
+    event_count = Column(db.Integer, default=0)
+    generated_at = Column(db.DateTime)
+    checked_at = Column(db.DateTime)
+
+class CalendarCourseState(db.Model):
+    __tablename__ = 'CALENDAR_COURSE_STATE'
+    course_id = Column(db.String(50), primary_key=True)
+    events_hash = Column(db.String(40))
+    event_count = Column(db.Integer, default=0)
+    max_updated_at = Column(db.DateTime)  # UTC high-water mark of the events' updated_at
+    changed_at = Column(db.DateTime)
+    checked_at = Column(db.DateTime)
+
 #----------------------
 # STUDENT DB APP
 #----------------------  
@@ -662,4 +807,38 @@ class Applicant(db.Model):
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     hs_email_requested_date = db.Column(db.DateTime)
     hs_email = db.Column(db.String(100))
-    is_deleted = db.Column(db.Boolean, default=False)
\ No newline at end of file
+    is_deleted = db.Column(db.Boolean, default=False)
+# ----------------------
+# OUTBOUND MAIL QUEUE
+# ----------------------
+class OutboundEmail(db.Model):
+    __tablename__ = "OUTBOUND_EMAILS"
+
+    id = db.Column(db.Integer, primary_key=True)
+    sender = db.Column(db.String(255), nullable=False)
+    to_addresses = db.Column(db.String(2000), nullable=False)   # comma separated
+    cc_addresses = db.Column(db.String(2000))
+    subject = db.Column(db.String(500), nullable=False)
+    body = db.Column(db.Text)
+    is_html = db.Column(db.Boolean, default=False, nullable=False)
+    status = db.Column(db.String(20), default="Pending", nullable=False, index=True)  # Pending, Sending, Sent, Failed
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.now, nullable=False, index=True)
+    claimed_at = db.Column(db.DateTime)
+    last_error = db.Column(db.String(2000))
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    sent_at = db.Column(db.DateTime)
+
+    attachments = db.relationship("OutboundEmailAttachment", back_populates="email",
+                                  cascade="all, delete-orphan", lazy="selectin")
+
+class OutboundEmailAttachment(db.Model):
+    __tablename__ = "OUTBOUND_EMAIL_ATTACHMENTS"
+
+    id = db.Column(db.Integer, primary_key=True)
+    email_id = db.Column(db.Integer, db.ForeignKey("OUTBOUND_EMAILS.id"), nullable=False)
+    filename = db.Column(db.String(255), nullable=False)
+    content_type = db.Column(db.String(100), nullable=False, default="application/octet-stream")
+    content = db.Column(db.LargeBinary, nullable=False)
+
+    email = db.relationship("OutboundEmail", back_populates="attachments")
@@ -0,0 +1,68 @@
+from datetime import datetime
+import os
+import threading
+import time
+
+# Process-wide index of user_id -> (version, built_at, frozenset of (resource, action)).
+# wfastcgi runs several worker processes, so invalidation is shared through the
+# modification time of a stamp file that every worker checks before trusting its index.
+PERMISSION_INDEX_TTL = 300  # seconds, upper bound on staleness if the stamp file is unavailable
+STAMP_FILE = os.path.join(os.path.dirname(__file__), 'logs', 'permissions.stamp')
+
+_index = {}
+_lock = threading.Lock()
+_local_generation = 0  # bumped on every invalidation in this process, even if the stamp file can't be written
+
+def permissions_version():
+    """Return the current permissions version stamp, comparable with == only."""
+    try:
+        mtime = os.stat(STAMP_FILE).st_mtime_ns
+    except OSError:
+        mtime = 0
+    return (_local_generation, mtime)
+
+def invalidate_permission_index():
+    """
+    Drop every cached permission index, in this process and in the other workers.
+    Call this after committing any change to roles, permissions or user permissions.
+    """
+    global _local_generation
+    with _lock:
+        _local_generation += 1
+        _index.clear()
+    try:
+        os.makedirs(os.path.dirname(STAMP_FILE), exist_ok=True)
+        with open(STAMP_FILE, 'a'):
+            pass
+        now_ns = time.time_ns()
+        os.utime(STAMP_FILE, ns=(now_ns, now_ns))
+    except OSError as e:
+        print(f"[{datetime.now()}] Could not touch permissions stamp: {e}")
+
+def build_permission_index(user):
+    """Build the frozenset of (resource, action) pairs granted to a user by role and directly."""
+    role_perms = user.role.permissions if user.role else []
+    user_perms = user.permissions if user.permissions else []
+    return frozenset(
+        (p.resource, p.action)
+        for p in list(role_perms) + list(user_perms)
+        if not getattr(p, 'deleted', False)
+    )
+
+def get_permission_index(user):
+    """
+    Return the cached permission index for a user, building it on first use or after
+    an invalidation. Only the first call after a change touches the database.
+    """
+    version = permissions_version()
+    now = time.monotonic()
+
+    cached = _index.get(user.id)
+    if cached and cached[0] == version and now - cached[1] < PERMISSION_INDEX_TTL:
+        return cached[2]
+
+    perms = build_permission_index(user)
+    if user.id is not None:
+        with _lock:
+            _index[user.id] = (version, now, perms)
+    return perms
@@ -1,7 +1,6 @@
 from app.utils import admin_required, permission_required, has_permission
 from app.models import db, AcademicYear, AYCommittee, Committee, Member, MemberRole, FrequencyType, CommitteeType, Employee, Meeting, FileUpload, MemberType, User, Role, Permission
 from app.forms import AcademicYearForm, AYCommitteeForm, CommitteeForm, CommitteeReportForm, MemberForm, MemberRoleForm, MemberTypeForm, MeetingForm, FileUploadForm, FrequencyTypeForm, CommitteeTypeForm
-from bs4 import BeautifulSoup
 from collections import defaultdict
 from datetime import datetime
 from flask import render_template, redirect, url_for, request, flash, jsonify, Blueprint, send_file, abort, make_response
@@ -11,13 +10,9 @@ from sqlalchemy.orm import joinedload, selectinload, with_loader_criteria
 from sqlalchemy.sql import func
 from urllib.parse import urljoin, urlparse, parse_qs
 from werkzeug.utils import secure_filename
-from xhtml2pdf import pisa
-import io
 import os
-import pandas as pd
 import re
 import sys
-import traceback
 
 bp = Blueprint('academic_years', __name__, url_prefix='/academic_years')
 
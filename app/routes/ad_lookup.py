@@ -5,8 +5,6 @@ from datetime import datetime, timedelta
 from flask import render_template, request, Blueprint, g
 from flask_login import login_required
 from functools import lru_cache
-from ldap3 import Server, Connection, ALL, SUBTREE
-from ldap3.utils.conv import escape_filter_chars as esc
 
 bp = Blueprint('ad_lookup', __name__, url_prefix='/ad_lookup')
 
@@ -20,6 +18,8 @@ def before_request():
     pass
 
 def get_ldap_conn():
+    from ldap3 import Server, Connection  # heavy; imported on first use, not at app start
+
     if not hasattr(g, 'ldap_conn') or not g.ldap_conn.bound:
         server = Server(LDAP_SERVER, get_info=None)
         g.ldap_conn = Connection(
@@ -62,6 +62,9 @@ def convert_windows_time(windows_time):
 @lru_cache(maxsize=256)
 def cached_ldap_search(searchtype_ad, searchtype_first, searchtype_last, username, firstname, lastname):
     """Cache AD search results with group checks via LDAP filters."""
+    from ldap3 import SUBTREE
+    from ldap3.utils.conv import escape_filter_chars as esc
+
     conn = get_ldap_conn()
 
     # Base filters
@@ -1,20 +1,20 @@
-from app.cred import CANVAS_API_BASE, CANVAS_API_TOKEN, PANOPTO_API_BASE, PANOPTO_CLIENT_ID, PANOPTO_CLIENT_SECRET
+from app import calendar_feeds, html_text
+from app.canvas_event_store import load_events_by_window
+from app.cred import PANOPTO_API_BASE, PANOPTO_CLIENT_ID, PANOPTO_CLIENT_SECRET
 from app.forms import CalendarGroupForm
+from app.ics_writer import stream_calendar, write_calendar
 from app.models import db, CalendarGroup, CalendarGroupSelection
 from app.utils import permission_required
-from .canvas import get_canvas_courses, get_canvas_events, get_terms_with_courses
-from bs4 import BeautifulSoup
-from datetime import datetime, timezone
-from flask import render_template, request, Blueprint, jsonify, redirect, url_for, flash
+from .canvas import get_canvas_courses, get_courses_for_accounts, get_terms_with_courses
+from datetime import datetime
+from flask import render_template, request, Blueprint, jsonify, redirect, url_for, flash, has_request_context, Response
 from flask_login import login_required
-from icalendar import Calendar, Event, vText
 from os.path import dirname, join, abspath
 import dateutil.parser
 from dateutil.relativedelta import relativedelta
 import dateutil.tz
 import os
 import pytz
-import re
 import sys
 
 sys.path.insert(0, abspath(join(dirname(__file__), '..', 'common')))
@@ -130,34 +130,15 @@ def save_selections():
     return jsonify({"message": "Selections saved."})
 
 @bp.route("/generate_scheduled_ics", methods=["POST"])
-def generate_scheduled_ics():
+def generate_scheduled_ics(force=False):
+    """
+    Rebuild the .ics file of every calendar group whose courses or events changed since the
+    last run (all of them with force=True or ?force=1); see app/calendar_feeds.py.
+    """
+    force = force or (has_request_context() and request.args.get("force") == "1")
     print(f"[{datetime.now()}] Running scheduled ICS generation job...")
 
-    courses1 = get_canvas_courses(account="SSPPS", state=["available"])
-    courses2= get_canvas_courses(account="SOM", state=["available"])
-    courses = sorted(courses1 + courses2, key=lambda c: c["name"])
-     
-    # Build a map from course ID to course info
-    course_map = {
-        f"{course['id']}": {
-            "course_id": course['id'],
-            "course_name": course.get('name', 'Unnamed Course'),
-            "start_at": (
-                convert_utc_to_local(course['start_at'])
-                if course.get('start_at') else
-                # Provide a default local datetime if the field is missing
-                datetime.now(dateutil.tz.gettz()).replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
-            ),
-            "end_at": (
-                convert_utc_to_local(course['end_at'])
-                if course.get('end_at') else
-                # Provide a default local datetime if the field is missing
-                datetime.now(dateutil.tz.gettz()) + relativedelta(years=5)
-            )
-        }
-        for course in courses if 'id' in course 
-    }
-    print(course_map)
+    course_map = feed_course_map()
 
     selections = CalendarGroupSelection.query.all()
     group_data = {}
@@ -171,67 +152,106 @@ def generate_scheduled_ics():
     # Fetch calendar groups with their filenames
     groups = CalendarGroup.query.all()
     filename_map = {group.name: group.ics_filename for group in groups}
+
+    # Stage 1: every course selected by any group, once
+    unique_courses = {course['id']: course_map[course['id']]
+                      for courses in group_data.values() for course in courses if course['id'] in course_map}
+
+    # Stage 2: their events from the event store, each course with its own date range; courses
+    # whose stored copy is stale are synced from Canvas first in one batched, concurrent fetch
+    events_by_course = load_events_by_window(
+        ((f"course_{info['course_id']}", info['start_at'], info['end_at']) for info in unique_courses.values()),
+        full=force,
+    )
+    course_hashes = calendar_feeds.track_courses({
+        info['course_id']: events_by_course.get(f"course_{info['course_id']}", []) for info in unique_courses.values()
+    })
+    print(f"[{datetime.now()}] Fetched events for {len(unique_courses)} courses in {len(group_data)} groups "
+          f"({sum(len(c) for c in group_data.values())} selections).")
+
+    # Stage 3: fan the events out to the groups
+    generated, skipped = [], []
     for group_name, courses in group_data.items():
-        calendar = Calendar()
-        calendar.add('prodid', f'-//Canvas Calendars//{group_name}//EN')
-        calendar.add('version', '2.0')
-        calendar.add('calscale', 'GREGORIAN')  # Optional but recommended
-        for course in courses:            
-            course_info = course_map.get(course['id'])
-
-            if course_info:
-                course_events = get_canvas_events(context_codes=f"course_{course_info['course_id']}", start_date = course_info['start_at'], end_date = course_info['end_at'])
-
-                for item in course_events:
-                    event = Event()
-                    event.add('uid', f"canvas-eventid-{item['id']}")
-                    event.add('dtstamp', datetime.now().replace(tzinfo=timezone.utc))
-                    event.add('summary', course_info['course_name'] + " " + item["title"])
-                    
-                    # Remove 'Z' and replace with '+00:00' to make it ISO compliant for fromisoformat
-                    dtstart = datetime.fromisoformat(item["start_at"].replace('Z', '+00:00'))
-                    # Optionally convert to UTC explicitly
-                    dtstart = dtstart.astimezone(timezone.utc)
-                    event.add('dtstart', dtstart)
-
-                    # Remove 'Z' and replace with '+00:00' to make it ISO compliant for fromisoformat
-                    dtend = datetime.fromisoformat(item["end_at"].replace('Z', '+00:00'))
-                    # Optionally convert to UTC explicitly
-                    dtend = dtend.astimezone(timezone.utc)
-                    event.add('dtend', dtend)
-
-                    event.add('location', item["location_name"])
-                    event.add('description', html_to_text(item.get("description", "")))
-
-                    # Add HTML version (non-standard but widely supported)
-                    # Create the HTML description with parameter
-                    event['X-ALT-DESC'] = vText(item.get("description", ""))
-                    event['X-ALT-DESC'].params['FMTTYPE'] = 'text/html'
-                    calendar.add_component(event)
+        group_courses = list({course['id']: unique_courses[course['id']]
+                              for course in courses if course['id'] in unique_courses}.values())
 
+        # Skip the group when neither its courses nor their events changed
         filename = filename_map.get(group_name, f"{group_name}.ics")
         full_path = os.path.join(CALENDAR_FOLDER, filename)
+        inputs_hash = calendar_feeds.group_hash(
+            filename, [(info['course_id'], info['course_name']) for info in group_courses], course_hashes)
+        if not force and not calendar_feeds.needs_update(group_name, filename, inputs_hash, full_path):
+            if not calendar_feeds.is_published(full_path):
+                calendar_feeds.publish(full_path)  # e.g. generated before feeds were precompressed
+            calendar_feeds.mark_checked(group_name)
+            skipped.append(group_name)
+            continue
+
+        # Streamed event by event into a temporary file that replaces the feed when complete
+        with calendar_feeds.atomic_file(full_path) as f:
+            event_count = write_calendar(f, feed_prodid(group_name), feed_events(group_courses, events_by_course))
+        calendar_feeds.publish(full_path)
+        calendar_feeds.mark_generated(group_name, filename, inputs_hash, len(group_courses), event_count)
+        generated.append(group_name)
+
+    html_text.save()
+    print(f"[{datetime.now()}] ICS files generated: {len(generated)} regenerated, {len(skipped)} skipped (unchanged).")
+    return jsonify({"message": "Calendar files updated.", "generated": generated, "skipped": skipped})
+
+@bp.route("/calendar_groups/<int:group_id>/feed.ics")
+@permission_required('calendar+add, calendar+edit')
+def calendar_group_feed(group_id):
+    """
+    The group's calendar built on request from the event store (app/canvas_event_store.py,
+    which syncs its courses from Canvas first if their copy is stale) and streamed as it is
+    serialised.
+    """
+    group = CalendarGroup.query.get_or_404(group_id)
+    course_map = feed_course_map()
+    selections = CalendarGroupSelection.query.filter_by(group_name=group.name).all()
+    group_courses = list({s.course_id: course_map[s.course_id] for s in selections if s.course_id in course_map}.values())
+    events_by_course = load_events_by_window(
+        (f"course_{info['course_id']}", info['start_at'], info['end_at']) for info in group_courses
+    )
+    return Response(stream_calendar(feed_prodid(group.name), feed_events(group_courses, events_by_course)),
+                    mimetype="text/calendar")
+
+def feed_course_map():
+    """{course id (str): course_id, course_name, start_at, end_at} for the courses feeds can use."""
+    courses = get_courses_for_accounts(["SSPPS", "SOM"], state=["available"])
+
+    # Courses without dates share one default window (computed once, so they batch together)
+    now_local = datetime.now(dateutil.tz.gettz()).replace(minute=0, second=0, microsecond=0)
+    default_start = now_local.replace(month=1, day=1, hour=0)
+    default_end = now_local.replace(hour=0) + relativedelta(years=5)
+
+    return {
+        f"{course['id']}": {
+            "course_id": course['id'],
+            "course_name": course.get('name', 'Unnamed Course'),
+            "start_at": convert_utc_to_local(course.get('start_at')) or default_start,
+            "end_at": convert_utc_to_local(course.get('end_at')) or default_end,
+        }
+        for course in courses if 'id' in course
+    }
+
+def feed_prodid(group_name):
+    return f'-//Canvas Calendars//{group_name}//EN'
 
-        with open(full_path, "wb") as f:
-            f.write(calendar.to_ical())
-            
-    print(f"[{datetime.now()}] ICS files generated.")
-    return jsonify({"message": "Calendar files updated."})
-
-def html_to_text(html):
-    if not html:
-        return ""
-    
-    soup = BeautifulSoup(html, "html.parser")
-    text = soup.get_text(separator="\n")
-
-    # Normalize line endings and remove excessive empty lines
-    text = re.sub(r'\n\s*\n+', '\n\n', text.strip())
-    
-    # Escape problematic characters for ICS
-    text = text.replace('\\', '\\\\').replace('\n', '\\n').replace(',', '\\,').replace(';', '\\;')
-    
-    return text
+def feed_events(group_courses, events_by_course):
+    """VEVENT fields (app/ics_writer.py) for every event of the group's courses, in course order."""
+    for course_info in group_courses:
+        for item in events_by_course.get(f"course_{course_info['course_id']}", []):
+            yield {
+                "uid": f"canvas-eventid-{item.id}",
+                "summary": course_info['course_name'] + " " + item.title,
+                # Dates for all-day events, UTC datetimes otherwise (normalised in app/canvas_events.py)
+                "start": item.start,
+                "end": item.end,
+                "location": item.location_name,
+                "description": html_text.html_to_text(item.description),
+                "html_description": item.description,
+            }
 
 def convert_utc_to_local(utc_string):
     """Parses a UTC ISO string and converts it to the local timezone datetime object."""
@@ -1,8 +1,12 @@
-from app.cred import CANVAS_API_BASE, CANVAS_API_TOKEN
+from app import api_cache, canvas_catalog, canvas_enrollment, canvas_graphql, config
+from app.api_cache import api_cached
+from app.canvas_api import CANVAS_API_BASE, get_first_page, get_paginated
+from app.canvas_events import fetch_events
+from app.models import CanvasEnrollmentJob
 from app.utils import permission_required
-from datetime import datetime, timezone, timedelta
+from datetime import datetime
 from flask import render_template, request, Blueprint, jsonify
-from flask_login import login_required
+from flask_login import current_user, login_required
 from os.path import dirname, join, abspath
 import os
 import pytz
@@ -25,6 +29,12 @@ SOMAccountID = 445
 SSPPSAccountID = 50
 SPPHAccountID = 520
 
+ACCOUNT_IDS = {"HS": HSAccountID, "SSPPS": SSPPSAccountID, "SOM": SOMAccountID, "SPPH": SPPHAccountID}
+
+def account_id(account):
+    """Canvas account id for a short code; anything else is the main account."""
+    return ACCOUNT_IDS.get(account, mainAccountID)
+
 # Routes to Webpages
 # @bp.before_request
 # @login_required
@@ -33,28 +43,28 @@ SPPHAccountID = 520
 
 def get_canvas_courses(account="SSPPS", blueprint=False, state=None, term_id=None):
     """
-    Fetches all Canvas courses for the authenticated user using pagination.
+    Canvas courses of an account, sorted by name.
+
+    Reads the local catalog mirror (app/canvas_catalog.py) once the account has been synced,
+    otherwise lists the courses from Canvas.
 
     Args:
-        base_url (str): Base URL of the Canvas instance (e.g., 'https://canvas.instructure.com')
-        access_token (str): Bearer token for authentication.
-        per_page (int): Number of courses per page.
+        account (str): Canvas account short code (default "SSPPS").
+        blueprint (bool): Canvas blueprint filter; blueprint courses are not mirrored.
+        state (list): Canvas state[] filter, e.g. ["available"].
+        term_id (int): only courses in this enrollment term.
 
     Returns:
         list: List of all course dictionaries.
     """
-    if account == "HS":
-        accountID = HSAccountID
-    elif account == "SSPPS":
-        accountID = SSPPSAccountID
-    elif account == "SOM":
-        accountID = SOMAccountID
-    elif account == "SPPH":
-        accountID = SPPHAccountID
-    else:
-        accountID = mainAccountID
-    
-    headers = {'Authorization': f'Bearer {CANVAS_API_TOKEN}'}
+    accountID = account_id(account)
+    if not blueprint and canvas_catalog.is_synced(accountID):
+        return canvas_catalog.list_courses(accountID, term_id=term_id, states=state)
+    return fetch_canvas_courses(accountID, blueprint=blueprint, state=state, term_id=term_id)
+
+@api_cached("canvas_courses")
+def fetch_canvas_courses(accountID, blueprint=False, state=None, term_id=None):
+    """Live listing of an account's courses from Canvas (cached briefly)."""
     params = {'per_page': 100, 
               "blueprint": blueprint, 
               "include[]": ["term","account_name"]}
@@ -65,28 +75,39 @@ def get_canvas_courses(account="SSPPS", blueprint=False, state=None, term_id=Non
     if state is not None:
       params['state[]'] = state
     url = f"{CANVAS_API_BASE}/accounts/{accountID}/courses"
-    all_courses = []
-
-    while url:
-        # print(url)
-        response = requests.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        all_courses.extend(response.json())
-
-        # Parse the Link header for next page
-        links = response.headers.get("Link", "")
-        next_url = None
-        for link in links.split(","):
-            if 'rel="next"' in link:
-                next_url = link[link.find("<") + 1:link.find(">")]
-                break
-        url = next_url
-        params = None  # After the first request, pagination is handled by the link
+    all_courses = get_paginated(url, params=params)
 
     all_courses = sorted(all_courses, key=lambda d: d['name'])
 
     return all_courses
 
+def get_courses_for_accounts(accounts, state=None, term_id=None):
+    """
+    Courses of several accounts in one list sorted by name, each with its "term".
+
+    Mirrored accounts are read from the catalog; the rest are loaded together through
+    app/canvas_graphql.py (a REST sweep per account for these maps without sections). Blueprint courses
+    are left out.
+    """
+    courses, live = [], []
+    for account in accounts:
+        accountID = account_id(account)
+        if canvas_catalog.is_synced(accountID):
+            courses.extend(canvas_catalog.list_courses(accountID, term_id=term_id, states=state))
+        else:
+            live.append(accountID)
+    if live:
+        courses.extend(fetch_courses_batch(tuple(live), state=state, term_id=term_id))
+
+    unique = {c["id"]: c for c in courses}  # an account can also be a sub-account of another
+    return sorted(unique.values(), key=lambda d: d['name'])
+
+@api_cached("canvas_courses")
+def fetch_courses_batch(accountIDs, state=None, term_id=None):
+    """Live listing of several accounts' courses (cached briefly)."""
+    by_account = canvas_graphql.load_courses(accountIDs, term_id=term_id, states=state)
+    return [course for courses in by_account.values() for course in courses]
+
 def get_canvas_users(account="SSPPS", search_term=None):
     """
     Fetches all Canvas courses for the authenticated user using pagination.
@@ -99,46 +120,68 @@ def get_canvas_users(account="SSPPS", search_term=None):
     Returns:
         list: List of all course dictionaries.
     """
-    if account == "HS":
-        accountID = HSAccountID
-    elif account == "SSPPS":
-        accountID = SSPPSAccountID
-    elif account == "SOM":
-        accountID = SOMAccountID
-    elif account == "SPPH":
-        accountID = SPPHAccountID
-    else:
-        accountID = mainAccountID
+    accountID = account_id(account)
     
-    headers = {'Authorization': f'Bearer {CANVAS_API_TOKEN}'}
     params = {'per_page': 100}
     
     if search_term is not None:
       params['search_term'] = search_term
 
     url = f"{CANVAS_API_BASE}/accounts/{accountID}/users"
-    all_users = []
-
-    while url:
-        # print(url)
-        response = requests.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        all_users.extend(response.json())
-
-        # Parse the Link header for next page
-        links = response.headers.get("Link", "")
-        next_url = None
-        for link in links.split(","):
-            if 'rel="next"' in link:
-                next_url = link[link.find("<") + 1:link.find(">")]
-                break
-        url = next_url
-        params = None  # After the first request, pagination is handled by the link
+    all_users = get_paginated(url, params=params)
 
     all_users = sorted(all_users, key=lambda d: d['name'])
 
     return all_users
 
+USER_SEARCH_FIELDS = ("name", "sortable_name", "short_name", "login_id", "sis_user_id", "email")
+
+def _user_matches(user, term):
+    return any(term in str(user.get(f) or "").lower() for f in USER_SEARCH_FIELDS) or term == str(user.get("id"))
+
+def search_canvas_users(account="SSPPS", search_term=""):
+    """
+    Typeahead lookup: up to CANVAS_USER_SEARCH_LIMIT users of the account matching
+    search_term (name, login, SIS id or email), sorted by name.
+
+    Results are cached per account and term in the "canvas_user_search" namespace. While a
+    user keeps typing, a cached result for a shorter prefix that was not cut off by the limit
+    already holds every match, so it is filtered locally instead of asking Canvas again.
+    """
+    accountID = account_id(account)
+    term = search_term.strip().lower()
+    limit = min(getattr(config, "CANVAS_USER_SEARCH_LIMIT", 50), 100)
+    min_chars = getattr(config, "CANVAS_USER_SEARCH_MIN_CHARS", 3)
+
+    for length in range(len(term) - 1, min_chars - 1, -1):
+        shorter = api_cache.peek("canvas_user_search", (accountID, term[:length]))
+        if shorter is not None and len(shorter) < limit:
+            return [u for u in shorter if _user_matches(u, term)]
+
+    def load():
+        url = f"{CANVAS_API_BASE}/accounts/{accountID}/users"
+        users = get_first_page(url, params={'per_page': limit, 'search_term': term, 'sort': 'username'})
+        return sorted(users, key=lambda d: d.get('sortable_name') or d.get('name') or "")
+    return api_cache.get_or_load("canvas_user_search", (accountID, term), load)
+
+@bp.route("/users/search")
+@permission_required('canvas_enrollments+add')
+def search_canvas_users_api():
+    """
+    Typeahead for the enrollment pages: ?account=SSPPS&q=smith returns
+    [{id, name, sortable_name, login_id, sis_user_id}] (empty below the minimum length).
+    """
+    term = (request.args.get("q") or "").strip()
+    if len(term) < getattr(config, "CANVAS_USER_SEARCH_MIN_CHARS", 3):
+        return jsonify([])
+    try:
+        users = search_canvas_users(account=request.args.get("account", "SSPPS"), search_term=term)
+    except requests.exceptions.RequestException as e:
+        print(f"[{datetime.now()}] Canvas user search failed for {term!r}: {e}")
+        return jsonify({"error": "Canvas user search failed"}), 502
+    return jsonify([{key: u.get(key) for key in ("id", "name", "sortable_name", "login_id", "sis_user_id")}
+                    for u in users])
+
 # @bp.route("/api/courses")
 def get_courses_api():
     term_id = request.args.get('term_id')
@@ -164,6 +207,10 @@ def get_terms_with_courses(account="SSPPS"):
     Returns:
         List of dicts with keys: id, name, courses (list of dicts)
     """
+    accountID = account_id(account)
+    if canvas_catalog.is_synced(accountID):
+        return canvas_catalog.terms_with_courses(accountID)  # one indexed query
+
     all_courses = get_canvas_courses(account=account)
 
     # Group courses by enrollment_term_id
@@ -229,72 +276,15 @@ def get_canvas_courses_by_term(term_id, account="SSPPS"):
     all_courses = get_canvas_courses(account=account, term_id=term_id)
     return all_courses
 
-def get_canvas_events(context_codes=[], start_date=datetime.now(), end_date=None, all_events=True):
-    headers = {'Authorization': f'Bearer {CANVAS_API_TOKEN}'}
-    page = 1
-    page_size = 100
-    params = {'per_page': page_size, "state[]":"available"}    
-
-    # ✅ Correctly add multiple context_codes
-    if context_codes:
-        params['context_codes[]'] = context_codes 
-        
-    if start_date or end_date:
-        if start_date and isinstance(start_date, datetime):
-            start_date = start_date.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
-        else:
-            start_date = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
-        params['start_date'] = start_date
-        if end_date and isinstance(end_date, datetime):
-            end_date = end_date.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
-        else:
-            # Default end_date to one year after start_date if not provided
-            dt = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
-            end_date = (dt + timedelta(days=365)).astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
-        params['end_date'] = end_date
-    else:
-        params['all_events'] = 'true'
-
-    url = f"{CANVAS_API_BASE}/calendar_events"
-    events = []
-    repeat = True
-
-    while repeat:
-        # print("page",page)
-        params['page'] = page  
-        response = requests.get(url, headers=headers, params=params)
-        # print(response)
-        if not response.ok:
-            # print(f"Canvas API error {response.status_code}: {response.text}")
-            break
-
-        data = response.json()
-        for event in data:
-            if event["all_day"] and "all_day_date" in event and event["all_day_date"]:
-                # Parse date (assume YYYY-MM-DD from Canvas or your source)
-                all_day = datetime.strptime(event["all_day_date"], "%Y-%m-%d").date()
-                event['start_at'] = all_day.strftime("%Y%m%d")  # 20251017
-                event['end_at'] = (all_day + timedelta(days=1)).strftime("%Y%m%d")  # 20251018
-                event['is_all_day'] = True
-            else:
-                if 'start_at' in event:
-                    event['local_start_at'] = datetime.fromisoformat(
-                        event['start_at'].replace('Z', '+00:00')
-                    ).astimezone(PACIFIC_TZ).strftime('%m/%d/%Y %I:%M %p')
-                if 'end_at' in event:
-                    event['local_end_at'] = datetime.fromisoformat(
-                        event['end_at'].replace('Z', '+00:00')
-                    ).astimezone(PACIFIC_TZ).strftime('%m/%d/%Y %I:%M %p')
-            events.append(event)
-            # print(event['local_start_at'], event['local_end_at'], event.get('title','No Title'))
-        # print("len",len(data))
-
-        if len(data) < page_size:
-            repeat = False
-
-        page += 1
-
-    return events
+def get_canvas_events(context_codes=None, start_date=None, end_date=None, all_events=False):
+    """
+    Canvas calendar events for context_codes (a code or a list) as dictionaries.
+
+    start_date defaults to now and end_date to a year after start_date; all_events=True asks
+    for every event instead. See app/canvas_events.py for batching and normalisation.
+    """
+    events = fetch_events(context_codes or [], start=start_date, end=end_date, all_events=all_events)
+    return [event.to_dict() for event in events]
 
 def chunked_list(lst, n):
     """Yield successive n-sized chunks from list."""
@@ -304,33 +294,24 @@ def chunked_list(lst, n):
 # @bp.route('/terms')
 def get_enrollment_terms():
     """
-    Fetches all enrollment terms for a given Canvas account using pagination.
+    All enrollment terms of the main Canvas account, from the catalog mirror once it has
+    been synced and from Canvas otherwise.
 
     Returns:
         list: List of term dictionaries.
     """
+    if canvas_catalog.terms_synced():
+        return canvas_catalog.list_terms()
+    return fetch_enrollment_terms()
+
+@api_cached("canvas_terms")
+def fetch_enrollment_terms():
+    """Live listing of the enrollment terms from Canvas (cached briefly)."""
     accountID = mainAccountID
 
-    headers = {'Authorization': f'Bearer {CANVAS_API_TOKEN}'}
     params = {'per_page': 100}
     url = f"{CANVAS_API_BASE}/accounts/{accountID}/terms"
-    all_terms = []
-
-    while url:
-        response = requests.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        data = response.json()
-        all_terms.extend(data.get("enrollment_terms", []))
-
-        # Parse the Link header for pagination
-        links = response.headers.get("Link", "")
-        next_url = None
-        for link in links.split(","):
-            if 'rel="next"' in link:
-                next_url = link[link.find("<") + 1:link.find(">")]
-                break
-        url = next_url
-        params = None  # Don't re-apply params after the first request
+    all_terms = get_paginated(url, params=params, extract=lambda data: data.get("enrollment_terms", []))
 
     return all_terms
 
@@ -345,29 +326,13 @@ def get_enrollments(course_id, enrollment_type="StudentEnrollment"):
     Returns:
         list: List of enrollment dictionaries.
     """
-    headers = {'Authorization': f'Bearer {CANVAS_API_TOKEN}'}
     params = {
         'per_page': 100,
         'type[]': enrollment_type,
         'include[]': 'user'
     }
     url = f"{CANVAS_API_BASE}/courses/{course_id}/enrollments"
-    all_enrollments = []
-
-    while url:
-        response = requests.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        all_enrollments.extend(response.json())
-
-        # Pagination via Link header
-        links = response.headers.get("Link", "")
-        next_url = None
-        for link in links.split(","):
-            if 'rel="next"' in link:
-                next_url = link[link.find("<") + 1:link.find(">")]
-                break
-        url = next_url
-        params = None  # Handled via next URL
+    all_enrollments = get_paginated(url, params=params)
 
     return all_enrollments
 
@@ -377,12 +342,16 @@ def get_canvas_sections_api(course_id):
     """
     Returns all sections for a given Canvas course.
     """
-    headers = {'Authorization': f'Bearer {CANVAS_API_TOKEN}'}
-    url = f"{CANVAS_API_BASE}/courses/{course_id}/sections?per_page=100"
+    if not request.args.get("refresh"):
+        sections = canvas_catalog.list_sections(course_id)
+        if sections is not None:
+            return jsonify(sections)
 
-    response = requests.get(url, headers=headers)
-    response.raise_for_status()
-    return jsonify(response.json())
+    url = f"{CANVAS_API_BASE}/courses/{course_id}/sections"
+    sections = get_paginated(url, params={'per_page': 100})
+    if canvas_catalog.is_mirrored(course_id):
+        canvas_catalog.store_sections(course_id, sections)
+    return jsonify(sections)
 
 def enroll_user(course_id, user_id, enrollment_type="StudentEnrollment", enrollment_state="active", section_id="", notify=False):
     """
@@ -399,29 +368,11 @@ def enroll_user(course_id, user_id, enrollment_type="StudentEnrollment", enrollm
     Returns:
         dict: Enrollment response from Canvas.
     """
-    headers = {'Authorization': f'Bearer {CANVAS_API_TOKEN}'}
-    url = f"{CANVAS_API_BASE}/courses/{course_id}/enrollments"
-
-    payload = {
-        'enrollment[user_id]': user_id,
-        'enrollment[type]': enrollment_type,
-        'enrollment[enrollment_state]': enrollment_state,
-        'enrollment[notify]': 'true' if notify else 'false'
-        # 'enrollment[notify]': 'false'
-    }
-
-    if section_id:
-        payload['enrollment[course_section_id]'] = section_id
-
-    # print("payload",payload)
-    # return payload.json()
-    response = requests.post(url, headers=headers, data=payload)
-    response.raise_for_status()
-    return response.json()
+    return canvas_enrollment.enroll_user(course_id, user_id, enrollment_type, enrollment_state, section_id, notify)
 
 def enroll_multiple_users(course_id, users, enrollment_type="StudentEnrollment", enrollment_state="active", section_id="", notify=False):
     """
-    Enroll multiple users into a Canvas course.
+    Enroll multiple users into a Canvas course, one request per user (several at a time).
 
     Args:
         course_id (int): Canvas course ID.
@@ -434,26 +385,7 @@ def enroll_multiple_users(course_id, users, enrollment_type="StudentEnrollment",
     Returns:
         list: List of enrollment results or errors.
     """
-    results = []
-    for user_id in users:
-        try:
-            result = enroll_user(
-                course_id=course_id,
-                user_id=user_id,
-                enrollment_type=enrollment_type,
-                enrollment_state=enrollment_state,
-                section_id=section_id,
-                notify=notify
-            )
-            results.append({"user_id": user_id, "status": "success", "result": result})
-        except requests.exceptions.HTTPError as e:
-            results.append({
-                "user_id": user_id,
-                "status": "error",
-                "message": str(e),
-                "details": e.response.text
-            })
-    return results
+    return canvas_enrollment.enroll_concurrently(course_id, users, enrollment_type, enrollment_state, section_id, notify)
 
 @bp.route("/enroll_user_api", methods=["POST"])
 @permission_required('canvas_enrollments+add')
@@ -500,7 +432,7 @@ def enroll_user_api():
 @permission_required('canvas_enrollments+add')
 def enroll_users_bulk_api():
     """
-    Bulk enroll users into a Canvas course.
+    Bulk enroll users into a Canvas course (see app/canvas_enrollment.py).
     Expects JSON with:
         - course_id (int)
         - users (list of user IDs or SIS IDs)
@@ -510,7 +442,8 @@ def enroll_users_bulk_api():
         - notify (optional)
 
     Returns:
-        JSON list of enrollment results per user.
+        JSON enrollment job: id, method, status, progress, counts and per-user results.
+        A job still "Running" (a SIS import) is polled at /canvas/enrollment_jobs/<id>.
     """
     data = request.get_json()
     course_id = data.get("course_id")
@@ -519,18 +452,27 @@ def enroll_users_bulk_api():
     if not course_id or not users:
         return jsonify({"error": "Missing course_id or users[]"}), 400
 
-    enrollment_type = data.get("enrollment_type", "StudentEnrollment")
-    enrollment_state = data.get("enrollment_state", "active")
-    section_id = data.get("section_id", "")
-    notify = data.get("notify", False)
-
-    results = enroll_multiple_users(
+    job = canvas_enrollment.submit_enrollment(
+        mainAccountID,
         course_id=course_id,
         users=users,
-        enrollment_type=enrollment_type,
-        enrollment_state=enrollment_state,
-        section_id=section_id,
-        notify=notify
+        enrollment_type=data.get("enrollment_type", "StudentEnrollment"),
+        enrollment_state=data.get("enrollment_state", "active"),
+        section_id=data.get("section_id", ""),
+        notify=data.get("notify", False),
+        created_by=current_user.id,
     )
+    return jsonify(canvas_enrollment.job_dict(job)), 202 if job.status == "Running" else 200
 
-    return jsonify(results)
+@bp.route("/enrollment_jobs/<int:job_id>")
+@permission_required('canvas_enrollments+add')
+def enrollment_job_status(job_id):
+    """Progress and results of a bulk enrollment job."""
+    job = CanvasEnrollmentJob.query.get_or_404(job_id)
+    canvas_enrollment.refresh_job(mainAccountID, job)
+    return jsonify(canvas_enrollment.job_dict(job))
+
+def sync_canvas_catalog(full=False):
+    """Refresh the catalog mirror for the accounts in CANVAS_CATALOG_ACCOUNTS (see sync_canvas_catalog.py)."""
+    accounts = getattr(config, "CANVAS_CATALOG_ACCOUNTS", ["SSPPS", "SOM", "SPPH", "HS"])
+    return canvas_catalog.sync_catalog(mainAccountID, [account_id(a) for a in accounts], full=full)
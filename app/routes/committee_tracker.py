@@ -1,4 +1,5 @@
 from app.utils import permission_required, has_permission, committee_edit_required
+from app.permission_index import invalidate_permission_index
 from app.models import db, AcademicYear, Attendance, AYCommittee, Committee, Member, MemberRole, FrequencyType, CommitteeType, Employee, Meeting, FileUpload, User, Role, Permission
 from app.forms import AYCommitteeForm, CommitteeForm, CommitteeReportForm, MemberForm, MemberRoleForm, MeetingForm, FileUploadForm, FrequencyTypeForm, CommitteeTypeForm
 from datetime import datetime
@@ -1097,6 +1098,7 @@ def add_member_as_user(employee_id=None):
         user.create_by = current_user.id
         db.session.add(user)
         db.session.commit()
+        invalidate_permission_index()
     else:
         committee_viewer_perm = Permission.query.filter_by(deleted=False).filter(Permission.resource=="committee", Permission.action=="view").first()
         role_permission_ids = set(p.id for p in user.role.permissions) if user.role else set()
@@ -1109,6 +1111,7 @@ def add_member_as_user(employee_id=None):
             user.modify_by = current_user.id
             db.session.add(user)
             db.session.commit()
+            invalidate_permission_index()
     return user
 
 def allowed_file(filename):
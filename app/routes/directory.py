@@ -1,13 +1,13 @@
-from app import config, db
+from app import db
 from app.forms import CategoryForm, ContactForm
 from app.models import ContactCategory, Contact, ContactHeader
 from app.cred import HR_EMAIL_ADDRESS
+from app.email import queue_email
 from app.utils import permission_required
 from flask import abort, Blueprint, flash, jsonify, redirect, request, render_template, url_for
 from flask_login import login_required, current_user
 from flask_wtf.csrf import generate_csrf
 from sqlalchemy.inspection import inspect
-import subprocess
 
 bp = Blueprint("directory", __name__, url_prefix="/directory")
 
@@ -332,11 +332,13 @@ def save_contact():
                 recipients.append(header.comms)
 
             if recipients:
-                send_email_via_powershell(
-                    to_address=",".join(recipients),
-                    from_address=from_address,
+                queue_email(
+                    to=recipients,
+                    cc=[from_address],
+                    sender=from_address,
                     subject=subject,
-                    body=body
+                    body=body,
+                    html=True
                 )
 
         except Exception as e:
@@ -405,48 +407,3 @@ def save_pdf_header():
         return jsonify({"success": False, "message": str(e)}), 500
     
     return jsonify({"success": True, "message": "Header saved successfully"})
-
-# @login_required
-def send_email_via_powershell(to_address, to_cc=None, from_address=None, subject=None, body=None, attachment_path=None):
-    """Sends email using PowerShell's Send-MailMessage cmdlet."""
-    print(to_address,  to_cc, from_address, subject, body, attachment_path)
-    # Escape double quotes in the body so HTML isn’t broken
-    safe_body = body.replace('"', '`"') if body else ""
-
-    # Build PowerShell recipient arrays
-    to_list = to_address.split(",") if to_address else []
-    cc_list = []
-
-    if to_cc:
-        cc_list.append(to_cc)
-    if from_address:
-        cc_list.append(from_address)
-
-    ps_to = ",".join(f'"{addr.strip()}"' for addr in to_list)
-    ps_cc = ",".join(f'"{addr.strip()}"' for addr in cc_list)
-
-    base_cmd = f'''
-    Send-MailMessage `
-        -From "{from_address}" `
-        -To @({ps_to}) `
-        -Cc @({ps_cc}) `
-        -Subject "{subject}" `
-        -Body "{safe_body}" `
-        -BodyAsHtml `
-        -SmtpServer "{config.MAIL_SERVER}" `
-        -UseSsl
-    '''
-
-    if attachment_path:
-        base_cmd += f' -Attachments "{attachment_path}"'
-
-    completed = subprocess.run(
-        ["powershell", "-Command", base_cmd],
-        capture_output=True,
-        text=True
-    )
-
-    if completed.returncode != 0:
-        print("Error sending mail:", completed.stderr)
-    else:
-        print("Mail sent successfully")
@@ -1,3 +1,4 @@
+from app import config
 from app.forms import StudentForm, CSRFOnlyForm
 from app.models import db, Employee
 from app.utils import permission_required
@@ -5,18 +6,8 @@ from .canvas import get_enrollment_terms, get_canvas_courses, get_canvas_users,
 from datetime import datetime
 from flask import render_template, redirect, url_for, request, flash, jsonify, Blueprint, send_file, abort, make_response, Response
 from flask_login import login_required, current_user
-from io import BytesIO
-from PIL import UnidentifiedImageError
-from reportlab.lib.pagesizes import LETTER
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib.units import inch
-from reportlab.lib.utils import ImageReader
-from reportlab.pdfgen import canvas
-from reportlab.platypus import SimpleDocTemplate, Image, Spacer, Table, TableStyle, Paragraph
 from werkzeug.utils import secure_filename
-import chardet
 import os
-import pandas as pd
 
 bp = Blueprint('employees', __name__, url_prefix='/employees')
 
@@ -50,7 +41,10 @@ def enroll_employees():
             course['id'] = str(course['id'])
             course['course_code'] = course.get('course_code') or ""
 
-    employees = get_canvas_users(account=account)
+    # Users are looked up on demand through /canvas/users/search; ?users=all lists the
+    # whole account up front as before
+    load_all = request.args.get('users') == 'all'
+    employees = get_canvas_users(account=account) if load_all else []
 
     available_accounts = ["HS", "SSPPS", "SOM"]
     # print(employees)
@@ -61,5 +55,9 @@ def enroll_employees():
         terms=terms,
         terms_with_courses=terms_with_courses,
         account=account,
-        available_accounts=available_accounts
+        available_accounts=available_accounts,
+        user_search=None if load_all else {
+            'account': account,
+            'minChars': getattr(config, 'CANVAS_USER_SEARCH_MIN_CHARS', 3),
+        }
     )
@@ -1,14 +1,13 @@
+from app import http_client
+from app.api_cache import api_cached
 from app.forms import GroupForm
 from app.models import db, Listserv, Student, Employee
 from app.utils import permission_required
 from datetime import datetime
 from flask import render_template, redirect, url_for, request, flash, jsonify, Blueprint, send_file, abort, make_response, Response
 from flask_login import login_required, current_user
-from google.auth.transport.requests import Request
-from google.oauth2 import service_account
 import os
 import pytz
-import requests
 
 bp = Blueprint('google', __name__, url_prefix='/google')
 
@@ -16,6 +15,7 @@ bp = Blueprint('google', __name__, url_prefix='/google')
 SERVICE_ACCOUNT_FILE =  os.path.join('app', 'nodal-album-464015-d4-e7b2f79666a6.json')
 DELEGATED_EMAIL =  'groups-read-only@nodal-album-464015-d4.iam.gserviceaccount.com'  # Admin email
 SCOPES = ['https://www.googleapis.com/auth/cloud-identity.groups.readonly']
+TOKEN_URI = 'https://oauth2.googleapis.com/token'
 
 # Routes to Webpages
 @bp.before_request
@@ -24,12 +24,16 @@ def before_request():
     pass
 
 def get_request_headers():
+    # google-auth is slow to import; load it only when a Google page is used
+    from google.auth.transport.requests import Request
+    from google.oauth2 import service_account
+
     credentials = service_account.Credentials.from_service_account_file(
         SERVICE_ACCOUNT_FILE, scopes=SCOPES
     ).with_subject(DELEGATED_EMAIL)
 
-    # Refresh to get token
-    credentials.refresh(Request())
+    # Refresh to get token, reusing the pooled connection to the token endpoint
+    credentials.refresh(Request(session=http_client.session_for(TOKEN_URI)))
     access_token = credentials.token
     
     headers = {
@@ -38,6 +42,39 @@ def get_request_headers():
     }
     return headers
 
+@api_cached("google_members", key=lambda group_email: (group_email.lower(),))
+def get_group_memberships(group_email):
+    """Raw Cloud Identity memberships of a group. A cache hit also skips the token refresh."""
+    headers = get_request_headers()
+
+    # Make the HTTP request to Cloud Identity API
+    # Lookup group
+    lookup_resp = http_client.get(
+        'https://cloudidentity.googleapis.com/v1/groups:lookup',
+        headers=headers,
+        params={'groupKey.id': group_email}
+    )
+    lookup_resp.raise_for_status()
+    group_name = lookup_resp.json()['name']  # e.g. "groups/ABCD123456"
+
+    memberships = []
+    page_token = None
+    while True:
+        params = {'pageToken': page_token, 'view': 'FULL'} if page_token else {'view': 'FULL'}
+        resp = http_client.get(
+            f'https://cloudidentity.googleapis.com/v1/{group_name}/memberships',
+            headers=headers,
+            params=params
+        )
+        resp.raise_for_status()
+        data = resp.json()
+        memberships.extend(data.get('memberships', []))
+
+        page_token = data.get('nextPageToken')
+        if not page_token:
+            break
+    return memberships
+
 @bp.route('/groups', methods=['GET', 'POST'])
 @permission_required('listserv+view, listserv+add, listserv+edit, listserv+delete')
 def groups_page():
@@ -79,6 +116,7 @@ def delete_group(group_id):
         group.delete_date = datetime.now()
         group.delete_by=int(current_user.id)
         db.session.commit()
+        get_group_memberships.invalidate(group.group_name)
         flash('Group soft-deleted.', 'info')
     else:
         flash('Group already deleted.', 'warning')
@@ -87,26 +125,15 @@ def delete_group(group_id):
 @bp.route("/groups/<string:group_email>/members")
 @permission_required('listserv+view')
 def groups_members_page(group_email):
-    
-    headers = get_request_headers()
-    
     custom_breadcrumbs = [
         {'name': 'Google Groups', 'url': '/google/groups'},
         {'name': f'{group_email} Members', 'url': f'/google/{group_email}/members/'}
     ]
-    # Make the HTTP request to Cloud Identity API
-    # Lookup group
-    lookup_resp = requests.get(
-        'https://cloudidentity.googleapis.com/v1/groups:lookup',
-        headers=headers,
-        params={'groupKey.id': group_email}
-    )
-    lookup_resp.raise_for_status()
-    group_name = lookup_resp.json()['name']  # e.g. "groups/ABCD123456"
+    if request.args.get('refresh'):
+        get_group_memberships.invalidate(group_email)
+    memberships = get_group_memberships(group_email)
 
-    # Get members
     members = []
-    page_token = None
 
     # Filter students by class_of, course_id, etc.
     students = Student.query.filter_by(deleted = False).order_by(Student.last_name, Student.first_name).all()
@@ -124,37 +151,23 @@ def groups_members_page(group_email):
     for e in employees:
         usernames[e.username] = f"{e.employee_first_name} {e.employee_last_name}"
     
-    while True:
-        params = {'pageToken': page_token, 'view': 'FULL'} if page_token else {'view': 'FULL'}
-        resp = requests.get(
-            f'https://cloudidentity.googleapis.com/v1/{group_name}/memberships',
-            headers=headers,
-            params=params
-        )
-        resp.raise_for_status()
-        data = resp.json()
-        for m in data.get('memberships', []):
-            print(m)
-            # Original UTC timestamp
-            utc_time_str = m.get('createTime', '')
-
-            # Parse the UTC datetime
-            utc_dt = datetime.strptime(utc_time_str, "%Y-%m-%dT%H:%M:%S.%fZ")
-            utc_dt = utc_dt.replace(tzinfo=pytz.utc)
-
-            # Convert to Pacific Time
-            pacific = pytz.timezone("US/Pacific")
-            pacific_dt = utc_dt.astimezone(pacific)
-
-            members.append({
-                'email': m['preferredMemberKey']['id'],
-                'role': m['roles'][0]['name'] if m['roles'] else 'UNKNOWN',
-                'added': pacific_dt.strftime("%Y-%m-%d %I:%M:%S %p"),
-                'name': usernames.get(m['preferredMemberKey']['id'].split('@')[0], 'Unknown User')
-            })
-
-        page_token = data.get('nextPageToken')
-        if not page_token:
-            break
+    for m in memberships:
+        # Original UTC timestamp
+        utc_time_str = m.get('createTime', '')
+
+        # Parse the UTC datetime
+        utc_dt = datetime.strptime(utc_time_str, "%Y-%m-%dT%H:%M:%S.%fZ")
+        utc_dt = utc_dt.replace(tzinfo=pytz.utc)
+
+        # Convert to Pacific Time
+        pacific = pytz.timezone("US/Pacific")
+        pacific_dt = utc_dt.astimezone(pacific)
+
+        members.append({
+            'email': m['preferredMemberKey']['id'],
+            'role': m['roles'][0]['name'] if m['roles'] else 'UNKNOWN',
+            'added': pacific_dt.strftime("%Y-%m-%d %I:%M:%S %p"),
+            'name': usernames.get(m['preferredMemberKey']['id'].split('@')[0], 'Unknown User')
+        })
 
     return render_template('google/list_members.html', group=group_email, members=members, breadcrumbs=custom_breadcrumbs)
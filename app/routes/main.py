@@ -1,8 +1,11 @@
+from app import calendar_feeds, config
 from app.models import User, Employee
-from flask import session, Blueprint, render_template, request, redirect, url_for, flash, send_from_directory
+from flask import session, Blueprint, render_template, request, redirect, url_for, flash, send_from_directory, send_file, abort
 from flask_login import login_user, logout_user, login_required, current_user
 from urllib.parse import urlparse, urljoin
+from werkzeug.security import safe_join
 from flask import current_app
+import os
 
 bp = Blueprint('main', __name__, template_folder='templates')
 
@@ -97,7 +100,29 @@ def logout():
 
 @bp.route('/calendars/<path:filename>')
 def serve_calendar_file(filename):
-    return send_from_directory('static/calendars', filename, mimetype='text/calendar')
+    # Polled constantly by calendar clients: validators and compressed copies come from
+    # calendar_feeds.publish(), so most polls end in a 304 without touching the feed
+    path = safe_join(os.path.join(current_app.root_path, 'static', 'calendars'), filename)
+    if path is None or filename.endswith((calendar_feeds.META_SUFFIX, *calendar_feeds.COMPRESSED_SUFFIXES.values())):
+        abort(404)
+    meta = calendar_feeds.feed_meta(path)
+    if meta is None:
+        abort(404)
+
+    encoding = None
+    for candidate in ("br", "gzip"):
+        if candidate in meta["variants"] and request.accept_encodings.quality(candidate) > 0:
+            encoding = candidate
+            break
+    response = send_file(meta["variants"][encoding] if encoding else path, mimetype='text/calendar',
+                         conditional=True, etag=f'{meta["etag"]}-{encoding}' if encoding else meta["etag"],
+                         last_modified=meta["last_modified"],
+                         max_age=getattr(config, "CALENDAR_FEED_MAX_AGE", 900))
+    if encoding and response.status_code != 304:
+        response.headers["Content-Encoding"] = encoding
+    if meta["variants"]:
+        response.vary.add("Accept-Encoding")
+    return response
 
 @bp.route('/favicon.ico')
 def favicon():
@@ -5,10 +5,8 @@ from datetime import datetime, timezone, timedelta
 from flask import abort, Blueprint, flash, jsonify, redirect, request, render_template, url_for
 from flask_login import login_required, current_user
 from sqlalchemy import text
-import io
 import json
 import os
-import pandas as pd
 import re
 import subprocess
 
@@ -352,12 +350,16 @@ def import_files():
 # Helpers
 # -------------------------------------------------
 def clean(val):
+    import pandas as pd  # imported on first upload, not at app start
+
     if pd.isna(val):
         return None
     return str(val).strip()
 
 
 def parse_date(val):
+    import pandas as pd
+
     try:
         return pd.to_datetime(val, errors="coerce")
     except Exception:
@@ -372,6 +374,8 @@ def normalize_yes_no(val):
 
 
 def load_file(filepath):
+    import pandas as pd
+
     ext = os.path.splitext(filepath)[1].lower()
 
     if ext == ".csv":
@@ -479,6 +483,8 @@ def ensure_accepted_applicants_table(conn):
 # IMPORT ACCEPTED_APPLICANTS
 # -------------------------------------------------
 def import_applicants(filepath):
+    import pandas as pd
+
     df = load_file(filepath)
 
     errors = []
@@ -563,6 +569,8 @@ def import_applicants(filepath):
 # UPDATE TSN
 # -------------------------------------------------
 def update_tsn(filepath):
+    import pandas as pd
+
     df = load_file(filepath)
 
     errors = []
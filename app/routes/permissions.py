@@ -1,6 +1,7 @@
 from app.utils import admin_required
 from app.forms import  PermissionForm
 from app.models import Role, Permission, db
+from app.permission_index import invalidate_permission_index
 from datetime import datetime
 from flask import Blueprint, render_template, redirect, url_for, request, jsonify, flash
 
@@ -29,6 +30,7 @@ def edit(perm_id=None):
         form.populate_obj(perm)
         db.session.add(perm)
         db.session.commit()
+        invalidate_permission_index()
         flash('Permission saved.', 'success')
         return redirect(url_for('permissions.list_permissions'))
     return render_template('permissions/form.html', form=form)
@@ -40,6 +42,7 @@ def delete(perm_id):
     perm.deleted = True  # Set the  deleted flag
     perm.delete_date = datetime.now()
     db.session.commit()
+    invalidate_permission_index()
     flash("Permission deleted.", "success")
     return redirect(url_for('permissions.list_permissions'))
 
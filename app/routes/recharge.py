@@ -1,20 +1,16 @@
 from app import db
-from app import config
+from app import http_client
 from app.cred import GOOGLE_RECAPTCHA_SECRET, GOOGLE_RECAPTCHA_SITEKEY
+from app.email import queue_email
 from app.forms import InstrumentRequestForm
 from app.models import Department, Employee, InstrumentRequest, Instrument, ProjectTaskCode, User, InstrumentCalendarEvent as CalendarEvent
 from app.utils import permission_required, has_permission
 from datetime import datetime, timezone
 from flask import Blueprint, flash, jsonify, redirect, render_template, request, send_file, url_for, render_template_string
 from flask_login import login_required, current_user
-from PIL import Image, ImageDraw, ImageFont
 import hashlib
-import os
-import qrcode
-import subprocess
+import io
 import requests
-import tempfile
-import bleach
 
 bp = Blueprint('recharge', __name__, url_prefix='/recharge')
 
@@ -40,6 +36,7 @@ RECAPTCHA_SITEKEY = GOOGLE_RECAPTCHA_SITEKEY
 #     return login_required(lambda: None)()  # Call login_required manually
 
 def clean_input(value):
+    import bleach
     return bleach.clean(value, strip=True)
 
 
@@ -96,7 +93,7 @@ def parse_iso_utc(value: str) -> datetime:
 
 def verify_captcha(captcha_response):
     try:
-        r = requests.post(
+        r = http_client.post(
             "https://www.google.com/recaptcha/api/siteverify",
             data={
                 "secret": RECAPTCHA_SECRET,
@@ -348,6 +345,10 @@ def handle_request(request_id):
 def email_request_barcode(request_id):
 
     """Generates barcode and sends it via email."""
+    # PIL and qrcode are only needed here; keep them out of app start-up
+    from PIL import Image, ImageDraw, ImageFont
+    import qrcode
+
     req = InstrumentRequest.query.get_or_404(request_id)
     machine = Instrument.query.filter_by(machine_name=req.machine_name).first()
 
@@ -395,15 +396,9 @@ def email_request_barcode(request_id):
     # Paste QR
     new_img.paste(qr_img, (0, text_height + padding))
 
-    # ✅ Force save to a known writable location
-    filename = os.path.join(tempfile.gettempdir(), f"{req.id}.png")
-
-    try:
-        new_img.save(filename, "PNG")
-        print("Exists after save?", os.path.exists(filename))
-        print("QR saved:", filename)
-    except Exception as e:
-        print("Error saving QR:", str(e))
+    # Keep the barcode in memory; it is attached straight from bytes
+    barcode_png = io.BytesIO()
+    new_img.save(barcode_png, "PNG")
 
     # Send email with barcode
     subject = f"{req.machine_name} Request Approved"
@@ -438,13 +433,16 @@ def email_request_barcode(request_id):
     Screening Core</p>
     """
     
-    send_email_via_powershell(recipients, cc, sender, subject, body_html, filename)
-
-    # Delete barcode file
-    try:
-        os.remove(filename)
-    except OSError as e:
-        print(f"Error deleting file {filename}: {e}")
+    # Queued: the approval request returns immediately, MailSender delivers in the background
+    queue_email(
+        to=recipients,
+        cc=[cc, sender, "screeningcore@health.ucsd.edu"],
+        sender=sender,
+        subject=subject,
+        body=body_html,
+        html=True,
+        attachments=[(f"{req.id}.png", barcode_png.getvalue(), "image/png")]
+    )
 
     return req
 
@@ -461,25 +459,6 @@ def resend_email(request_id):
     flash(f"Request #{req.id} barcode emailed to {req.requestor_email}.", "success")
     return redirect(url_for("recharge.review_requests"))
 
-def send_email_via_powershell(to_address, to_cc=None, from_address=None, subject=None, body=None, attachment_path=None):
-    
-    """Sends email using PowerShell's Send-MailMessage cmdlet."""
-
-    # Escape double quotes in the body so HTML isn’t broken
-    safe_body = body.replace('"', '`"') if body else ""
-
-    if attachment_path:
-        ps_script = f'Send-MailMessage -From "{from_address}" -To "{to_address}" -Cc ("{to_cc}","{from_address}","screeningcore@health.ucsd.edu") -Subject "{subject}" -Body "{safe_body}" -BodyAsHtml -Attachments "{attachment_path}" -SmtpServer "{config.MAIL_SERVER}" -UseSsl'
-    else:
-        ps_script = f'Send-MailMessage -From "{from_address}" -To "{to_address}" -Cc ("{to_cc}","{from_address}","screeningcore@health.ucsd.edu") -Subject "{subject}" -Body "{safe_body}" -BodyAsHtml -SmtpServer "{config.MAIL_SERVER}" -UseSsl'
-    
-    completed = subprocess.run(["powershell", "-Command", ps_script], capture_output=True, text=True)
-    
-    if completed.returncode != 0:
-        print("Error sending mail:", completed.stderr)
-    else:
-        print("Mail sent successfully")
-
 def is_admin():
     return current_user.is_authenticated and has_permission("screeningcore_approve+add")
 
@@ -9,7 +9,6 @@ from flask_login import current_user, login_required
 from sqlalchemy import case, func, and_, Float, cast
 from sqlalchemy.orm import selectinload, with_loader_criteria, aliased
 from sqlalchemy.sql import func
-from xhtml2pdf import pisa
 import io
 import os
 
@@ -468,6 +467,8 @@ def generate_pdf():
 
 def convert_html_to_pdf(html_content):
     """Converts HTML content to a PDF file in memory."""
+    from xhtml2pdf import pisa  # heavy; imported on first PDF export
+
     pdf_file = io.BytesIO()
     pisa_status = pisa.CreatePDF(io.BytesIO(html_content.encode("utf-8")), pdf_file)
 
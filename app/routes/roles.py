@@ -1,6 +1,7 @@
 from app.utils import admin_required
 from app.forms import RoleForm
 from app.models import User, Role, Permission, db
+from app.permission_index import invalidate_permission_index
 from collections import defaultdict
 from datetime import datetime
 from flask import Blueprint, render_template, redirect, url_for, request, jsonify, flash
@@ -46,6 +47,7 @@ def edit(role_id=None):
         role.permissions = Permission.query.filter_by(deleted=False).filter(Permission.id.in_(selected_ids)).all()
         db.session.add(role)
         db.session.commit()
+        invalidate_permission_index()
         flash("Role updated successfully.", "success")
         return redirect(url_for('roles.list_roles'))
 
@@ -1,19 +1,22 @@
+from app import html_text
+from app.api_cache import api_cached
+from app.canvas_event_store import load_events
 from app.cred import PANOPTO_API_BASE, PANOPTO_CLIENT_ID, PANOPTO_CLIENT_SECRET
 from app.models import db, ScheduledRecording
 from app.utils import permission_required
-from .canvas import get_canvas_courses, get_canvas_events, chunked_list, get_enrollment_terms, get_canvas_courses_by_term
-from concurrent.futures import ThreadPoolExecutor, as_completed  # ✅ NEW: for parallel fetching
+from .canvas import get_canvas_courses, get_enrollment_terms, get_courses_for_accounts
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from dateutil import parser  # safer parsing
 from flask import Flask, redirect, render_template, request, Blueprint, jsonify, session, has_request_context, url_for
 from flask_login import login_required
-from flask_caching import Cache  # ✅ NEW: for caching folders/recorders
 from oauthlib.oauth2 import InvalidGrantError
 from os.path import dirname, join, abspath
 from functools import wraps
 from requests_oauthlib import OAuth2Session
 from urllib.parse import urlparse, urlunparse
 import argparse
+import hashlib
 import os
 import pytz
 import requests
@@ -25,9 +28,6 @@ sys.path.insert(0, abspath(join(dirname(__file__), '..', 'common')))
 
 bp = Blueprint('scheduler', __name__, url_prefix='/scheduler')
 
-# ✅ NEW: Simple in-memory cache (300s TTL). Wire up to your Flask app with cache.init_app(app)
-cache = Cache(config={"CACHE_TYPE": "SimpleCache"})
-
 PACIFIC_TZ = pytz.timezone("America/Los_Angeles")
 PANOPTO_PARENT_FOLDER = '66a0fa02-94a9-4fb9-ae75-aa71011bd7fc'
 
@@ -100,6 +100,7 @@ def oauth2_callback():
     )
 
     session["panopto_token"] = token
+    session.pop("panopto_user_id", None)  # set again by ensure_fresh_panopto_token for this login
     return "Panopto authorization complete. You may close this window."
 
 
@@ -228,6 +229,9 @@ def ensure_fresh_panopto_token():
 
         if resp.status_code == 401:
             raise Exception("Unauthorized after refresh")
+        if resp.ok:
+            # Identifies whose Panopto permissions the cached folder/recorder listings reflect
+            session["panopto_user_id"] = (resp.json() or {}).get("Id")
 
     except InvalidGrantError:
         session.pop("panopto_token", None)
@@ -235,6 +239,13 @@ def ensure_fresh_panopto_token():
 
     return session.get("panopto_token")
 
+def panopto_cache_user(token):
+    """Cache key part for listings made with token: the Panopto user id, else a hash of the token."""
+    user_id = session.get("panopto_user_id")
+    if user_id:
+        return f"user:{user_id}"
+    return "token:" + hashlib.sha1(str(token.get("access_token")).encode("utf-8")).hexdigest()
+
 @panopto_required
 def get_panopto_folders():
     try:
@@ -337,7 +348,11 @@ def _get_panopto_oauth(token):
     )
 
 
-def _fetch_panopto_folders(token):
+# Each listing is made with the caller's own token, so Panopto filters it by that user's
+# permissions: results are cached per Panopto user (panopto_cache_user). A failed fetch
+# returns [] and is not cached.
+@api_cached("panopto_folders", key=lambda token, panopto_user: (panopto_user,), cache_empty=False)
+def _fetch_panopto_folders(token, panopto_user):
     """Fetch Panopto folders using a pre-fetched token. Thread-safe."""
     try:
         session_oauth = _get_panopto_oauth(token)
@@ -372,7 +387,8 @@ def _fetch_panopto_folders(token):
         return []
 
 
-def _fetch_panopto_recorders(token):
+@api_cached("panopto_recorders", key=lambda token, panopto_user: (panopto_user,), cache_empty=False)
+def _fetch_panopto_recorders(token, panopto_user):
     """Fetch Panopto recorders using a pre-fetched token. Thread-safe."""
     try:
         session_oauth = _get_panopto_oauth(token)
@@ -430,6 +446,9 @@ def _enrich_events(course_events, course_map):
                     .strftime('%m/%d/%Y %I:%M %p')
                 )
 
+        # Plain text for the Panopto session description (memoized, shared with the ICS job)
+        event['description_text'] = html_text.html_to_text(event.get('description'))
+
         ci = course_map.get(event.get('context_code'))
         if ci:
             event['course_name'] = ci['course_name']
@@ -494,7 +513,7 @@ def list_canvas_events():
     print(f"📅 Using term date range: {effective_start} → {end_date} {term_id} {account}")
 
     # Fetch courses for the account+term
-    courses = get_canvas_courses_by_term(term_id, account=account)
+    courses = get_courses_for_accounts([account], term_id=term_id)
 
     # Build course_map
     course_map = {
@@ -510,54 +529,30 @@ def list_canvas_events():
     }
     course_ids = list(course_map.keys())
 
-    # ✅ OPTIMIZATION 2: Larger chunks (50 vs 10) = fewer total API calls
-    chunks = list(chunked_list(course_ids, 50))
-
-    # ✅ OPTIMIZATION 3: Fetch all event chunks in parallel AND kick off
-    #    folders/recorders at the same time so nothing waits sequentially.
-    def fetch_chunk(chunk):
-        return get_canvas_events(
-            context_codes=chunk,
-            start_date=effective_start,
-            end_date=end_date
-        )
-
-    raw_events = []
-
     # ✅ Extract token BEFORE entering threads — Flask session is not thread-safe
     try:
         panopto_token = ensure_fresh_panopto_token()
+        panopto_user = panopto_cache_user(panopto_token)
     except Exception as e:
         print("🔐 Token refresh failed:", e)
         return redirect(url_for("scheduler.panopto_login"))
 
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        # Submit Panopto calls alongside Canvas event fetches, passing token directly
-        folders_future   = executor.submit(_fetch_panopto_folders, panopto_token)
-        recorders_future = executor.submit(_fetch_panopto_recorders, panopto_token)
-        event_futures    = [executor.submit(fetch_chunk, chunk) for chunk in chunks]
+    # The Panopto folders/recorders are fetched in the background while the Canvas events are
+    # read from the event store (app/canvas_event_store.py) on this thread, which has the app
+    # context the database needs; stale courses are synced from Canvas first.
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        # Panopto calls get the token directly
+        folders_future   = executor.submit(_fetch_panopto_folders, panopto_token, panopto_user)
+        recorders_future = executor.submit(_fetch_panopto_recorders, panopto_token, panopto_user)
 
-        # Collect Canvas events as they complete
-        for future in as_completed(event_futures):
-            try:
-                raw_events.extend(future.result())
-            except Exception as e:
-                print(f"⚠️ Event chunk fetch failed: {e}")
-
-        # Collect Panopto results (they've been running in parallel the whole time)
+        events = load_events(course_ids, effective_start, end_date)  # sorted by start
+        raw_events = [event.to_dict() for event in events]
         folders   = folders_future.result()
         recorders = recorders_future.result()
 
     # Enrich events with adjusted times + course metadata
     events = _enrich_events(raw_events, course_map)
 
-    # Sort by start time
-    events.sort(
-        key=lambda e: datetime.fromisoformat(e['start_at'].replace('Z', '+00:00')).replace(tzinfo=timezone.utc)
-        if e.get('start_at')
-        else datetime.max.replace(tzinfo=timezone.utc)
-    )
-
     scheduled = ScheduledRecording.query.all()
     scheduled_map = {int(rec.canvas_event_id): {
         "recorder_id": rec.recorder_id,
@@ -588,6 +583,7 @@ def toggle_recording():
     data = request.form
     canvas_event_id = data['event_id']
     title = data['title']
+    description = data.get('description', '')
     start_time = data['start_time']
     end_time = data['end_time']
     folder_id = data['folder_id']
@@ -609,7 +605,8 @@ def toggle_recording():
         return jsonify({"success": True, "message": "Recording schedule deleted."})
     else:
         try:
-            result = schedule_panopto_recording(title, start_time, end_time, folder_id, recorder_id, broadcast)
+            result = schedule_panopto_recording(title, start_time, end_time, folder_id, recorder_id, broadcast,
+                                                description=description)
         except Exception as e:
             print(f"Error occurred while scheduling Panopto recording: {e}")
             return jsonify({"success": False, "message": "Failed to schedule recording."})
@@ -637,7 +634,7 @@ def toggle_recording():
 
 
 @panopto_required
-def schedule_panopto_recording(name, start_time, end_time, folder_id, recorder_id, broadcast):
+def schedule_panopto_recording(name, start_time, end_time, folder_id, recorder_id, broadcast, description=""):
     try:
         session_oauth = get_panopto_session()
             
@@ -657,6 +654,8 @@ def schedule_panopto_recording(name, start_time, end_time, folder_id, recorder_i
             ],
             "IsBroadcast": broadcast
         }
+        if description:
+            payload["Description"] = description
         params = {"resolveConflicts": False}
         headers = {"Content-Type": "application/json"}
 
@@ -0,0 +1,41 @@
+from app.api_cache import NAMESPACES, invalidate, invalidate_all
+from app.canvas_throttle import limiter as canvas_limiter
+from app.http_client import get_host_metrics, reset_host_metrics
+from app.utils import admin_required
+from app.sql_instrumentation import get_endpoint_stats, reset_endpoint_stats
+from flask import Blueprint, current_app, render_template, redirect, request, url_for, flash
+
+bp = Blueprint('sql_profiler', __name__, url_prefix='/sql_profiler')
+
+@bp.before_request
+@admin_required
+def before_request():
+    pass
+
+@bp.route('/')
+def report():
+    return render_template('sql_profiler/report.html',
+                           stats=get_endpoint_stats(),
+                           hosts=get_host_metrics(),
+                           canvas=canvas_limiter.snapshot(),
+                           cache_namespaces=NAMESPACES,
+                           enabled=current_app.config.get('SQL_INSTRUMENTATION', False),
+                           threshold=current_app.config.get('SQL_N_PLUS_ONE_THRESHOLD', 10))
+
+@bp.route('/reset', methods=['POST'])
+def reset():
+    reset_endpoint_stats()
+    reset_host_metrics()
+    flash("SQL and HTTP statistics cleared.", "success")
+    return redirect(url_for('sql_profiler.report'))
+
+@bp.route('/api_cache/clear', methods=['POST'])
+def clear_api_cache():
+    namespace = request.form.get('namespace')
+    if namespace in NAMESPACES:
+        invalidate(namespace)
+        flash(f"Cleared cached {namespace.replace('_', ' ')}.", "success")
+    else:
+        invalidate_all()
+        flash("Cleared all cached API results.", "success")
+    return redirect(url_for('sql_profiler.report'))
@@ -1,22 +1,14 @@
+from app import canvas_rosters
 from app.forms import StudentForm, CSRFOnlyForm
 from app.models import db, Student
 from app.utils import permission_required
-from .canvas import get_enrollment_terms, get_canvas_courses, get_enrollments, get_canvas_courses_by_term, get_terms_with_courses
+from .canvas import get_enrollment_terms, get_canvas_courses, get_canvas_courses_by_term, get_terms_with_courses
 from datetime import datetime
 from flask import render_template, redirect, url_for, request, flash, jsonify, Blueprint, send_file, abort, make_response, Response
 from flask_login import login_required, current_user
 from io import BytesIO
-from PIL import UnidentifiedImageError
-from reportlab.lib.pagesizes import LETTER
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib.units import inch
-from reportlab.lib.utils import ImageReader
-from reportlab.pdfgen import canvas
-from reportlab.platypus import SimpleDocTemplate, Image, Spacer, Table, TableStyle, Paragraph
 from werkzeug.utils import secure_filename
-import chardet
 import os
-import pandas as pd
 
 bp = Blueprint('students', __name__, url_prefix='/students')
 
@@ -69,6 +61,8 @@ def upload_photo_form():
 @bp.route('/template')
 @permission_required('students+add, students+edit')
 def download_template():
+    import pandas as pd
+
     # Create empty DataFrame with header only
     df = pd.DataFrame(columns=TEMPLATE_COLUMNS)
 
@@ -87,6 +81,8 @@ def download_template():
 @bp.route('/phototemplate')
 @permission_required('students+add, students+edit')
 def download_photo_template():
+    import pandas as pd
+
     # Create empty DataFrame with header only
     df = pd.DataFrame(columns=PHOTO_TEMPLATE_COLUMNS)
 
@@ -104,6 +100,8 @@ def download_photo_template():
 
 def safe_str(value, max_len=None):
     """Converts NaN or non-string to empty string, optionally truncates."""
+    import pandas as pd
+
     if pd.isna(value):
         return ''
     s = str(value).strip()
@@ -112,6 +110,9 @@ def safe_str(value, max_len=None):
 @bp.route('/upload', methods=['POST'])
 @permission_required('students+add, students+edit')
 def upload_csv():
+    # pandas/chardet are slow to import; only the upload endpoints need them
+    import chardet
+    import pandas as pd
 
     file = request.files.get('file')
     if not file or not file.filename.endswith('.csv'):
@@ -261,6 +262,8 @@ def allowed_photo(filename):
 @bp.route('/uploadphoto', methods=['POST'])
 @permission_required('students+add, students+edit')
 def upload_photo_csv():
+    import chardet
+    import pandas as pd
 
     file = request.files.get('file')
     if not file or not file.filename.endswith('.csv'):
@@ -403,9 +406,7 @@ def list_students():
         students = students.filter(Student.class_of == selected_class)
 
     if selected_course:
-        enrollments = get_enrollments(course_id=int(selected_course))        
-        enrolled_student_ids = [e['user']['sis_user_id'] for e in enrollments if 'user' in e and 'id' in e['user']]
-        students = students.filter(Student.pid.in_(enrolled_student_ids))
+        students = canvas_rosters.filter_enrolled(students, Student.pid, selected_course)
 
     students = students.filter(Student.deleted == False).order_by(Student.last_name, Student.first_name).all()
     
@@ -468,6 +469,9 @@ def delete_student(student_id):
     return jsonify({'success': True, 'message': 'Student deleted'})
 
 def add_page_header(canvas, doc, title, header):
+    from reportlab.lib.pagesizes import LETTER
+    from reportlab.lib.units import inch
+
     canvas.saveState()
     width, height = LETTER
 
@@ -489,6 +493,14 @@ def add_page_header(canvas, doc, title, header):
 @bp.route('/generate_photo_cards', methods=['POST'])
 @permission_required('students+view, students+add, students+edit, students+delete')
 def generate_photo_cards():
+    # reportlab/PIL are only needed for the PDF; keep them out of app start-up
+    from PIL import UnidentifiedImageError
+    from reportlab.lib.pagesizes import LETTER
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import inch
+    from reportlab.lib.utils import ImageReader
+    from reportlab.platypus import SimpleDocTemplate, Image, Spacer, Table, TableStyle, Paragraph
+
     ids = list(set(request.form.getlist('student_ids')))
 
     if not ids:
@@ -674,9 +686,7 @@ def get_filtered_students_context():
         students = students.filter(Student.class_of == selected_class)
 
     if selected_course:
-        enrollments = get_enrollments(course_id=int(selected_course))
-        enrolled_student_ids = [e['user']['sis_user_id'] for e in enrollments if 'user' in e and 'id' in e['user']]
-        students = students.filter(Student.pid.in_(enrolled_student_ids))
+        students = canvas_rosters.filter_enrolled(students, Student.pid, selected_course)
 
     students = students.filter(Student.deleted == False).order_by(Student.last_name, Student.first_name).all()
     for student in students:
@@ -1,6 +1,7 @@
 from app.utils import admin_required
 from app.forms import UserForm
 from app.models import User, Role, Permission, db, Employee
+from app.permission_index import invalidate_permission_index
 from collections import defaultdict
 from datetime import datetime
 from flask import Blueprint, render_template, redirect, url_for, request, jsonify, flash
@@ -79,6 +80,7 @@ def edit(user_id=None):
 
         db.session.add(user)
         db.session.commit()
+        invalidate_permission_index()
         print("success")
         flash("User saved successfully.", "success")
         return redirect(url_for('users.list_users'))
@@ -100,5 +102,6 @@ def delete(user_id):
     user.delete_date = datetime.now()
     user.delete_by = current_user.id
     db.session.commit()
+    invalidate_permission_index()
     flash("User deleted.", "success")
     return redirect(url_for('users.list_users'))
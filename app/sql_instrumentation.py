@@ -0,0 +1,123 @@
+from collections import Counter
+from datetime import datetime
+from flask import g, has_request_context, request
+from sqlalchemy import event
+import re
+import threading
+import time
+
+# Opt-in per-request SQL instrumentation. Enable with SQL_INSTRUMENTATION = True in app/config.py.
+# Every request records its query count, total DB time and how often each statement shape ran;
+# a shape repeated more than SQL_N_PLUS_ONE_THRESHOLD times is flagged as a likely N+1.
+# Totals are aggregated per endpoint for the admin report (routes/sql_profiler.py) and are
+# also returned on each response in Server-Timing / X-DB-* headers.
+
+MAX_TRACKED_ENDPOINTS = 500
+MAX_SUSPECTS_PER_ENDPOINT = 10
+
+_endpoint_stats = {}
+_lock = threading.Lock()
+
+_whitespace_re = re.compile(r'\s+')
+_placeholder_list_re = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_number_re = re.compile(r'\b\d+\b')
+
+def statement_shape(statement):
+    """Normalize a SQL statement so that runs differing only in parameters compare equal."""
+    shape = _whitespace_re.sub(' ', statement).strip()
+    shape = _placeholder_list_re.sub('(?, ...)', shape)  # IN lists of any length
+    shape = _number_re.sub('N', shape)  # inlined TOP/OFFSET values and literals
+    return shape
+
+def _request_stats():
+    if not has_request_context():
+        return None
+    stats = g.get('_sql_stats')
+    if stats is None:
+        stats = g._sql_stats = {'count': 0, 'time': 0.0, 'shapes': Counter()}
+    return stats
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('_sql_query_start', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['_sql_query_start'].pop()
+    stats = _request_stats()
+    if stats is None:
+        return  # CLI scripts, scheduled jobs, app start-up
+    stats['count'] += 1
+    stats['time'] += time.perf_counter() - started
+    stats['shapes'][statement_shape(statement)] += 1
+
+def _handle_error(exception_context):
+    # after_cursor_execute never fires for a failed statement; drop its start time
+    conn = exception_context.connection
+    if conn is not None and conn.info.get('_sql_query_start'):
+        conn.info['_sql_query_start'].pop()
+
+def _record_request(app, endpoint, stats):
+    threshold = app.config.get('SQL_N_PLUS_ONE_THRESHOLD', 10)
+    suspects = [(shape, n) for shape, n in stats['shapes'].most_common(MAX_SUSPECTS_PER_ENDPOINT) if n > threshold]
+
+    with _lock:
+        entry = _endpoint_stats.get(endpoint)
+        if entry is None:
+            if len(_endpoint_stats) >= MAX_TRACKED_ENDPOINTS:
+                return suspects
+            entry = _endpoint_stats[endpoint] = {
+                'requests': 0, 'queries': 0, 'db_time': 0.0,
+                'max_queries': 0, 'max_db_time': 0.0, 'suspects': {}, 'last_seen': None,
+            }
+        entry['requests'] += 1
+        entry['queries'] += stats['count']
+        entry['db_time'] += stats['time']
+        entry['max_queries'] = max(entry['max_queries'], stats['count'])
+        entry['max_db_time'] = max(entry['max_db_time'], stats['time'])
+        entry['last_seen'] = datetime.now()
+        for shape, n in suspects:
+            if shape in entry['suspects'] or len(entry['suspects']) < MAX_SUSPECTS_PER_ENDPOINT:
+                entry['suspects'][shape] = max(entry['suspects'].get(shape, 0), n)
+    return suspects
+
+def get_endpoint_stats():
+    """Snapshot of per-endpoint totals, worst (by total DB time) first."""
+    with _lock:
+        rows = [dict(entry, endpoint=endpoint, suspects=dict(entry['suspects']))
+                for endpoint, entry in _endpoint_stats.items()]
+    for row in rows:
+        row['avg_queries'] = row['queries'] / row['requests'] if row['requests'] else 0
+        row['avg_db_ms'] = row['db_time'] * 1000 / row['requests'] if row['requests'] else 0
+    rows.sort(key=lambda r: r['db_time'], reverse=True)
+    return rows
+
+def reset_endpoint_stats():
+    with _lock:
+        _endpoint_stats.clear()
+
+def init_sql_instrumentation(app, db):
+    """Attach the cursor hooks to every engine (default and binds) and the response hook to the app."""
+    if not app.config.get('SQL_INSTRUMENTATION'):
+        return
+
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+            event.listen(engine, 'handle_error', _handle_error)
+
+    @app.after_request
+    def add_sql_timing_headers(response):
+        stats = g.get('_sql_stats')
+        if stats is None:
+            return response
+        endpoint = request.endpoint or request.path
+        suspects = _record_request(app, endpoint, stats)
+
+        db_ms = stats['time'] * 1000
+        response.headers.add('Server-Timing', f'db;dur={db_ms:.1f};desc="{stats["count"]} queries"')
+        response.headers['X-DB-Query-Count'] = str(stats['count'])
+        if suspects:
+            response.headers['X-DB-N-Plus-One'] = str(len(suspects))
+            worst_shape, worst_n = suspects[0]
+            print(f"[{datetime.now()}] Possible N+1 in {endpoint}: {worst_n}x {worst_shape[:200]}")
+        return response
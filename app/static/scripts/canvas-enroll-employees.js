@@ -1,4 +1,5 @@
 // employees.js
+import { enrollUsers, showProgress } from './canvas-enrollment-jobs.js';
 $(document).ready(() => {
     // 
     // ----- Filter section -----
@@ -117,6 +118,62 @@ $(document).ready(() => {
     $table.closest('.dataTables_wrapper').find('input[type=search]').on('input', function () {
         refreshPinnedRows();
     });
+    // 
+    // ----- On-demand user search (when the page is rendered without the user list) -----
+    // 
+    const userSearch = window.canvasUserSearch;
+    if (userSearch) {
+        const $search = $('#employee-search');
+        const $status = $('#employee-search-status');
+        let timer = null;
+        let latest = 0;
+
+        function employeeRow(user) {
+            const $checkbox = $('<input>', {
+                type: 'checkbox', name: 'employee_ids', value: user.id,
+                'data-pid': user.sis_user_id || '', disabled: !user.sis_user_id
+            });
+            return $('<tr>').append(
+                $('<td class="col-1">').append($('<label class="lbl-checkbox">').append($checkbox)),
+                $('<td class="col-5">').text(user.sortable_name || user.name || ''),
+                $('<td class="col-3">').text(user.login_id || ''),
+                $('<td class="col-3">').text(user.sis_user_id || '')
+            )[0];
+        }
+
+        // Replace the unpinned rows with the matches; selected employees stay listed
+        function showMatches(users) {
+            const isPinned = node => selectedEmployeePIDs.has($(node).find('input[name="employee_ids"]').data('pid'));
+            table.rows((idx, data, node) => !isPinned(node)).remove();
+            table.rows.add(users.map(employeeRow).filter(node => !isPinned(node))).draw();
+        }
+
+        function search(term) {
+            const request = ++latest;
+            $status.text('Searching...');
+            $.getJSON('/canvas/users/search', { account: userSearch.account, q: term })
+                .done(users => {
+                    if (request !== latest) return; // a newer search is on its way
+                    showMatches(users);
+                    $status.text(users.length ? `${users.length} match(es) for "${term}".` : `No users match "${term}".`);
+                })
+                .fail(() => {
+                    if (request === latest) $status.text('User search failed; try again.');
+                });
+        }
+
+        $search.on('input', function () {
+            clearTimeout(timer);
+            const term = this.value.trim();
+            if (term.length < userSearch.minChars) {
+                latest++;
+                $status.text(term ? `Type at least ${userSearch.minChars} characters.` : '');
+                return;
+            }
+            timer = setTimeout(() => search(term), 300);
+        });
+    }
+
     // 
     // ----- Enrollment Section -----
     // 
@@ -141,19 +198,14 @@ $(document).ready(() => {
             </div>
         `);
 
-        fetch("/canvas/enroll_users_bulk_api", {
-            method: "POST",
-            headers: { "Content-Type": "application/json" },
-            body: JSON.stringify({
-                course_id: courseId,
-                section_id: sectionId || null,
-                users: users,
-                enrollment_type: role,
-                enrollment_state: "active",
-                notify: notify
-            })
-        })
-            .then(res => res.json())
+        enrollUsers({
+            course_id: courseId,
+            section_id: sectionId || null,
+            users: users,
+            enrollment_type: role,
+            enrollment_state: "active",
+            notify: notify
+        }, showProgress($('#resultArea')))
             .then(data => {
                 const html = data.map(item => {
                     const pid = (item.user_id || '').replace('sis_user_id:', '');
@@ -1,3 +1,5 @@
+import { enrollUsers, showProgress } from './canvas-enrollment-jobs.js';
+
 // Constants
 const TERMS_CACHE_KEY = 'terms_with_courses_v1';
 let termsWithCourses = [];
@@ -164,19 +166,14 @@ document.addEventListener("DOMContentLoaded", () => {
             </div>
         `);
 
-        fetch("/canvas/enroll_users_bulk_api", {
-            method: "POST",
-            headers: { "Content-Type": "application/json" },
-            body: JSON.stringify({
-                course_id: courseId,
-                section_id: sectionId || null,
-                users: studentPIDs,
-                enrollment_type: "StudentEnrollment",
-                enrollment_state: "active",
-                notify: notify
-            })
-        })
-            .then(res => res.json())
+        enrollUsers({
+            course_id: courseId,
+            section_id: sectionId || null,
+            users: studentPIDs,
+            enrollment_type: "StudentEnrollment",
+            enrollment_state: "active",
+            notify: notify
+        }, showProgress($('#resultArea')))
             .then(data => {
                 const html = data.map(item => {
                     const pid = (item.user_id || '').replace('sis_user_id:', '');
@@ -0,0 +1,40 @@
+// canvas-enrollment-jobs.js
+// Submits a bulk enrollment to /canvas/enroll_users_bulk_api and, when Canvas runs it as a
+// SIS import, polls /canvas/enrollment_jobs/<id> until it is done. Resolves with the job's
+// per-user results: [{ user_id, status: 'success' | 'error', message }].
+const POLL_INTERVAL_MS = 3000;
+
+export function enrollUsers(payload, onProgress = () => {}) {
+    return fetch("/canvas/enroll_users_bulk_api", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify(payload)
+    })
+        .then(res => res.json())
+        .then(job => waitForJob(job, onProgress));
+}
+
+function waitForJob(job, onProgress) {
+    if (job.error) return Promise.reject(job.error);
+    onProgress(job);
+    if (job.status !== 'Running') return Promise.resolve(job.results);
+
+    return new Promise(resolve => setTimeout(resolve, POLL_INTERVAL_MS))
+        .then(() => fetch(`/canvas/enrollment_jobs/${job.id}`))
+        .then(res => res.json())
+        .then(next => waitForJob(next, onProgress));
+}
+
+export function showProgress($resultArea) {
+    return job => {
+        if (job.status !== 'Running') return;
+        $resultArea.html(`
+            <div class="d-flex align-items-center">
+                <strong>Canvas is importing ${job.total} enrollments... ${job.progress || 0}%</strong>
+                <div class="spinner-border spinner-border-sm ms-2" role="status">
+                    <span class="visually-hidden">Loading...</span>
+                </div>
+            </div>
+        `);
+    };
+}
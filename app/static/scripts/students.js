@@ -1,3 +1,5 @@
+import { enrollUsers, showProgress } from './canvas-enrollment-jobs.js';
+
 // Constants
 const TERMS_CACHE_KEY = 'terms_with_courses_v1';
 let termsWithCourses = [];
@@ -172,12 +174,8 @@ $(document).ready(() => {
         const studentPIDs = Array.from(selectedStudentPIDs.values()).map(pid => `sis_user_id:${pid}`);
         if (studentPIDs.length === 0) return alert('Please select at least one student.');
 
-        fetch("/canvas/enroll_users_bulk_api", {
-            method: "POST",
-            headers: { "Content-Type": "application/json" },
-            body: JSON.stringify({ course_id: courseId, users: studentPIDs, enrollment_type: "StudentEnrollment", enrollment_state: "active", notify, section_id: sectionId || null })
-        })
-            .then(res => res.json())
+        enrollUsers({ course_id: courseId, users: studentPIDs, enrollment_type: "StudentEnrollment", enrollment_state: "active", notify, section_id: sectionId || null },
+            showProgress($('#resultArea')))
             .then(data => {
                 const html = data.map(item => {
                     const pid = (item.user_id || '').replace('sis_user_id:', '');
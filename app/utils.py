@@ -2,7 +2,7 @@ from app.models import Member, Employee, AYCommittee
 from flask_login import current_user
 from flask import current_app, request, abort, jsonify, render_template, flash, redirect, url_for
 from flask_login import current_user
-from functools import wraps
+from functools import lru_cache, wraps
 
 def admin_required(f):
     @wraps(f)
@@ -12,12 +12,34 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+@lru_cache(maxsize=512)
+def _parse_permissions(permissions):
+    """
+    Turn "resource+action, resource+action" (or a tuple of such strings) into a tuple of
+    (resource, action) pairs. Memoized: templates pass the same literals on every render.
+    """
+    if isinstance(permissions, str):
+        permission_list = [p.strip().lower() for p in permissions.split(',')]
+    else:
+        permission_list = [p.lower() for p in permissions]
+
+    parsed = []
+    for perm in permission_list:
+        try:
+            resource, action = perm.split('+')
+        except ValueError:
+            continue  # Skip malformed permissions
+        parsed.append((resource.strip(), action.strip()))
+    return tuple(parsed)
+
 def permission_required(permissions):
     """
     Decorator to protect routes by required permissions.
 
     permissions: str like "screeningcore_approve+add" or list of such strings.
     """
+    required = _parse_permissions(permissions if isinstance(permissions, str) else tuple(permissions))
+
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
@@ -27,21 +49,11 @@ def permission_required(permissions):
                     return jsonify({'success': False, 'message': 'Authentication required'}), 403
                 return render_template("403.html", message="You must be logged in to access this page."), 403
 
-            # Normalize permission list
-            if isinstance(permissions, str):
-                permission_list = [p.strip().lower() for p in permissions.split(',')]
-            else:
-                permission_list = [p.lower() for p in permissions]
-
             # Check if user has ANY of the required permissions
-            for perm in permission_list:
-                try:
-                    resource, action = perm.split('+')
-                    if current_user.can(resource.strip(), action.strip()):
-                        # User has permission → allow access
-                        return f(*args, **kwargs)
-                except ValueError:
-                    continue  # skip malformed permissions
+            granted = current_user.permission_set
+            if any(perm in granted for perm in required):
+                # User has permission → allow access
+                return f(*args, **kwargs)
 
             # User has no permission → handle gracefully
             if request.method == "POST":
@@ -57,20 +69,11 @@ def has_permission(permissions):
     if not current_user.is_authenticated:
         return False
 
-    if isinstance(permissions, str):
-        permission_list = [p.strip().lower() for p in permissions.split(',')]
-    else:
-        permission_list = [p.lower() for p in permissions]
+    if not isinstance(permissions, str):
+        permissions = tuple(permissions)
 
-    for perm in permission_list:
-        try:
-            resource, action = perm.split('+')
-            if current_user.can(resource.strip(), action.strip()):
-                return True
-        except ValueError:
-            continue  # Skip malformed permissions
-
-    return False
+    granted = current_user.permission_set
+    return any(perm in granted for perm in _parse_permissions(permissions))
 
 def is_admin():
     return current_user.is_authenticated and current_user.role.name.lower() == "admin"
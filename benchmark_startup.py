@@ -0,0 +1,132 @@
+"""
+Start-up time benchmark: how long each blueprint module takes to import, and create_app() overall.
+
+Every measurement runs in a fresh interpreter (python -X importtime), so nothing is already
+cached in sys.modules. The shared cost of importing the `app` package itself (config, logger,
+Flask extensions) is measured once and subtracted from each blueprint, and the slowest
+third-party packages each blueprint pulls in are listed so a module-level `import pandas`
+shows up immediately.
+
+Usage:
+    python benchmark_startup.py                        # report
+    python benchmark_startup.py --runs 5               # median of 5 runs per module
+    python benchmark_startup.py --save baseline.json   # store results
+    python benchmark_startup.py --compare baseline.json --tolerance 50
+        # exit 1 if any blueprint got more than 50 ms slower than the baseline
+"""
+from statistics import median
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+ROUTES_DIR = os.path.join(ROOT, "app", "routes")
+
+def blueprint_modules():
+    return sorted(
+        f"app.routes.{name[:-3]}" for name in os.listdir(ROUTES_DIR)
+        if name.endswith(".py") and name != "__init__.py"
+    )
+
+def import_times(statement):
+    """Run statement in a fresh interpreter; return {module: cumulative_ms} from -X importtime."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    times = {}
+    errors = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            errors.append(line)
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue  # header line
+        times[parts[2].strip()] = int(parts[1]) / 1000
+    if result.returncode != 0:
+        raise RuntimeError(f"{statement!r} failed:\n" + "\n".join(errors[-20:]))
+    return times
+
+def measure_module(module, runs):
+    samples, last = [], {}
+    for _ in range(runs):
+        last = import_times(f"import {module}")
+        samples.append(last.get(module, 0.0))
+    return median(samples), last
+
+def heavy_packages(times, baseline_times, limit=3, floor_ms=20):
+    """Top-level third-party packages that this import added beyond the `app` package baseline."""
+    own = {"app", "__main__"}
+    tops = [
+        (name, ms) for name, ms in times.items()
+        if "." not in name and name not in own and name not in baseline_times and ms >= floor_ms
+    ]
+    tops.sort(key=lambda t: t[1], reverse=True)
+    return tops[:limit]
+
+def measure_create_app(runs):
+    statement = (
+        "import time; t = time.perf_counter(); "
+        "from app import create_app; create_app(); "
+        "print(time.perf_counter() - t)"
+    )
+    samples = []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, "-c", statement], cwd=ROOT, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError("create_app() failed:\n" + result.stderr[-2000:])
+        samples.append(float(result.stdout.strip().splitlines()[-1]) * 1000)
+    return median(samples)
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Measure blueprint import and create_app() time")
+    arg_parser.add_argument("--runs", type=int, default=3, help="runs per measurement (median is reported)")
+    arg_parser.add_argument("--skip-create-app", action="store_true", help="only measure imports (no DB needed)")
+    arg_parser.add_argument("--save", metavar="FILE", help="write results as JSON")
+    arg_parser.add_argument("--compare", metavar="FILE", help="compare with a saved JSON baseline")
+    arg_parser.add_argument("--tolerance", type=float, default=50.0, help="allowed slowdown per entry, ms")
+    args = arg_parser.parse_args()
+
+    started = time.perf_counter()
+    base_ms, base_times = measure_module("app", args.runs)
+    print(f"app package (shared by every blueprint): {base_ms:8.1f} ms\n")
+
+    results = {"app": base_ms}
+    print(f"{'blueprint':<32}{'import ms':>10}  heaviest new packages")
+    for module in blueprint_modules():
+        total_ms, times = measure_module(module, args.runs)
+        own_ms = max(total_ms - times.get("app", 0.0), 0.0)
+        results[module] = own_ms
+        heavy = ", ".join(f"{name} {ms:.0f}" for name, ms in heavy_packages(times, base_times))
+        print(f"{module:<32}{own_ms:>10.1f}  {heavy}")
+
+    if not args.skip_create_app:
+        results["create_app"] = measure_create_app(args.runs)
+        print(f"\ncreate_app() total: {results['create_app']:.1f} ms")
+
+    print(f"\nmeasured in {time.perf_counter() - started:.1f} s")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = [
+            (name, baseline[name], ms) for name, ms in results.items()
+            if name in baseline and ms - baseline[name] > args.tolerance
+        ]
+        for name, before, after in regressions:
+            print(f"REGRESSION {name}: {before:.1f} ms -> {after:.1f} ms")
+        if regressions:
+            sys.exit(1)
+        print(f"no entry slower than baseline by more than {args.tolerance:.0f} ms")
+
+if __name__ == "__main__":
+    main()
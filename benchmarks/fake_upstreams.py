@@ -0,0 +1,239 @@
+"""
+Local stand-ins for the Canvas, Panopto and Emma APIs, for the endpoint benchmarks.
+
+FakeUpstreams serves generated data over plain HTTP on 127.0.0.1. The app keeps its real
+https:// base URLs: route_to() mounts a requests adapter that rewrites those URLs to the
+local server, so the code under test (Link-header pagination, page loops, OAuth2Session
+calls) runs unchanged.
+
+Only the endpoints the benchmarked routes use are implemented. Each response can be
+delayed by latency_ms to approximate the real network round trip.
+"""
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from requests.adapters import HTTPAdapter
+from urllib.parse import parse_qs, urlencode, urlsplit
+import json
+import random
+import re
+import threading
+import time
+
+ACCOUNT_IDS = (1, 9, 50, 445, 520)
+
+def _iso(dt):
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+class UpstreamData:
+    """Deterministic Canvas / Panopto / Emma data sets."""
+
+    def __init__(self, seed=1, terms=6, courses_per_account=300, events_per_course=40,
+                 folders=400, recorders=60, emma_groups=80, emma_members_per_group=250):
+        rng = random.Random(seed)
+        now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+        self.terms = []
+        for i in range(terms):
+            start = now - timedelta(days=120) + timedelta(days=90 * i)
+            self.terms.append({
+                "id": 100 + i, "name": f"Term {100 + i}", "sis_term_id": f"T{100 + i}",
+                "start_at": _iso(start), "end_at": _iso(start + timedelta(days=100)),
+            })
+
+        self.courses = {}  # account id -> [course]
+        self.events = {}   # "course_<id>" -> [event]
+        course_id = 1000
+        for account_id in ACCOUNT_IDS:
+            courses = []
+            for _ in range(courses_per_account):
+                course_id += 1
+                term = rng.choice(self.terms)
+                courses.append({
+                    "id": course_id, "name": f"Course {course_id:05d}", "course_code": f"C{course_id}",
+                    "sis_course_id": f"SIS{course_id}", "account_id": account_id,
+                    "enrollment_term_id": term["id"], "workflow_state": "available",
+                    "start_at": term["start_at"], "end_at": term["end_at"],
+                    "term": {"id": term["id"], "name": term["name"], "sis_term_id": term["sis_term_id"]},
+                })
+                events = []
+                for n in range(events_per_course):
+                    start = now + timedelta(days=rng.randint(-60, 200), hours=rng.randint(8, 17))
+                    events.append({
+                        "id": course_id * 1000 + n, "title": f"Lecture {n + 1}",
+                        "start_at": _iso(start), "end_at": _iso(start + timedelta(minutes=50)),
+                        "all_day": False, "all_day_date": None,
+                        "location_name": f"Room {rng.randint(100, 499)}",
+                        "description": f"<p>Session <b>{n + 1}</b> of course {course_id}</p>",
+                        "context_code": f"course_{course_id}", "context_name": f"Course {course_id:05d}",
+                        "workflow_state": "active", "updated_at": _iso(now - timedelta(days=rng.randint(1, 30))),
+                    })
+                self.events[f"course_{course_id}"] = events
+            self.courses[account_id] = courses
+
+        self.folders = [{"Id": f"folder-{i:05d}", "Name": f"Folder {i:05d}"} for i in range(folders)]
+        self.recorders = [{"Id": f"recorder-{i:03d}", "Name": f"Recorder {i:03d}"} for i in range(recorders)]
+        self.emma_groups = [{"member_group_id": 5000 + i, "group_name": f"Group {i:03d}"} for i in range(emma_groups)]
+        self.emma_members = {
+            g["member_group_id"]: [{"member_id": g["member_group_id"] * 1000 + m, "email": f"user{m}@example.edu"}
+                                   for m in range(emma_members_per_group)]
+            for g in self.emma_groups
+        }
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real APIs
+
+    routes = [
+        (re.compile(r"/accounts/(\d+)/courses$"), "canvas_courses"),
+        (re.compile(r"/accounts/(\d+)/terms$"), "canvas_terms"),
+        (re.compile(r"/accounts/(\d+)/users$"), "canvas_users"),
+        (re.compile(r"/calendar_events$"), "canvas_events"),
+        (re.compile(r"/courses/(\d+)/enrollments$"), "canvas_enrollments"),
+        (re.compile(r"/courses/(\d+)/sections$"), "canvas_sections"),
+        (re.compile(r"/Panopto/api/v1/users/me$"), "panopto_me"),
+        (re.compile(r"/Panopto/api/v1/folders/[^/]+/children$"), "panopto_folders"),
+        (re.compile(r"/Panopto/api/remoteRecorders$"), "panopto_recorders"),
+        (re.compile(r"/groups/(\d+)/members$"), "emma_members"),
+        (re.compile(r"/groups$"), "emma_groups"),
+    ]
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.server.count(self.path)
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        for pattern, name in self.routes:
+            match = pattern.search(url.path)
+            if match:
+                return getattr(self, name)(query, *match.groups())
+        self.send_json({"errors": [{"message": f"no fake for {url.path}"}]}, status=404)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))  # keep the connection usable
+        self.do_GET()
+
+    def send_json(self, payload, status=200, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    # Canvas: per_page + page, with a Link header like the real API
+    def send_page(self, items, query):
+        per_page = int(query.get("per_page", ["10"])[0])
+        page = int(query.get("page", ["1"])[0])
+        chunk = items[(page - 1) * per_page:page * per_page]
+        links = []
+        last = max((len(items) + per_page - 1) // per_page, 1)
+        # Next-page links point back at the real host, so they also go through the adapter
+        origin = self.headers.get("X-Original-Origin") or f"http://{self.headers.get('Host')}"
+        base = f"{origin}{urlsplit(self.path).path}"
+        for rel, number in (("current", page), ("next", page + 1), ("first", 1), ("last", last)):
+            if rel == "next" and page >= last:
+                continue
+            params = {k: v for k, v in query.items() if k != "page"}
+            params["page"] = [str(number)]
+            links.append(f'<{base}?{urlencode(params, doseq=True)}>; rel="{rel}"')
+        # A full rate-limit bucket, so the adaptive limiter in app/canvas_throttle.py opens up
+        self.send_json(chunk, headers={"Link": ",".join(links), "X-Rate-Limit-Remaining": "700.0",
+                                       "X-Request-Cost": "1.0"})
+
+    def canvas_courses(self, query, account_id):
+        courses = self.server.data.courses.get(int(account_id), [])
+        if "enrollment_term_id" in query:
+            term_id = int(query["enrollment_term_id"][0])
+            courses = [c for c in courses if c["enrollment_term_id"] == term_id]
+        self.send_page(courses, query)
+
+    def canvas_terms(self, query, account_id):
+        self.send_json({"enrollment_terms": self.server.data.terms})
+
+    def canvas_users(self, query, account_id):
+        self.send_page([{"id": i, "name": f"User {i:05d}", "login_id": f"user{i}"} for i in range(500)], query)
+
+    def canvas_events(self, query):
+        events = []
+        for code in query.get("context_codes[]", []):
+            events.extend(self.server.data.events.get(code, []))
+        start, end = query.get("start_date", [None])[0], query.get("end_date", [None])[0]
+        if start and end:
+            events = [e for e in events if start <= e["start_at"] <= end]
+        self.send_page(events, query)
+
+    def canvas_enrollments(self, query, course_id):
+        self.send_page([{"id": int(course_id) * 100 + i, "user": {"id": i, "name": f"Student {i}"}}
+                        for i in range(60)], query)
+
+    def canvas_sections(self, query, course_id):
+        self.send_json([{"id": int(course_id) * 10 + i, "name": f"Section {i}"} for i in range(3)])
+
+    # Panopto: pageNumber / maxNumberResults
+    def panopto_page(self, items, query):
+        size = int(query.get("maxNumberResults", ["50"])[0])
+        number = int(query.get("pageNumber", ["0"])[0])
+        return items[number * size:(number + 1) * size]
+
+    def panopto_me(self, query):
+        self.send_json({"Id": "benchmark-user", "UserKey": "benchmark"})
+
+    def panopto_folders(self, query):
+        self.send_json({"Results": self.panopto_page(self.server.data.folders, query)})
+
+    def panopto_recorders(self, query):
+        self.send_json(self.panopto_page(self.server.data.recorders, query))
+
+    # Emma: start / 500 per page
+    def emma_groups(self, query):
+        start = int(query.get("start", ["0"])[0])
+        self.send_json(self.server.data.emma_groups[start:start + 500])
+
+    def emma_members(self, query, group_id):
+        start = int(query.get("start", ["0"])[0])
+        self.send_json(self.server.data.emma_members.get(int(group_id), [])[start:start + 500])
+
+class FakeUpstreams(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, data=None, latency_ms=0):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.data = data or UpstreamData()
+        self.latency = latency_ms / 1000
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def count(self, path):
+        with self._lock:
+            self.calls += 1
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name="FakeUpstreams", daemon=True).start()
+        return self
+
+class LocalRedirectAdapter(HTTPAdapter):
+    """Transport adapter that sends requests for a real https:// host to the local fake instead."""
+
+    def __init__(self, local_base):
+        super().__init__()
+        self.local_base = local_base
+
+    def send(self, request, **kwargs):
+        url = urlsplit(request.url)
+        request.headers["X-Original-Origin"] = f"{url.scheme}://{url.netloc}"
+        request.url = f"{self.local_base}{url.path}" + (f"?{url.query}" if url.query else "")
+        return super().send(request, **kwargs)
+
+def route_to(session, real_base_url, upstreams):
+    """Mount the redirecting adapter on session for real_base_url's scheme and host."""
+    url = urlsplit(real_base_url if "://" in real_base_url else f"https://{real_base_url}")
+    session.mount(f"{url.scheme}://{url.netloc}/", LocalRedirectAdapter(upstreams.base_url))
@@ -0,0 +1,209 @@
+"""
+Endpoint benchmarks: time the hot routes against a seeded SQLite database and fake upstream APIs.
+
+Builds the real app with create_app(), pointing the main database and the 'rechargedb'
+bind at SQLite files in a temporary directory. It seeds them with production-like volumes
+(benchmarks/seed.py) and sends Canvas / Panopto / Emma traffic to local stand-ins
+(benchmarks/fake_upstreams.py). Each route is then requested through the Flask test client
+as a logged-in admin. Per route it reports latency percentiles, SQL query count (from the
+app's own SQL instrumentation) and upstream API calls.
+
+app/cred.py must exist (secret key, account ids), but no real database or API is touched.
+
+Usage (from the repository root):
+    python -m benchmarks.run_endpoints
+    python -m benchmarks.run_endpoints --iterations 50 --scale 2 --latency-ms 40
+    python -m benchmarks.run_endpoints --only recharge.get_events
+    python -m benchmarks.run_endpoints --save        # rewrite benchmarks/baseline.json
+    python -m benchmarks.run_endpoints --compare     # exit 1 on regressions vs the baseline
+
+Commit benchmarks/baseline.json after --save, and rerun --save in any change that is expected
+to move the numbers, so the diff shows the effect.
+"""
+from benchmarks.fake_upstreams import FakeUpstreams, UpstreamData, route_to
+from benchmarks.seed import seed_database
+from contextlib import redirect_stdout
+import argparse
+import io
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# name, method, path (formatted with the seed info), iterations (None = --iterations)
+CASES = [
+    ("recharge.get_events", "GET", "/recharge/api/events", None),
+    ("committee.members", "GET", "/committee_tracker/{ay_committee_id}/members/", None),
+    ("reports.get_committees_by_member", "GET", "/reports/get_committees_by_member", None),
+    ("scheduler.list_canvas_events", "GET", "/scheduler/events?account=SSPPS&term_id={term_id}", None),
+    ("calendars.generate_scheduled_ics", "POST", "/calendars/generate_scheduled_ics?force=1", 3),
+    ("calendars.generate_scheduled_ics unchanged", "POST", "/calendars/generate_scheduled_ics", 3),
+]
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(samples)
+    rank = max(math.ceil(pct / 100 * len(ordered)) - 1, 0)
+    return ordered[rank]
+
+def build_app(workdir, upstreams, cache_type):
+    from app import create_app
+    from flask_bootstrap import Bootstrap5
+
+    overrides = {
+        "TESTING": True,
+        "WTF_CSRF_ENABLED": False,
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///" + os.path.join(workdir, "sspps.db"),
+        "SQLALCHEMY_BINDS": {"rechargedb": "sqlite:///" + os.path.join(workdir, "recharge.db")},
+        "SQLALCHEMY_ENGINE_OPTIONS": {},  # the pool settings in app/db_engine.py are MSSQL-specific
+        "DB_CREATE_ALL": True,
+        "MAIL_QUEUE_ENABLED": False,
+        "SQL_INSTRUMENTATION": True,
+        "SQL_N_PLUS_ONE_THRESHOLD": 10**9,  # counted, not logged
+        "CACHE_TYPE": cache_type,
+        "CACHE_DIR": os.path.join(workdir, "cache"),
+    }
+    app = create_app(overrides)
+    Bootstrap5(app)  # run.py does this for the real server
+
+    # Send upstream traffic to the fakes while the app keeps its real base URLs
+    from app import http_client
+    from app.canvas_api import CANVAS_API_BASE
+    from app.cred import PANOPTO_API_BASE
+    from app.routes import calendars, emma_service, scheduler
+
+    route_to(http_client.session_for(CANVAS_API_BASE), CANVAS_API_BASE, upstreams)
+    route_to(http_client.session_for(emma_service.adapter.base_url), emma_service.adapter.base_url, upstreams)
+
+    class LocalOAuth2Session(scheduler.OAuth2Session):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            route_to(self, PANOPTO_API_BASE, upstreams)
+    scheduler.OAuth2Session = LocalOAuth2Session
+
+    calendars.CALENDAR_FOLDER = os.path.join(workdir, "calendars")
+    os.makedirs(calendars.CALENDAR_FOLDER, exist_ok=True)
+    return app
+
+def login(client, user_id):
+    with client.session_transaction() as session:
+        session["_user_id"] = str(user_id)
+        session["_fresh"] = True
+        session["panopto_token"] = {
+            "access_token": "benchmark", "token_type": "Bearer",
+            "expires_in": 86400, "expires_at": time.time() + 86400,
+        }
+
+def run_case(client, upstreams, method, path, iterations, verbose):
+    latencies, queries, upstream_calls = [], [], []
+    for i in range(iterations + 1):  # first request warms caches and lazy imports
+        calls_before = upstreams.calls
+        out = sys.stdout if verbose else io.StringIO()
+        with redirect_stdout(out):
+            started = time.perf_counter()
+            response = client.open(path, method=method)
+            elapsed = time.perf_counter() - started
+        if response.status_code >= 400:
+            raise RuntimeError(f"{method} {path} returned {response.status_code}: {response.get_data(as_text=True)[:500]}")
+        if i == 0:
+            continue
+        latencies.append(elapsed * 1000)
+        queries.append(int(response.headers.get("X-DB-Query-Count", 0)))
+        upstream_calls.append(upstreams.calls - calls_before)
+    return {
+        "iterations": iterations,
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p90_ms": round(percentile(latencies, 90), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "max_ms": round(max(latencies), 1),
+        "queries": percentile(queries, 50),
+        "upstream_calls": percentile(upstream_calls, 50),
+    }
+
+def compare(results, baseline, tolerance):
+    """Return human-readable regressions: p50 slower than tolerance, or more queries / upstream calls."""
+    regressions = []
+    for name, row in results["routes"].items():
+        before = baseline.get("routes", {}).get(name)
+        if not before:
+            continue
+        if row["p50_ms"] > before["p50_ms"] * (1 + tolerance / 100):
+            regressions.append(f"{name}: p50 {before['p50_ms']} ms -> {row['p50_ms']} ms")
+        for metric in ("queries", "upstream_calls"):
+            if row[metric] > before[metric]:
+                regressions.append(f"{name}: {metric} {before[metric]} -> {row[metric]}")
+    return regressions
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark hot routes against SQLite and fake upstreams")
+    arg_parser.add_argument("--iterations", type=int, default=20)
+    arg_parser.add_argument("--scale", type=float, default=1.0, help="seed volume multiplier")
+    arg_parser.add_argument("--latency-ms", type=float, default=0, help="delay added to each fake upstream response")
+    arg_parser.add_argument("--cache", default="NullCache", help="Flask-Caching CACHE_TYPE (NullCache measures uncached paths)")
+    arg_parser.add_argument("--only", action="append", help="route name to run (repeatable)")
+    arg_parser.add_argument("--verbose", action="store_true", help="show the app's own print output")
+    arg_parser.add_argument("--save", action="store_true", help=f"write results to {os.path.relpath(BASELINE_FILE)}")
+    arg_parser.add_argument("--compare", action="store_true", help="compare with the saved baseline")
+    arg_parser.add_argument("--tolerance", type=float, default=25.0, help="allowed p50 slowdown, percent")
+    args = arg_parser.parse_args()
+
+    upstreams = FakeUpstreams(UpstreamData(), latency_ms=args.latency_ms).start()
+    with tempfile.TemporaryDirectory(prefix="sspps-bench-") as workdir:
+        started = time.perf_counter()
+        app = build_app(workdir, upstreams, args.cache)
+        with app.app_context():
+            info = seed_database(upstreams.data, scale=args.scale)
+        print(f"Seeded {info['employee_count']} employees, {info['members']} members, {info['attendance']} attendance rows, "
+              f"{info['instrument_events']} instrument events in {time.perf_counter() - started:.1f}s\n")
+
+        client = app.test_client()
+        login(client, info["admin_user_id"])
+
+        results = {
+            "settings": {"scale": args.scale, "latency_ms": args.latency_ms, "cache": args.cache},
+            "routes": {},
+        }
+        print(f"{'route':<36}{'n':>4}{'p50':>9}{'p90':>9}{'p95':>9}{'p99':>9}{'max':>9}{'queries':>9}{'upstream':>10}")
+        for name, method, path, iterations in CASES:
+            if args.only and name not in args.only:
+                continue
+            row = run_case(client, upstreams, method, path.format(**info), iterations or args.iterations, args.verbose)
+            results["routes"][name] = row
+            print(f"{name:<36}{row['iterations']:>4}{row['p50_ms']:>9}{row['p90_ms']:>9}{row['p95_ms']:>9}"
+                  f"{row['p99_ms']:>9}{row['max_ms']:>9}{row['queries']:>9}{row['upstream_calls']:>10}")
+
+        # Close the SQLite files so the temporary directory can be removed (Windows locks open files)
+        from app import db
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose()
+    upstreams.shutdown()
+    print("\n(latencies in ms; queries and upstream calls are per request, median)")
+
+    if args.compare:
+        if not os.path.exists(BASELINE_FILE):
+            sys.exit(f"No baseline at {BASELINE_FILE}; run with --save first")
+        with open(BASELINE_FILE) as f:
+            baseline = json.load(f)
+        if baseline.get("settings") != results["settings"]:
+            print(f"Note: baseline was recorded with {baseline.get('settings')}")
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline.")
+
+    if args.save:
+        with open(BASELINE_FILE, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Saved baseline to {BASELINE_FILE}")
+
+if __name__ == "__main__":
+    main()
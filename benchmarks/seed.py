@@ -0,0 +1,132 @@
+"""
+Seed a freshly created (SQLite) database with production-like volumes for the endpoint benchmarks.
+
+Row counts scale with `scale` (1.0 is roughly one school's worth of data: a few thousand
+employees, hundreds of committees over five academic years, tens of thousands of
+attendance rows and instrument bookings). Data is deterministic for a given seed so two
+runs measure the same work.
+"""
+from app import db
+from app.models import (
+    AcademicYear, AYCommittee, Attendance, CalendarGroup, CalendarGroupSelection, Committee, CommitteeType,
+    Department, Employee, FrequencyType, Instrument, InstrumentCalendarEvent, InstrumentRequest, Meeting,
+    Member, MemberRole, Permission, Role, User, role_permissions,
+)
+from datetime import date, datetime, timedelta
+from sqlalchemy import insert
+import random
+
+# Everything the benchmarked routes (and base.html's menu) check
+BENCHMARK_PERMISSIONS = [
+    ("ay_committee", "view"), ("ay_committee", "add"), ("ay_committee", "edit"),
+    ("committee", "edit"), ("committee_report", "view"),
+    ("panopto_scheduler", "add"), ("panopto_scheduler", "edit"),
+    ("calendar", "add"), ("calendar", "edit"), ("listserv", "view"),
+]
+
+def _bulk(model, rows):
+    if rows:
+        db.session.execute(insert(model), rows)
+
+def seed_database(upstream_data, scale=1.0, seed=1):
+    """Insert benchmark data; returns a dict of ids the runner needs (admin user, sample rows)."""
+    rng = random.Random(seed)
+    n = lambda count: max(int(count * scale), 1)
+    now = datetime.now()
+
+    # Admin user with every permission the benchmarked pages check
+    _bulk(Permission, [{"id": i + 1, "resource": r, "action": a} for i, (r, a) in enumerate(BENCHMARK_PERMISSIONS)])
+    _bulk(Role, [{"id": 1, "name": "admin"}])
+    _bulk(role_permissions, [{"role_id": 1, "permission_id": i + 1} for i in range(len(BENCHMARK_PERMISSIONS))])
+
+    employee_count = n(3000)
+    departments = [f"Department {d:02d}" for d in range(40)]
+    _bulk(Employee, [{
+        "employee_id": e, "employee_name": f"Last{e:05d}, First{e:05d}",
+        "employee_first_name": f"First{e:05d}", "employee_last_name": f"Last{e:05d}",
+        "username": f"user{e:05d}", "email": f"user{e:05d}@example.edu",
+        "department": rng.choice(departments), "employee_type": "Staff",
+        "employee_status": "Active" if rng.random() < 0.85 else "Inactive",
+        "job_code_description": rng.choice(["Professor", "Lecturer", "Analyst", "Coordinator"]),
+    } for e in range(1, employee_count + 1)])
+    _bulk(User, [{"id": 1, "employee_id": 1, "username": "user00001", "role_id": 1, "is_active": True, "deleted": False}])
+
+    # Committee tracker
+    _bulk(CommitteeType, [{"id": t, "type": f"Type {t}", "deleted": False} for t in range(1, 6)])
+    _bulk(FrequencyType, [{"id": f, "type": name, "multiplier": mult, "deleted": False}
+                          for f, (name, mult) in enumerate([("Monthly", 12), ("Quarterly", 4), ("Weekly", 40)], 1)])
+    _bulk(MemberRole, [{"id": r, "role": name, "default_order": r, "deleted": False}
+                       for r, name in enumerate(["Chair", "Vice Chair", "Member", "Ex Officio", "Staff"], 1)])
+    years = 5
+    _bulk(AcademicYear, [{"id": y, "year": f"{2020 + y}-{2021 + y}", "is_current": y == years, "deleted": False}
+                         for y in range(1, years + 1)])
+
+    committee_count = n(150)
+    _bulk(Committee, [{"id": c, "name": f"Committee {c:04d}", "short_name": f"C{c}", "reporting_start": 7,
+                       "committee_type_id": rng.randint(1, 5), "active": True, "deleted": False}
+                      for c in range(1, committee_count + 1)])
+
+    ay_rows, member_rows, meeting_rows, attendance_rows = [], [], [], []
+    member_id = meeting_id = 0
+    for year in range(1, years + 1):
+        for c in range(1, committee_count + 1):
+            ay_id = len(ay_rows) + 1
+            ay_rows.append({"id": ay_id, "committee_id": c, "academic_year_id": year,
+                            "meeting_frequency_type_id": rng.randint(1, 3), "meeting_duration_in_minutes": 60,
+                            "supplemental_minutes_per_frequency": 30, "active": True, "finalized": False,
+                            "deleted": False})
+            ay_members = []
+            for employee_id in rng.sample(range(1, employee_count + 1), k=min(rng.randint(6, 14), employee_count)):
+                member_id += 1
+                ay_members.append(member_id)
+                member_rows.append({"id": member_id, "employee_id": employee_id, "member_role_id": rng.randint(1, 5),
+                                    "ay_committee_id": ay_id, "voting": True, "allow_edit": False, "deleted": False})
+            for m in range(rng.randint(3, 9)):
+                meeting_id += 1
+                meeting_rows.append({"id": meeting_id, "title": f"Meeting {m + 1}", "ay_committee_id": ay_id,
+                                     "date": date(2020 + year, 9, 1) + timedelta(days=30 * m), "deleted": False})
+                for mid in ay_members:
+                    attendance_rows.append({"meeting_id": meeting_id, "member_id": mid, "deleted": False,
+                                            "status": rng.choice(["Present", "Present", "Present", "Absent", "Excused"])})
+    for model, rows in ((AYCommittee, ay_rows), (Member, member_rows), (Meeting, meeting_rows), (Attendance, attendance_rows)):
+        for start in range(0, len(rows), 5000):
+            _bulk(model, rows[start:start + 5000])
+
+    # Recharge (rechargedb bind)
+    machines = [f"Instrument {i:02d}" for i in range(n(12))]
+    _bulk(Department, [{"code": f"D{d:02d}", "name": f"Department {d:02d}"} for d in range(20)])
+    _bulk(Instrument, [{"machine_name": m, "charge": 50, "min_duration": 1, "duration_type": "hour",
+                        "min_increment": 1, "increment_type": "hour", "flag": True} for m in machines])
+    request_ids = [f"00000000-0000-0000-0000-{r:012d}" for r in range(n(2000))]
+    _bulk(InstrumentRequest, [{"id": rid, "machine_name": rng.choice(machines), "department_code": f"D{rng.randint(0, 19):02d}",
+                               "pi_name": "PI Name", "pi_email": "pi@example.edu", "requestor_name": f"Requestor {i}",
+                               "requestor_email": f"requestor{i}@example.edu", "status": "Approved", "created_at": now}
+                              for i, rid in enumerate(request_ids)])
+    event_rows = []
+    for i in range(n(10000)):
+        start = now + timedelta(days=rng.randint(-180, 180), hours=rng.randint(0, 23))
+        event_rows.append({"title": f"Booking {i}", "start": start, "end": start + timedelta(hours=rng.randint(1, 4)),
+                           "machine_name": rng.choice(machines), "request_id": rng.choice(request_ids),
+                           "created_date": now, "deleted": rng.random() < 0.05})
+    for start in range(0, len(event_rows), 5000):
+        _bulk(InstrumentCalendarEvent, event_rows[start:start + 5000])
+
+    # ICS calendar groups pointing at courses the fake Canvas serves for SSPPS / SOM
+    courses = upstream_data.courses[50] + upstream_data.courses[445]
+    group_count = n(12)
+    _bulk(CalendarGroup, [{"id": g, "name": f"Group {g:02d}", "ics_filename": f"group_{g:02d}.ics"}
+                          for g in range(1, group_count + 1)])
+    _bulk(CalendarGroupSelection, [{"group_name": f"Group {g:02d}", "course_id": str(course["id"]), "course_name": course["name"]}
+                                   for g in range(1, group_count + 1)
+                                   for course in rng.sample(courses, k=min(15, len(courses)))])
+
+    db.session.commit()
+    return {
+        "admin_user_id": 1,
+        "ay_committee_id": ay_rows[-1]["id"],
+        "term_id": upstream_data.terms[1]["id"],
+        "employee_count": employee_count,
+        "members": len(member_rows),
+        "attendance": len(attendance_rows),
+        "instrument_events": len(event_rows),
+    }
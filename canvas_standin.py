@@ -0,0 +1,285 @@
+"""
+Local Canvas stand-in that replays recorded API responses, for load-testing the Canvas code
+(parallel page fetches, event batching, adaptive throttling, caches) without production.
+
+Record once against the real instance, then replay as often as needed:
+
+    python canvas_standin.py --record --upstream https://canvas.ucsd.edu   # proxies and saves
+    python canvas_standin.py                                               # replays only
+
+and point the app at it in app/config.py (app/canvas_api.py picks it up for every Canvas URL):
+
+    CANVAS_STANDIN_URL = 'http://localhost:8765/api/v1'
+
+While recording, each GET that is not on file is fetched from the upstream in full (every
+page, following the Link header, with the app's own Authorization header) and saved as one
+recording under --cassettes. Replays then paginate the saved listing for whatever per_page /
+page the client asks for and send Canvas-style Link headers (current, next, prev, first,
+last), so concurrent page fetching works against any page size. POSTs are only forwarded to
+GraphQL (read-only) unless --allow-writes is given; other POSTs must have been recorded.
+
+Every response carries X-Rate-Limit-Remaining / X-Request-Cost from a simulated leaky bucket
+(--bucket, --leak-rate, --request-cost); an empty bucket answers 403 Rate Limit Exceeded like
+Canvas. --latency-ms and --jitter-ms delay each response. Parameters that change on every
+run (e.g. --ignore-param start_date --ignore-param end_date for calendar events) can be left
+out of the recording keys.
+
+Usage:
+    python canvas_standin.py [--port 8765] [--cassettes canvas_cassettes] [--latency-ms 150]
+                             [--record --upstream https://canvas.example.edu [--allow-writes]]
+"""
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import requests
+import threading
+import time
+
+PAGING_PARAMS = {"page", "per_page"}
+FORWARDED_HEADERS = ("Authorization", "Content-Type", "Accept")
+
+def _next_link(response):
+    match = re.search(r'<([^>]+)>;\s*rel="next"', response.headers.get("Link", ""))
+    return match.group(1) if match else None
+
+class LeakyBucket:
+    """Canvas-style throttle: each request costs cost units, the bucket drains at leak_rate/s."""
+
+    def __init__(self, capacity, leak_rate, cost):
+        self.capacity = capacity
+        self.leak_rate = leak_rate
+        self.cost = cost
+        self.level = 0.0
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self):
+        """Charge one request; returns (allowed, remaining)."""
+        with self._lock:
+            now = time.monotonic()
+            self.level = max(0.0, self.level - (now - self.updated) * self.leak_rate)
+            self.updated = now
+            if self.level + self.cost > self.capacity:
+                return False, 0.0
+            self.level += self.cost
+            return True, self.capacity - self.level
+
+class Cassettes:
+    """One JSON file per recorded request, named by a hash of its key."""
+
+    def __init__(self, directory, ignore_params=()):
+        self.directory = directory
+        self.ignore_params = set(ignore_params)
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, method, path, query, body=b""):
+        params = sorted((k, v) for k, v in query if k not in PAGING_PARAMS | self.ignore_params)
+        key = f"{method} {path}?{urlencode(params)}"
+        if body:
+            key += f" body={hashlib.sha1(body).hexdigest()}"
+        return key
+
+    def _file(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode("utf-8")).hexdigest()[:24] + ".json")
+
+    def load(self, key):
+        try:
+            with open(self._file(key), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def save(self, key, recording):
+        recording = dict(recording, key=key, recorded_at=datetime.now().isoformat(timespec="seconds"))
+        with self._lock:
+            tmp = self._file(key) + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(recording, f)
+            os.replace(tmp, self._file(key))
+
+class CanvasStandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like Canvas
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.handle_request(b"")
+
+    def do_POST(self):
+        self.handle_request(self.rfile.read(int(self.headers.get("Content-Length") or 0)))
+
+    def do_PUT(self):
+        self.do_POST()
+
+    def do_DELETE(self):
+        self.handle_request(b"")
+
+    def handle_request(self, body):
+        server = self.server
+        url = urlsplit(self.path)
+        query = parse_qsl(url.query, keep_blank_values=True)
+        key = server.cassettes.key(self.command, url.path, query, body)
+
+        if server.latency or server.jitter:
+            time.sleep(server.latency + random.uniform(0, server.jitter))
+        allowed, remaining = server.bucket.take() if server.bucket else (True, None)
+        rate_headers = {} if remaining is None else {
+            "X-Rate-Limit-Remaining": f"{remaining:.1f}", "X-Request-Cost": f"{server.bucket.cost:.1f}"}
+        if not allowed:
+            server.count("throttled")
+            return self.send(403, "text/plain", b"403 Forbidden (Rate Limit Exceeded)", rate_headers)
+
+        recording = server.cassettes.load(key)
+        if recording is None and server.record:
+            try:
+                recording = self.record(url.path, query, body)
+            except requests.exceptions.RequestException as e:
+                print(f"[{datetime.now()}] upstream failed for {key}: {e}")
+                return self.send_json(502, {"errors": [{"message": f"upstream failed: {e}"}]}, rate_headers)
+            if recording is not None and 200 <= recording["status"] < 300:
+                server.cassettes.save(key, recording)  # errors are passed on but not kept
+                server.count("recorded")
+        if recording is None:
+            server.count("missed")
+            print(f"[{datetime.now()}] no recording for {key}")
+            return self.send_json(404, {"errors": [{"message": f"No recording for {self.command} {url.path}"}]},
+                                  rate_headers)
+
+        server.count("replayed")
+        if recording.get("items") is not None:
+            return self.send_page(recording, query, rate_headers)
+        payload = recording.get("body")
+        if recording.get("content_type", "").startswith("application/json"):
+            return self.send_json(recording.get("status", 200), payload, rate_headers)
+        return self.send(recording.get("status", 200), recording.get("content_type", "text/plain"),
+                         (payload or "").encode("utf-8"), rate_headers)
+
+    def record(self, path, query, body):
+        """Fetch a request from the upstream; GET listings are fetched page by page and merged."""
+        server = self.server
+        headers = {name: self.headers[name] for name in FORWARDED_HEADERS if self.headers.get(name)}
+        url = f"{server.upstream}{path}"
+        if self.command != "GET":
+            if not server.allow_writes and not path.endswith("/graphql"):
+                return None
+            response = requests.request(self.command, url, params=query, data=body, headers=headers, timeout=60)
+            return self.recording_of(response)
+
+        params = [(k, v) for k, v in query if k not in PAGING_PARAMS] + [("per_page", "100")]
+        response = requests.get(url, params=params, headers=headers, timeout=60)
+        recording = self.recording_of(response)
+        if not response.ok or not recording["content_type"].startswith("application/json"):
+            return recording
+        data = recording["body"]
+        wrapper = None
+        if isinstance(data, dict) and len(data) == 1 and isinstance(next(iter(data.values())), list) \
+                and "Link" in response.headers:
+            wrapper, data = next(iter(data.items()))  # e.g. {"enrollment_terms": [...]}
+        if not isinstance(data, list):
+            return recording
+
+        items, next_url = list(data), _next_link(response)
+        while next_url:
+            response = requests.get(next_url, headers=headers, timeout=60)
+            response.raise_for_status()
+            page = response.json()
+            items.extend(page[wrapper] if wrapper else page)
+            next_url = _next_link(response)
+        return {"status": 200, "content_type": "application/json", "items": items, "wrapper": wrapper}
+
+    @staticmethod
+    def recording_of(response):
+        content_type = response.headers.get("Content-Type", "text/plain")
+        is_json = content_type.startswith("application/json")
+        return {"status": response.status_code, "content_type": "application/json" if is_json else content_type,
+                "body": response.json() if is_json and response.content else response.text}
+
+    def send_page(self, recording, query, headers):
+        params = dict(query)
+        per_page = max(1, min(int(params.get("per_page") or 10), 100))
+        page = max(1, int(params.get("page") or 1))
+        items = recording["items"]
+        last = max((len(items) + per_page - 1) // per_page, 1)
+        chunk = items[(page - 1) * per_page:page * per_page]
+
+        base = f"http://{self.headers.get('Host')}{urlsplit(self.path).path}"
+        others = [(k, v) for k, v in query if k != "page"]
+        links = []
+        for rel, number in (("current", page), ("next", page + 1), ("prev", page - 1), ("first", 1), ("last", last)):
+            if (rel == "next" and page >= last) or (rel == "prev" and page <= 1):
+                continue
+            links.append(f'<{base}?{urlencode(others + [("page", str(number))])}>; rel="{rel}"')
+        payload = {recording["wrapper"]: chunk} if recording.get("wrapper") else chunk
+        self.send_json(200, payload, dict(headers, Link=",".join(links)))
+
+    def send_json(self, status, payload, headers=None):
+        self.send(status, "application/json; charset=utf-8", json.dumps(payload).encode("utf-8"), headers)
+
+    def send(self, status, content_type, body, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+class CanvasStandIn(ThreadingHTTPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address, cassettes, record=False, upstream=None, allow_writes=False,
+                 latency_ms=0, jitter_ms=0, bucket=None):
+        super().__init__(address, CanvasStandInHandler)
+        self.cassettes = cassettes
+        self.record = record
+        self.upstream = (upstream or "").rstrip("/")
+        self.allow_writes = allow_writes
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.bucket = bucket
+        self.counts = {"replayed": 0, "recorded": 0, "missed": 0, "throttled": 0}
+        self._lock = threading.Lock()
+
+    def count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Record/replay Canvas API stand-in")
+    arg_parser.add_argument("--host", default="localhost")
+    arg_parser.add_argument("--port", type=int, default=8765)
+    arg_parser.add_argument("--cassettes", default="canvas_cassettes", help="directory of recordings")
+    arg_parser.add_argument("--record", action="store_true", help="fetch and save requests that are not on file")
+    arg_parser.add_argument("--upstream", help="real Canvas origin for --record, e.g. https://canvas.example.edu")
+    arg_parser.add_argument("--allow-writes", action="store_true", help="also forward non-GraphQL POST/PUT/DELETE")
+    arg_parser.add_argument("--ignore-param", action="append", default=[], help="query parameter left out of keys")
+    arg_parser.add_argument("--latency-ms", type=int, default=0)
+    arg_parser.add_argument("--jitter-ms", type=int, default=0)
+    arg_parser.add_argument("--bucket", type=float, default=700, help="rate-limit bucket size (0 disables)")
+    arg_parser.add_argument("--leak-rate", type=float, default=10, help="bucket units drained per second")
+    arg_parser.add_argument("--request-cost", type=float, default=1)
+    args = arg_parser.parse_args()
+    if args.record and not args.upstream:
+        arg_parser.error("--record needs --upstream")
+
+    bucket = LeakyBucket(args.bucket, args.leak_rate, args.request_cost) if args.bucket > 0 else None
+    server = CanvasStandIn((args.host, args.port), Cassettes(args.cassettes, args.ignore_param),
+                           record=args.record, upstream=args.upstream, allow_writes=args.allow_writes,
+                           latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, bucket=bucket)
+    with server:
+        mode = f"recording from {args.upstream}" if args.record else "replaying"
+        print(f"Canvas stand-in on http://{args.host}:{args.port} ({mode} {args.cassettes})")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        print(f"Canvas stand-in stopped: {server.counts}")
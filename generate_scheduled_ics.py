@@ -1,11 +1,15 @@
 from app import create_app
 from app.routes.calendars import generate_scheduled_ics
+import argparse
 
 app = create_app()
 
-def generate_ics_with_app_context():
+def generate_ics_with_app_context(force=False):
     with app.app_context():
-       generate_scheduled_ics()
+       generate_scheduled_ics(force=force)
 
 if __name__ == '__main__':
-    generate_ics_with_app_context()  
+    arg_parser = argparse.ArgumentParser(description="Regenerate the calendar group .ics files that changed")
+    arg_parser.add_argument("--force", action="store_true", help="rewrite every group's file")
+    args = arg_parser.parse_args()
+    generate_ics_with_app_context(force=args.force)
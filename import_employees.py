@@ -1,10 +1,10 @@
-from app.cred import server, user, pwd, database, odbcdriver  # ensure `database` is defined in cred.py
+from app.cred import database  # ensure `database` is defined in cred.py
+from app.db_engine import create_mssql_engine
 from datetime import datetime
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 import pandas as pd
 
-connection_string = f'mssql+pyodbc://{user}:{pwd}@{server}/{database}?driver={odbcdriver}&TrustServerCertificate=yes'
-engine = create_engine(connection_string)
+engine = create_mssql_engine(database)
 
 def import_employees():
     # Step 1: Load the CSV files
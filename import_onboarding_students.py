@@ -1,7 +1,8 @@
 from app import create_app
-from app.cred import server, user, pwd, database, odbcdriver
+from app.cred import database
+from app.db_engine import create_mssql_engine
 from datetime import datetime
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 import pandas as pd
 import os
 import subprocess
@@ -12,8 +13,7 @@ from datetime import datetime, timedelta, timezone
 
 app = create_app()
 
-connection_string = f'mssql+pyodbc://{user}:{pwd}@{server}/{database}?driver={odbcdriver}&TrustServerCertificate=yes'
-engine = create_engine(connection_string, fast_executemany=True)
+engine = create_mssql_engine(database)
 
 ERROR_FILE_IMPORT = "app/static/files/applicant_import_errors.csv"
 ERROR_FILE_TSN = "app/static/files/tsn_update_errors.csv"
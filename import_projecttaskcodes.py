@@ -1,16 +1,16 @@
 from app import create_app, db
-from app.cred import server, user, pwd, rechargedatabase, odbcdriver  # ensure `database` is defined in cred.py
+from app.cred import rechargedatabase  # ensure `database` is defined in cred.py
+from app.db_engine import create_mssql_engine
 from app.models import InstrumentRequest, ProjectTaskCode
 from app.utils import permission_required
 from datetime import datetime
-from sqlalchemy import create_engine, Table, Column, String, MetaData
+from sqlalchemy import Table, Column, String, MetaData
 import pandas as pd
 
 metadata = MetaData()
 app = create_app()
 
-connection_string = f'mssql+pyodbc://{user}:{pwd}@{server}/{rechargedatabase}?driver={odbcdriver}&TrustServerCertificate=yes'
-engine = create_engine(connection_string)
+engine = create_mssql_engine(rechargedatabase)
 
 # --- Define Table for Bulk Insert ---
 project_task_codes_table = Table(
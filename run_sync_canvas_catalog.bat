@@ -0,0 +1,10 @@
+@echo off
+
+REM Change directory to your project folder
+cd /d "E:\WWW\sspps\"
+
+REM Activate the virtual environment
+call venv\Scripts\activate.bat
+
+REM Delta sync (schedule hourly); schedule a second task with --full nightly or weekly
+python sync_canvas_catalog.py %* >> app/logs/sync_canvas_catalog.log 2>&1
\ No newline at end of file
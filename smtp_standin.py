@@ -0,0 +1,90 @@
+"""
+Minimal local SMTP stand-in for testing outbound mail without touching smtp.ucsd.edu.
+
+Accepts every message, prints a one-line summary and optionally saves each message as
+a .eml file. Point the app at it in app/config.py:
+
+    MAIL_SERVER = 'localhost'
+    MAIL_PORT = 1025
+    MAIL_USE_TLS = False
+
+Usage:
+    python smtp_standin.py [--port 1025] [--save-dir mail_out]
+"""
+from datetime import datetime
+from email import message_from_bytes
+import argparse
+import os
+import socketserver
+
+class SMTPStandInHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write((line + "\r\n").encode("ascii"))
+
+    def handle(self):
+        self.reply("220 localhost SMTP stand-in ready")
+        mail_from, rcpt_to = None, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode("utf-8", "replace").strip()
+            verb = command[:4].upper()
+
+            if verb in ("EHLO", "HELO"):
+                self.wfile.write(b"250-localhost\r\n250 8BITMIME\r\n" if verb == "EHLO" else b"250 localhost\r\n")
+            elif verb == "MAIL":
+                mail_from, rcpt_to = command[10:].strip(), []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                rcpt_to.append(command[8:].strip())
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = []
+                while True:
+                    chunk = self.rfile.readline()
+                    if not chunk or chunk in (b".\r\n", b".\n"):
+                        break
+                    data.append(chunk[1:] if chunk.startswith(b"..") else chunk)
+                self.server.deliver(mail_from, rcpt_to, b"".join(data))
+                self.reply("250 OK: queued")
+            elif verb in ("RSET", "NOOP"):
+                if verb == "RSET":
+                    mail_from, rcpt_to = None, []
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address, save_dir=None):
+        super().__init__(address, SMTPStandInHandler)
+        self.save_dir = save_dir
+        self.count = 0
+        if save_dir:
+            os.makedirs(save_dir, exist_ok=True)
+
+    def deliver(self, mail_from, rcpt_to, raw):
+        self.count += 1
+        msg = message_from_bytes(raw)
+        print(f"[{datetime.now()}] #{self.count} {mail_from} -> {', '.join(rcpt_to)}: {msg.get('Subject')}")
+        if self.save_dir:
+            with open(os.path.join(self.save_dir, f"{self.count:05d}.eml"), "wb") as f:
+                f.write(raw)
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Local SMTP stand-in")
+    arg_parser.add_argument("--host", default="localhost")
+    arg_parser.add_argument("--port", type=int, default=1025)
+    arg_parser.add_argument("--save-dir", default=None)
+    args = arg_parser.parse_args()
+
+    with SMTPStandIn((args.host, args.port), save_dir=args.save_dir) as server:
+        print(f"SMTP stand-in listening on {args.host}:{args.port}")
+        server.serve_forever()
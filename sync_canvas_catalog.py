@@ -0,0 +1,19 @@
+from app import create_app
+from app.routes.canvas import sync_canvas_catalog
+from datetime import datetime
+import argparse
+
+app = create_app()
+
+def sync_with_app_context(full=False):
+    with app.app_context():
+        print(f"[{datetime.now()}] Syncing Canvas catalog ({'full' if full else 'delta'})...")
+        for name, result in sync_canvas_catalog(full=full).items():
+            print(f"[{datetime.now()}]   {name}: {result}")
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description="Refresh the local mirror of Canvas terms, courses and sections")
+    arg_parser.add_argument("--full", action="store_true",
+                            help="sweep every course (not only open terms), mark removed courses and refresh all sections")
+    args = arg_parser.parse_args()
+    sync_with_app_context(full=args.full)